@@ -0,0 +1,161 @@
+# api/analytics.py
+import math
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+# -----------------------------------------------------------
+# Agregados de riesgo mantenidos en cada inserción
+# -----------------------------------------------------------
+# Por cada hora y cada dimensión (banda de edad, nivel de alcohol,
+# categoría de BMI) se guardan contadores acumulados: total, alto riesgo y
+# suma de probabilidad de alto riesgo. El escritor de api/persistence.py
+# los actualiza (UPSERT) en la misma transacción que inserta las filas.
+#
+# Las consultas del dashboard leen solo estos agregados: el costo depende
+# del número de horas x categorías de la ventana, no de cuántas
+# predicciones se hayan registrado.
+
+CREATE_AGGREGATES = """
+CREATE TABLE IF NOT EXISTS risk_aggregates (
+    dimension VARCHAR(16) NOT NULL,
+    value VARCHAR(16) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    high_risk INTEGER NOT NULL DEFAULT 0,
+    sum_prob_high_risk FLOAT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket_start, value)
+)
+"""
+
+CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_responses_created_at ON responses (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_risk_aggregates_bucket ON risk_aggregates (bucket_start)",
+]
+
+UPSERT_AGGREGATE = """
+INSERT INTO risk_aggregates (dimension, value, bucket_start, total, high_risk, sum_prob_high_risk)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (dimension, bucket_start, value) DO UPDATE SET
+    total = total + excluded.total,
+    high_risk = high_risk + excluded.high_risk,
+    sum_prob_high_risk = sum_prob_high_risk + excluded.sum_prob_high_risk
+"""
+
+DIMENSIONS = ("age_band", "alcohol", "bmi_bucket")
+
+
+def age_band(age):
+    if age < 30:
+        return "<30"
+    if age >= 70:
+        return "70+"
+    low = int(age) // 10 * 10
+    return f"{low}-{low + 9}"
+
+
+def bmi_bucket(bmi):
+    # Dato faltante: NaN o el "NaN" con que persistence lo audita
+    if not isinstance(bmi, (int, float)) or math.isnan(bmi):
+        return "sin_dato"
+    # Categorías OMS
+    if bmi < 18.5:
+        return "bajo_peso"
+    if bmi < 25:
+        return "normal"
+    if bmi < 30:
+        return "sobrepeso"
+    return "obesidad"
+
+
+def hour_bucket(created_at):
+    """'YYYY-MM-DD HH:MM:SS.ffffff' -> 'YYYY-MM-DD HH:00:00'"""
+    return created_at[:13] + ":00:00"
+
+
+def ensure_aggregates(conn):
+    """Crea la tabla de agregados e índices; si es nueva, la reconstruye desde responses"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'risk_aggregates'"
+    ).fetchone()
+    conn.execute(CREATE_AGGREGATES)
+    for sql in CREATE_INDEXES:
+        conn.execute(sql)
+    if not exists:
+        rows = conn.execute(
+            "SELECT alcohol_consumption, bmi, age, prediction, prob_high_risk, created_at "
+            "FROM responses WHERE prediction IS NOT NULL AND created_at IS NOT NULL"
+        )
+        update_aggregates(conn, rows)
+    conn.commit()
+
+
+def update_aggregates(conn, rows):
+    """
+    Suma las filas (alcohol, bmi, age, prediction, prob_high_risk, created_at)
+    a los agregados. Debe llamarse dentro de la transacción del insert.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for alcohol, bmi, age, prediction, prob_high, created_at in rows:
+        bucket = hour_bucket(created_at)
+        high = 1 if int(prediction) == 1 else 0
+        for dimension, value in (
+            ("age_band", age_band(age)),
+            ("alcohol", alcohol),
+            ("bmi_bucket", bmi_bucket(bmi)),
+        ):
+            d = deltas[(dimension, value, bucket)]
+            d[0] += 1
+            d[1] += high
+            d[2] += float(prob_high or 0.0)
+
+    conn.executemany(
+        UPSERT_AGGREGATE,
+        [(dim, value, bucket, t, h, p) for (dim, value, bucket), (t, h, p) in deltas.items()]
+    )
+
+
+# -----------------------------------------------------------
+# Consultas
+# -----------------------------------------------------------
+def _summary(total, high_risk, sum_prob):
+    return {
+        "total": total,
+        "high_risk": high_risk,
+        "high_risk_rate": high_risk / total if total else 0.0,
+        "avg_prob_high_risk": sum_prob / total if total else 0.0,
+    }
+
+
+def risk_summary(db_path, hours=24, now=None):
+    """Tasa de alto riesgo por dimensión en las últimas `hours` horas"""
+    now = now or datetime.now(timezone.utc)
+    start = (now - timedelta(hours=hours)).strftime("%Y-%m-%d %H:00:00")
+    end = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT dimension, value, SUM(total), SUM(high_risk), SUM(sum_prob_high_risk) "
+            "FROM risk_aggregates WHERE bucket_start >= ? AND bucket_start <= ? "
+            "GROUP BY dimension, value",
+            (start, end)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    result = {f"by_{dim}": {} for dim in DIMENSIONS}
+    overall = [0, 0, 0.0]
+    for dimension, value, total, high_risk, sum_prob in rows:
+        result[f"by_{dimension}"][value] = _summary(total, high_risk, sum_prob)
+        if dimension == "alcohol":
+            # Cada fila tiene exactamente un nivel de alcohol -> total global
+            overall[0] += total
+            overall[1] += high_risk
+            overall[2] += sum_prob
+
+    return {
+        "window": {"start": start, "end": end, "hours": hours},
+        "overall": _summary(*overall),
+        **result,
+    }
@@ -0,0 +1,185 @@
+# api/batcher.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+# -----------------------------------------------------------
+# Micro-batching adaptativo de predicciones individuales
+# -----------------------------------------------------------
+# Cada request de /predict/ corre en su propio hilo del threadpool. En vez
+# de que cada hilo recorra el bosque con una sola fila (compitiendo por el
+# GIL), los hilos encolan su vector y esperan un Future. Un hilo dedicado
+# junta hasta `max_batch_size` filas, evalúa la matriz completa de una vez
+# y reparte cada fila a quien la pidió.
+#
+# La espera de `max_wait_ms` solo se aplica cuando hay concurrencia real
+# (promedio móvil de tamaño de lote > 1). Con tráfico bajo cada fila se
+# evalúa de inmediato y no se agrega latencia.
+#
+# Una vez llamado stop() no se aceptan filas nuevas (BatcherUnavailable);
+# lo que ya estaba en cola se evalúa antes de terminar el hilo.
+
+
+class BatcherUnavailable(RuntimeError):
+    """El micro-batcher está detenido o no respondió a tiempo"""
+
+
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=2.0, timeout_s=30.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.timeout = float(timeout_s) if timeout_s else None
+        self.batches = 0
+        self.rows = 0
+        self.avg_batch_size = 1.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def start(self):
+        """
+        Arranca el hilo. Después de stop() vuelve a aceptar filas (p.ej. un
+        segundo ciclo de lifespan), pero solo si el hilo anterior ya terminó
+        """
+        with self._lock:
+            self._start_locked()
+
+    def _start_locked(self):
+        if self._thread is not None and self._thread.is_alive():
+            if self._stopping:
+                raise BatcherUnavailable("El micro-batcher todavía se está deteniendo")
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="cardiai-microbatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        with self._lock:
+            thread = self._thread
+            self._stopping = True
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            # Sigue evaluando; vaciará la cola él mismo al terminar
+            return
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+        # Filas que el hilo ya no va a tomar: se les avisa en vez de dejarlas colgadas
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(BatcherUnavailable("Micro-batcher detenido"))
+
+    def submit(self, row, context=None):
+        """
+        Encola un vector final (1 x n_features) y bloquea hasta tener (pred, proba).
+        `context` (p.ej. el pipeline activo) se pasa a score_fn; filas con
+        distinto contexto nunca se evalúan juntas.
+        """
+        future = Future()
+        item = (np.asarray(row, dtype=np.float64).reshape(-1), future, context)
+        with self._lock:
+            # Bajo el lock: stop() no puede colarse entre el chequeo y el put
+            if self._stopping:
+                raise BatcherUnavailable("Micro-batcher detenido")
+            if self._thread is None:
+                self._start_locked()
+            self._queue.put(item)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise BatcherUnavailable("El micro-batcher no respondió a tiempo")
+
+    def _collect(self, first):
+        batch = [first]
+        # 1) Lo que ya está en cola se toma sin esperar
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        # 2) Solo se espera más si hay concurrencia observada
+        if self.max_wait > 0 and self.avg_batch_size > 1.2:
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    return batch, True
+                batch.append(item)
+        return batch, False
+
+    def _score_group(self, group):
+        # Filas cuyo submit ya se rindió por timeout se descartan
+        group = [item for item in group if item[1].set_running_or_notify_cancel()]
+        if not group:
+            return
+        X = np.vstack([row for row, _, _ in group])
+        try:
+            preds, proba = self.score_fn(X, group[0][2])
+        except Exception as e:
+            for _, future, _ in group:
+                future.set_exception(e)
+            return
+        for i, (_, future, _) in enumerate(group):
+            future.set_result((int(preds[i]), proba[i].tolist()))
+
+    def _run(self):
+        done = False
+        while not done:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, done = self._collect(first)
+
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[2]), []).append(item)
+            for group in groups.values():
+                self._score_group(group)
+
+            self.batches += 1
+            self.rows += len(batch)
+            self.avg_batch_size = 0.8 * self.avg_batch_size + 0.2 * len(batch)
+
+        # Lo que quede en cola al detenerse se evalúa fila por fila
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._score_group([item])
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.avg_batch_size, 3),
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,221 @@
+# api/bulk_score.py
+"""
+Scoring masivo offline (sin levantar FastAPI).
+
+Usa los mismos artefactos que api/main.py (modelo_rf_final.pkl,
+minmax_scaler.pkl, alcohol_manual_encoder.pkl). El archivo de entrada se
+divide en bloques que se evalúan en un pool de procesos; cada worker carga
+el modelo una sola vez. Los resultados se escriben en el orden de entrada.
+
+Uso:
+    python -m api.bulk_score pacientes.csv -o resultados.csv --workers 4
+    python -m api.bulk_score pacientes.jsonl -o resultados.jsonl
+
+Columnas/campos esperados: los mismos de PatientData
+(Alcohol_Consumption, Homocysteine_Level, CRP_Level, BMI, ...).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from api.pipeline import ScoringPipeline
+from api.validation import FIELDS, validate_records
+
+OUTPUT_FIELDS = ["prediction", "risk_label", "prob_low_risk", "prob_high_risk", "error"]
+
+# Pipeline cargado una vez por proceso worker
+_worker_pipeline = None
+
+
+def _init_worker(artifact_dir, engine, export_dir=None):
+    global _worker_pipeline
+    _worker_pipeline = ScoringPipeline.from_dir(artifact_dir, engine=engine, export_dir=export_dir)
+
+
+class InvalidLine:
+    """Línea del archivo de entrada que no se pudo leer; se reporta como error de su fila"""
+
+    def __init__(self, raw, message):
+        self.raw = raw
+        self.message = message
+
+
+def score_chunk(records):
+    """Evalúa un bloque de registros crudos; devuelve un dict de salida por fila"""
+    results = [None] * len(records)
+
+    # Validación columnar: mismas reglas y mensajes que PatientData
+    batch = validate_records(records)
+    for i, errors in batch.errors.items():
+        if isinstance(records[i], InvalidLine):
+            results[i] = {"error": records[i].message}
+        else:
+            results[i] = {"error": "; ".join(
+                f"{err['field']}: {err['message']}" if err["field"] else err["message"] for err in errors)}
+
+    valid_rows = batch.valid_indices
+    if len(valid_rows):
+        preds, proba, _ = _worker_pipeline.score_columns(batch.columns, valid_rows)
+        for row, i in enumerate(valid_rows.tolist()):
+            pred = int(preds[row])
+            results[i] = {
+                "prediction": pred,
+                "risk_label": "Alto Riesgo" if pred == 1 else "Bajo Riesgo",
+                "prob_low_risk": float(proba[row, 0]),
+                "prob_high_risk": float(proba[row, 1]),
+            }
+
+    return [{**_input_fields(raw), **res} for raw, res in zip(records, results)]
+
+
+def _input_fields(raw):
+    if isinstance(raw, dict):
+        return raw
+    return {"input": raw.raw if isinstance(raw, InvalidLine) else raw}
+
+
+# -----------------------------------------------------------
+# Lectura / escritura
+# -----------------------------------------------------------
+def _detect_format(path, default=None):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if default:
+        return default
+    raise ValueError(f"Formato no soportado: {path} (use .csv o .jsonl)")
+
+
+def read_records(path, fmt):
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            # Celdas de más en una fila irregular quedan bajo la clave None: se descartan
+            for row in csv.DictReader(f):
+                row.pop(None, None)
+                yield row
+        else:
+            for line in f:
+                if line.strip():
+                    yield _parse_line(line)
+
+
+def _parse_line(line):
+    # Una línea rota no debe cortar la corrida: queda como error de esa fila
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return InvalidLine(line.rstrip("\r\n"), f"JSON inválido: {e}")
+
+
+def iter_chunks(records, chunk_size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def input_fields(path, fmt):
+    """
+    Columnas de entrada de la salida CSV: el encabezado del CSV de entrada,
+    o los campos de PatientData más `input` (línea JSONL inválida o que no
+    es un objeto). Fijas para todo el archivo, sin depender de la primera fila
+    """
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+    else:
+        header = FIELDS + ["input"]
+    return [k for k in dict.fromkeys(header) if k not in OUTPUT_FIELDS]
+
+
+class _Writer:
+    def __init__(self, f, fmt, fields):
+        self.f = f
+        self.fmt = fmt
+        self.fields = fields
+        self.csv = None
+
+    def write(self, rows):
+        if self.fmt == "jsonl":
+            for row in rows:
+                self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            return
+        if self.csv is None:
+            self.csv = csv.DictWriter(self.f, fieldnames=self.fields + OUTPUT_FIELDS, extrasaction="ignore")
+            self.csv.writeheader()
+        self.csv.writerows(rows)
+
+
+# -----------------------------------------------------------
+# Ejecución
+# -----------------------------------------------------------
+def run(input_path, output_path, workers=None, chunk_size=5000,
+        artifact_dir="api", engine="flat", export_dir=None, progress=sys.stderr):
+    in_fmt = _detect_format(input_path)
+    out_fmt = _detect_format(output_path, default=in_fmt)
+    workers = workers or os.cpu_count() or 1
+
+    total = 0
+    t0 = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(artifact_dir, engine, export_dir)) as pool, \
+            open(output_path, "w", newline="", encoding="utf-8") as out:
+        writer = _Writer(out, out_fmt, input_fields(input_path, in_fmt))
+        # Ventana acotada de bloques en vuelo: la memoria no depende del tamaño del archivo
+        pending = deque()
+        max_in_flight = workers * 2
+
+        def drain_one():
+            nonlocal total
+            rows = pending.popleft().result()
+            writer.write(rows)
+            total += len(rows)
+            elapsed = time.perf_counter() - t0
+            if progress is not None:
+                print(f"{total} filas | {total / elapsed:,.0f} filas/s | {elapsed:.1f}s",
+                      file=progress, flush=True)
+
+        for chunk in iter_chunks(read_records(input_path, in_fmt), chunk_size):
+            pending.append(pool.submit(score_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                drain_one()
+        while pending:
+            drain_one()
+
+    elapsed = time.perf_counter() - t0
+    return {"rows": total, "seconds": elapsed, "rows_per_second": total / elapsed if elapsed else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scoring masivo offline de pacientes (CSV/JSONL)")
+    parser.add_argument("input", help="Archivo de entrada .csv o .jsonl")
+    parser.add_argument("-o", "--output", required=True, help="Archivo de salida .csv o .jsonl")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Procesos (por defecto: núcleos)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=5000, help="Filas por bloque")
+    parser.add_argument("--artifact-dir", default=os.getenv("CARDIAI_ARTIFACT_DIR", "api"),
+                        help="Directorio con los archivos PKL")
+    parser.add_argument("--engine", default=os.getenv("CARDIAI_INFERENCE_ENGINE", "flat"),
+                        choices=["flat", "sklearn"], help="Motor de inferencia")
+    parser.add_argument("--export-dir", default=os.getenv("CARDIAI_EXPORT_DIR"),
+                        help="Exportación mapeable en memoria (python -m api.export_artifacts)")
+    args = parser.parse_args(argv)
+
+    summary = run(args.input, args.output, workers=args.workers, chunk_size=args.chunk_size,
+                  artifact_dir=args.artifact_dir, engine=args.engine, export_dir=args.export_dir)
+    print(f"Listo: {summary['rows']} filas en {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} filas/s) -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# api/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# -----------------------------------------------------------
+# Caché LRU de predicciones
+# -----------------------------------------------------------
+# Clave: hash del vector final (codificado y en el orden del modelo) +
+# versión del modelo. Si cambia la versión activa se vacía la caché, así
+# nunca se sirve una predicción de un modelo anterior.
+#
+# Los handlers síncronos de FastAPI corren en un threadpool, por eso
+# todas las operaciones van protegidas con un lock.
+
+
+class PredictionCache:
+    def __init__(self, max_size=1024, ttl=None, clock=time.monotonic):
+        self.max_size = int(max_size)
+        self.ttl = float(ttl) if ttl else None
+        self.clock = clock
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def make_key(self, vector, model_version):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.ascontiguousarray(vector, dtype=np.float64).tobytes())
+        h.update(str(model_version).encode())
+        return h.digest()
+
+    def set_model_version(self, model_version):
+        """Registra la versión activa; si cambió, invalida todo"""
+        with self._lock:
+            if model_version != self.model_version:
+                self._data.clear()
+                self.model_version = model_version
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires = item
+            if expires is not None and self.clock() >= expires:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        expires = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+                "model_version": self.model_version,
+            }
@@ -0,0 +1,230 @@
+# api/columnar.py
+import io
+
+import numpy as np
+
+from api.preprocessing import ALCOHOL_COLUMN, SCALER_FIELD_MAP
+from api.validation import ALCOHOL_FIELD, FIELDS
+
+# -----------------------------------------------------------
+# Formatos columnares para /predict/columnar/
+# -----------------------------------------------------------
+# Arrow IPC (stream o file), Parquet y .npy: el body se decodifica a
+# columnas NumPy que pasan directo a validate_columns/score_columns, sin
+# JSON ni dicts por fila. La respuesta vuelve en el mismo formato.
+#
+# Copias mínimas:
+#   - Arrow/Parquet: columnas numéricas sin nulos (un solo chunk) se leen
+#     como vistas de solo lectura sobre el buffer del request.
+#   - .npy: np.frombuffer sobre el body; cada campo del arreglo
+#     estructurado es una vista.
+# La única copia obligatoria es la matriz Nx10 que arma transform_columns.
+#
+# pyarrow está en requirements.txt (lo instala la imagen Docker). Si falta
+# en una instalación mínima, Arrow/Parquet responden 415 y .npy sigue
+# funcionando.
+
+# Media type -> formato
+MEDIA_TYPES = {
+    "application/vnd.apache.arrow.stream": "arrow_stream",
+    "application/vnd.apache.arrow.file": "arrow_file",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/x-npy": "npy",
+    "application/npy": "npy",
+}
+RESPONSE_MEDIA_TYPES = {
+    "arrow_stream": "application/vnd.apache.arrow.stream",
+    "arrow_file": "application/vnd.apache.arrow.file",
+    "parquet": "application/vnd.apache.parquet",
+    "npy": "application/x-npy",
+}
+
+# Nombre de columna -> campo de PatientData. Se aceptan los nombres del
+# scaler ('Blood Pressure', ...) + 'Alcohol Consumption' y también los
+# nombres de PatientData ('Blood_Pressure', ...)
+COLUMN_FIELDS = {**SCALER_FIELD_MAP, ALCOHOL_COLUMN: ALCOHOL_FIELD, **{f: f for f in FIELDS}}
+
+OUTPUT_COLUMNS = ["index", "prediction", "risk_label", "prob_low_risk", "prob_high_risk", "error"]
+
+
+class UnsupportedFormat(ValueError):
+    """Formato no soportado en este servidor (p.ej. falta pyarrow) -> 415"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise UnsupportedFormat("Arrow/Parquet requieren pyarrow en el servidor (pip install pyarrow)")
+    return pa
+
+
+# -----------------------------------------------------------
+# Decodificación: body -> ({campo: arreglo}, n_filas)
+# -----------------------------------------------------------
+def decode_columns(body, fmt):
+    if fmt == "npy":
+        return _decode_npy(body)
+    if fmt in ("arrow_stream", "arrow_file", "parquet"):
+        return _decode_arrow(body, fmt)
+    raise UnsupportedFormat(f"Formato desconocido: {fmt}")
+
+
+def _wanted(names):
+    """Columnas del archivo que corresponden a un campo (la primera gana)"""
+    selected = {}
+    for name in names:
+        field = COLUMN_FIELDS.get(name)
+        if field is not None and field not in selected:
+            selected[field] = name
+    return selected
+
+
+def _decode_arrow(body, fmt):
+    pa = _pyarrow()
+    buffer = pa.py_buffer(body)
+    try:
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            parquet = pq.ParquetFile(pa.BufferReader(buffer))
+            selected = _wanted(parquet.schema_arrow.names)
+            table = parquet.read(columns=list(selected.values()))
+        else:
+            import pyarrow.ipc as ipc
+            reader = ipc.open_stream(buffer) if fmt == "arrow_stream" else ipc.open_file(buffer)
+            table = reader.read_all()
+            selected = _wanted(table.column_names)
+    except (pa.ArrowException, OSError) as e:
+        raise ValueError(f"Archivo {fmt} inválido: {e}")
+
+    columns = {field: _arrow_to_numpy(pa, table.column(name)) for field, name in selected.items()}
+    return columns, table.num_rows
+
+
+def _arrow_to_numpy(pa, column):
+    arr = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    if pa.types.is_dictionary(arr.type):
+        arr = arr.dictionary_decode()
+    if arr.null_count:
+        # null equivale a null en JSON: se valida valor por valor (mismo mensaje)
+        return np.asarray(arr.to_pylist(), dtype=object)
+    if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+        return arr.to_numpy(zero_copy_only=False).astype(str)
+    if pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type):
+        # Sin nulos y en un chunk: vista sobre el buffer, sin copia
+        return arr.to_numpy(zero_copy_only=False)
+    return np.asarray(arr.to_pylist(), dtype=object)
+
+
+def _decode_npy(body):
+    f = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    except ValueError as e:
+        raise ValueError(f"Archivo .npy inválido: {e}")
+
+    if dtype.names is None or len(shape) != 1:
+        raise ValueError("El .npy debe ser un arreglo estructurado 1-D con columnas nombradas")
+    if dtype.hasobject:
+        raise ValueError("El .npy no puede contener objetos Python")
+    count = shape[0]
+    if len(body) - f.tell() < count * dtype.itemsize:
+        raise ValueError("Archivo .npy truncado")
+
+    data = np.frombuffer(body, dtype=dtype, count=count, offset=f.tell())
+    columns = {}
+    for field, name in _wanted(dtype.names).items():
+        column = data[name]
+        if column.dtype.kind == "S":
+            try:
+                column = np.char.decode(column, "utf-8")
+            except UnicodeDecodeError as e:
+                raise ValueError(f"Columna '{name}' no es UTF-8 válido: {e}")
+        columns[field] = column
+    return columns, count
+
+
+# -----------------------------------------------------------
+# Codificación de resultados (mismo formato que el request)
+# -----------------------------------------------------------
+def result_columns(n_rows, valid_rows, preds, proba, errors):
+    """
+    Columnas de salida (mismos nombres que api/bulk_score.py). En filas
+    inválidas prediction/probabilidades quedan enmascaradas y `error` trae
+    "campo: mensaje; ..."; en las válidas `error` queda enmascarado.
+    """
+    valid = np.zeros(n_rows, dtype=bool)
+    valid[valid_rows] = True
+
+    prediction = np.full(n_rows, -1, dtype=np.int64)
+    prob = np.full((n_rows, 2), np.nan)
+    prediction[valid_rows] = preds
+    prob[valid_rows] = proba
+
+    labels = np.array(["", "Bajo Riesgo", "Alto Riesgo"], dtype=object)
+    error_text = np.full(n_rows, "", dtype=object)
+    for row, row_errors in errors.items():
+        error_text[row] = "; ".join(f"{err['field']}: {err['message']}" for err in row_errors)
+
+    return valid, {
+        "index": np.arange(n_rows, dtype=np.int64),
+        "prediction": prediction,
+        "risk_label": labels[np.where(valid, prediction + 1, 0)],
+        "prob_low_risk": prob[:, 0],
+        "prob_high_risk": prob[:, 1],
+        "error": error_text,
+    }
+
+
+def encode_results(fmt, n_rows, valid_rows, preds, proba, errors, model_version):
+    valid, columns = result_columns(n_rows, valid_rows, preds, proba, errors)
+    if fmt == "npy":
+        return _encode_npy(columns)
+    return _encode_arrow(fmt, valid, columns, model_version)
+
+
+def _encode_npy(columns):
+    # Sin nulos en .npy: prediction=-1 y probabilidades NaN en filas inválidas
+    text_width = {name: max(1, max((len(v) for v in columns[name]), default=1))
+                  for name in ("risk_label", "error")}
+    dtype = np.dtype([
+        ("index", "<i8"), ("prediction", "<i8"),
+        ("risk_label", f"<U{text_width['risk_label']}"),
+        ("prob_low_risk", "<f8"), ("prob_high_risk", "<f8"),
+        ("error", f"<U{text_width['error']}"),
+    ])
+    out = np.empty(len(columns["index"]), dtype=dtype)
+    for name in OUTPUT_COLUMNS:
+        out[name] = columns[name]
+    f = io.BytesIO()
+    np.save(f, out, allow_pickle=False)
+    return f.getvalue()
+
+
+def _encode_arrow(fmt, valid, columns, model_version):
+    pa = _pyarrow()
+    invalid = ~valid
+    table = pa.table({
+        "index": pa.array(columns["index"]),
+        "prediction": pa.array(columns["prediction"], mask=invalid),
+        "risk_label": pa.array(columns["risk_label"], type=pa.string(), mask=invalid),
+        "prob_low_risk": pa.array(columns["prob_low_risk"], mask=invalid),
+        "prob_high_risk": pa.array(columns["prob_high_risk"], mask=invalid),
+        "error": pa.array(columns["error"], type=pa.string(), mask=valid),
+    }).replace_schema_metadata({"model_version": str(model_version)})
+
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink)
+    else:
+        import pyarrow.ipc as ipc
+        new_writer = ipc.new_stream if fmt == "arrow_stream" else ipc.new_file
+        with new_writer(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,383 @@
+# api/compact_forest.py
+"""
+Variantes reducidas del bosque con reporte de paridad frente al original.
+
+Construye, a partir del modelo cargado (exportación .flat o PKL), una
+grilla de variantes combinando:
+
+  - menos árboles: los primeros k del bosque (en un RandomForest los
+    árboles son intercambiables)
+  - profundidad podada: los nodos a profundidad d pasan a ser hojas con la
+    distribución de clases que ya guardaban
+  - float32: umbrales en float32 redondeados hacia abajo y variable de
+    cada nodo en int16. Como X se compara en float32, `x <= t` equivale a
+    `x <= float32_abajo(t)`: las decisiones no cambian. Los índices de
+    nodo quedan en intp: con int32 NumPy los convierte en cada indexación
+    y el recorrido es más lento
+
+Cada variante se mide contra el original sobre un dataset de referencia:
+concordancia de la clase predicha, diferencia de probabilidad de alto
+riesgo, accuracy (si hay etiquetas), latencia de 1 fila y de lote, y
+bytes del bosque. Se elige la variante más concordante que entra en el
+presupuesto de latencia (--latency-budget-ms) o, sin presupuesto, la más
+rápida; en ambos casos solo entre las que alcanzan --min-agreement. La
+elegida se exporta con el mismo formato que api/export_artifacts.py; la
+API la sirve con CARDIAI_COMPACT_MODEL=1 si la concordancia registrada
+alcanza CARDIAI_COMPACT_MIN_AGREEMENT (ver api/registry.py).
+
+Dataset de referencia (--reference): responses.db, .csv o .jsonl con los
+campos de PatientData. Sin referencia se usan filas sintéticas uniformes
+en el rango del scaler (más exigente que el tráfico real).
+
+Uso:
+    python -m api.compact_forest --reference responses.db
+    python -m api.compact_forest --reference pacientes.csv --label-column "Heart Disease Status" \\
+        --trees 100,50,25 --depths 0,12,8 --min-agreement 0.995 --latency-budget-ms 0.5 \\
+        --report compact.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from api.bulk_score import _detect_format, read_records
+from api.forest import FlatForest
+from api.persistence import INPUT_COLUMNS
+from api.pipeline import (COMPACT_SUBDIR, EXPORT_MANIFEST, ScoringPipeline, _source_signature,
+                          pipeline_manifest)
+from api.validation import validate_records
+
+DEFAULT_MIN_AGREEMENT = float(os.getenv("CARDIAI_COMPACT_MIN_AGREEMENT", "0.99"))
+SYNTHETIC_ROWS = 20000
+# Etiquetas de texto habituales en los CSV del dataset
+LABEL_ALIASES = {"yes": 1, "si": 1, "sí": 1, "true": 1, "no": 0, "false": 0}
+
+
+# -----------------------------------------------------------
+# Variantes
+# -----------------------------------------------------------
+def round_down_float32(threshold):
+    """Mayor float32 <= cada umbral (mismas decisiones para X en float32)"""
+    t32 = np.asarray(threshold, dtype=np.float64).astype(np.float32)
+    above = t32.astype(np.float64) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    return t32
+
+
+def node_depths(forest):
+    """Profundidad de cada nodo alcanzable desde una raíz (-1 si no lo es)"""
+    depth = np.full(forest.n_nodes, -1, dtype=np.int64)
+    frontier = np.asarray(forest.roots, dtype=np.intp)
+    level = 0
+    while len(frontier):
+        depth[frontier] = level
+        internal = frontier[forest.left[frontier] != frontier]
+        frontier = np.concatenate([forest.left[internal], forest.right[internal]])
+        level += 1
+    return depth
+
+
+def reduce_forest(forest, n_trees=None, max_depth=None, float32=False):
+    """Bosque con los primeros `n_trees` árboles, podado a `max_depth` y opcionalmente en float32"""
+    n_trees = min(int(n_trees or forest.n_trees), forest.n_trees)
+    end = int(forest.roots[n_trees]) if n_trees < forest.n_trees else forest.n_nodes
+    idx = np.arange(end)
+    depth = node_depths(forest)[:end]
+
+    keep = depth >= 0
+    left = np.array(forest.left[:end], dtype=np.intp)
+    right = np.array(forest.right[:end], dtype=np.intp)
+    feature = np.array(forest.feature[:end], dtype=np.intp)
+    missing_left = np.array(forest.missing_left[:end], dtype=bool)
+    if max_depth:
+        keep &= depth <= max_depth
+        # Los nodos en el corte pasan a ser hojas (apuntan a sí mismos)
+        cut = depth == max_depth
+        left[cut] = idx[cut]
+        right[cut] = idx[cut]
+        feature[cut] = 0
+        missing_left[cut] = False
+
+    # Renumeración: solo los nodos alcanzables, en el mismo orden (árboles contiguos)
+    new_index = np.cumsum(keep) - 1
+    threshold = forest.threshold[:end][keep]
+    if float32:
+        threshold = round_down_float32(threshold)
+        if feature.max(initial=0) > np.iinfo(np.int16).max:
+            raise ValueError("Demasiadas variables para int16")
+    return FlatForest(
+        feature=np.ascontiguousarray(feature[keep], dtype=np.int16 if float32 else np.intp),
+        threshold=np.ascontiguousarray(threshold, dtype=np.float32 if float32 else np.float64),
+        left=np.ascontiguousarray(new_index[left[keep]], dtype=np.intp),
+        right=np.ascontiguousarray(new_index[right[keep]], dtype=np.intp),
+        value=np.ascontiguousarray(forest.value[:end][keep], dtype=np.float64),
+        roots=np.asarray(new_index[np.asarray(forest.roots[:n_trees])], dtype=np.intp),
+        max_depth=int(depth[keep].max()) if keep.any() else 0,
+        classes=np.asarray(forest.classes_),
+        missing_left=np.ascontiguousarray(missing_left[keep]),
+    )
+
+
+def forest_nbytes(forest):
+    return int(sum(np.asarray(getattr(forest, name)).nbytes for name in FlatForest.ARRAYS))
+
+
+def variant_name(n_trees, max_depth, float32):
+    return f"t{n_trees}-d{max_depth or 'full'}-{'f32' if float32 else 'f64'}"
+
+
+# -----------------------------------------------------------
+# Dataset de referencia -> matriz final (N x n_features)
+# -----------------------------------------------------------
+def _read_db(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        columns = ", ".join(column for column, _ in INPUT_COLUMNS)
+        rows = conn.execute(f"SELECT {columns} FROM responses").fetchall()
+    finally:
+        conn.close()
+    return [dict(zip((field for _, field in INPUT_COLUMNS), row)) for row in rows]
+
+
+def _labels(records, valid_rows, column, classes):
+    raw = [records[i].get(column) for i in valid_rows.tolist()]
+    as_class = {str(c).lower(): c for c in classes.tolist()}
+    labels = []
+    for value in raw:
+        key = str(value).strip().lower()
+        if key in as_class:
+            labels.append(as_class[key])
+        elif key in LABEL_ALIASES:
+            labels.append(LABEL_ALIASES[key])
+        else:
+            raise ValueError(f"Etiqueta no reconocida en {column!r}: {value!r}")
+    return np.asarray(labels)
+
+
+def reference_matrix(pipeline, path=None, label_column=None, rows=SYNTHETIC_ROWS, seed=0):
+    """(X, etiquetas o None, descripción) del dataset de referencia"""
+    if path is None:
+        rng = np.random.default_rng(seed)
+        transform = pipeline.transform
+        X = rng.random((rows, len(pipeline.feature_names)))
+        codes = np.asarray(sorted(set(transform.alcohol_mapping.values())), dtype=np.float64)
+        X[:, ~transform.scaled_mask] = rng.choice(codes, size=(rows, int((~transform.scaled_mask).sum())))
+        return X, None, {"source": "synthetic", "rows": rows, "seed": seed}
+
+    ext = os.path.splitext(path)[1].lower()
+    records = _read_db(path) if ext in (".db", ".sqlite", ".sqlite3") else list(read_records(path, _detect_format(path)))
+    batch = validate_records(records)
+    valid_rows = batch.valid_indices
+    if not len(valid_rows):
+        raise ValueError(f"{path} no tiene filas válidas")
+    X, _ = pipeline.transform.transform_columns(batch.columns, valid_rows)
+    labels = _labels(records, valid_rows, label_column, pipeline.classes_) if label_column else None
+    return X, labels, {"source": path, "rows": int(len(valid_rows)), "invalid_rows": len(batch.errors)}
+
+
+# -----------------------------------------------------------
+# Medición
+# -----------------------------------------------------------
+def _single_row_latency(forest, X, repeats, rounds=5):
+    """
+    (p50, p99) en ms de predict_proba de 1 fila. Un request de 1 fila está
+    dominado por el overhead de Python y el ruido de la máquina pesa: el
+    p50 es la mejor mediana de varias rondas
+    """
+    rows = X[np.arange(repeats) % len(X)]
+    for i in range(min(50, repeats)):
+        forest.predict_proba(rows[i:i + 1])
+    times = np.empty(repeats)
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        forest.predict_proba(rows[i:i + 1])
+        times[i] = time.perf_counter() - t0
+    p50 = min(np.median(chunk) for chunk in np.array_split(times, max(1, min(rounds, repeats))))
+    return float(p50 * 1000), float(np.percentile(times, 99) * 1000)
+
+
+def measure(forest, X, baseline_proba, labels=None, repeats=1000):
+    t0 = time.perf_counter()
+    proba = forest.predict_proba(X)
+    batch_seconds = time.perf_counter() - t0
+    classes = forest.classes_
+    preds = classes.take(np.argmax(proba, axis=1))
+    baseline_preds = classes.take(np.argmax(baseline_proba, axis=1))
+    diff = np.abs(proba[:, -1] - baseline_proba[:, -1])
+    p50, p99 = _single_row_latency(forest, X, repeats)
+
+    result = {
+        "n_trees": forest.n_trees,
+        "max_depth": forest.max_depth,
+        "n_nodes": forest.n_nodes,
+        "bytes": forest_nbytes(forest),
+        "agreement": float(np.mean(preds == baseline_preds)),
+        "prob_high_risk_max_abs_diff": float(diff.max()),
+        "prob_high_risk_mean_abs_diff": float(diff.mean()),
+        "latency_1_row_p50_ms": round(p50, 4),
+        "latency_1_row_p99_ms": round(p99, 4),
+        "batch_rows_per_second": round(len(X) / batch_seconds, 1),
+    }
+    if labels is not None:
+        result["accuracy"] = float(np.mean(preds == labels))
+    return result
+
+
+def build_variants(forest, X, labels=None, trees=None, depths=None, precisions=(False, True), repeats=1000):
+    """Mide el original y cada combinación de la grilla; devuelve (baseline, [(nombre, bosque, medición)])"""
+    baseline_proba = forest.predict_proba(X)
+    baseline = measure(forest, X, baseline_proba, labels, repeats)
+    trees = sorted({min(int(t), forest.n_trees) for t in (trees or [forest.n_trees])}, reverse=True)
+    depths = sorted({int(d) for d in (depths or [0])}, key=lambda d: d or forest.max_depth + 1, reverse=True)
+
+    variants = []
+    for n_trees in trees:
+        for max_depth in depths:
+            if max_depth >= forest.max_depth:
+                max_depth = 0
+            for float32 in precisions:
+                name = variant_name(n_trees, max_depth, float32)
+                # El original ya está medido como baseline
+                if (n_trees == forest.n_trees and not max_depth and not float32) or \
+                        any(existing == name for existing, _, _ in variants):
+                    continue
+                reduced = reduce_forest(forest, n_trees, max_depth, float32)
+                variants.append((name, reduced, measure(reduced, X, baseline_proba, labels, repeats)))
+    return baseline, variants
+
+
+def select_variant(variants, min_agreement, latency_budget_ms=None):
+    """
+    Variante a servir: entre las que alcanzan min_agreement, la más
+    concordante dentro del presupuesto de latencia (p50 de 1 fila) o, sin
+    presupuesto, la más rápida. None si ninguna califica.
+    """
+    eligible = [v for v in variants if v[2]["agreement"] >= min_agreement]
+    if latency_budget_ms is not None:
+        eligible = [v for v in eligible if v[2]["latency_1_row_p50_ms"] <= latency_budget_ms]
+        key = lambda v: (-v[2]["agreement"], v[2]["latency_1_row_p50_ms"], v[2]["bytes"])
+    else:
+        key = lambda v: (v[2]["latency_1_row_p50_ms"], v[2]["bytes"], -v[2]["agreement"])
+    return min(eligible, key=key) if eligible else None
+
+
+# -----------------------------------------------------------
+# Exportación de la variante elegida
+# -----------------------------------------------------------
+def export_compact(pipeline, forest, out_dir, compact_info, base_dir="api"):
+    """Bosque + manifiesto (formato de api/export_artifacts.py) con la sección "compact" """
+    metadata = dict(pipeline.metadata)
+    metadata["source_version"] = pipeline.version
+    metadata["compact_variant"] = compact_info["variant"]
+    metadata["version"] = f"{pipeline.version}+{compact_info['variant']}"
+
+    forest.save(out_dir)
+    manifest = pipeline_manifest(pipeline.feature_names, metadata, pipeline.scaler, pipeline.alcohol_encoder)
+    manifest["source"] = _source_signature(base_dir)
+    manifest["compact"] = compact_info
+    with open(os.path.join(out_dir, EXPORT_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Variantes reducidas del bosque con reporte de paridad")
+    parser.add_argument("--artifact-dir", default=os.getenv("CARDIAI_ARTIFACT_DIR", "api"),
+                        help="Directorio con los archivos PKL")
+    parser.add_argument("--export-dir", default=None,
+                        help="Exportación .flat del modelo original (por defecto <artifact-dir>/modelo_rf_final.flat)")
+    parser.add_argument("--reference", default=None,
+                        help="Dataset de referencia: responses.db, .csv o .jsonl (por defecto filas sintéticas)")
+    parser.add_argument("--label-column", default=None, help="Columna con la etiqueta real (accuracy)")
+    parser.add_argument("--synthetic-rows", type=int, default=SYNTHETIC_ROWS)
+    parser.add_argument("--trees", type=_int_list, default=None,
+                        help="Cantidades de árboles, p.ej. 100,50,25 (por defecto n, n/2, n/4, n/10)")
+    parser.add_argument("--depths", type=_int_list, default=None,
+                        help="Profundidades máximas, 0 = sin podar (por defecto 0,16,12,10,8)")
+    parser.add_argument("--min-agreement", type=float, default=DEFAULT_MIN_AGREEMENT,
+                        help="Concordancia mínima con el original para exportar una variante")
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="Latencia máxima (p50, 1 fila) de la variante elegida")
+    parser.add_argument("--repeats", type=int, default=1000, help="Repeticiones para la latencia de 1 fila")
+    parser.add_argument("--out", default=None,
+                        help=f"Directorio de la variante elegida (por defecto <artifact-dir>/{COMPACT_SUBDIR})")
+    parser.add_argument("--report", default=None, help="Guardar el reporte completo en JSON")
+    parser.add_argument("--dry-run", action="store_true", help="Solo medir, sin exportar")
+    args = parser.parse_args(argv)
+
+    export_dir = args.export_dir or os.path.join(args.artifact_dir, "modelo_rf_final.flat")
+    pipeline = ScoringPipeline.from_dir(args.artifact_dir, engine="flat", export_dir=export_dir)
+    forest = pipeline.flat_forest
+    if forest is None:
+        sys.exit("El modelo no se puede convertir al motor plano; no hay variantes posibles")
+
+    X, labels, reference = reference_matrix(pipeline, args.reference, args.label_column, args.synthetic_rows)
+    n = forest.n_trees
+    trees = args.trees or [n, max(1, n // 2), max(1, n // 4), max(1, n // 10)]
+    depths = args.depths if args.depths is not None else [0, 16, 12, 10, 8]
+
+    t0 = time.perf_counter()
+    baseline, variants = build_variants(forest, X, labels, trees, depths, repeats=args.repeats)
+    chosen = select_variant(variants, args.min_agreement, args.latency_budget_ms)
+
+    print(f"Modelo {pipeline.version}: {n} árboles, profundidad {forest.max_depth}, "
+          f"{baseline['bytes'] / 2**20:.2f} MB, 1 fila p50 {baseline['latency_1_row_p50_ms']:.3f} ms")
+    print(f"Referencia: {reference['source']} ({reference['rows']} filas)"
+          + ("" if labels is None else f", accuracy original {baseline['accuracy']:.4f}"))
+    header = f"{'variante':<18} {'árboles':>7} {'prof':>4} {'MB':>7} {'concord.':>9} {'max |Δp|':>9} {'p50 ms':>8} {'filas/s':>11}"
+    if labels is not None:
+        header += f" {'accuracy':>9}"
+    print(header)
+    for name, _, m in variants:
+        line = (f"{name:<18} {m['n_trees']:>7} {m['max_depth']:>4} {m['bytes'] / 2**20:>7.2f} "
+                f"{m['agreement']:>9.4f} {m['prob_high_risk_max_abs_diff']:>9.4f} "
+                f"{m['latency_1_row_p50_ms']:>8.3f} {m['batch_rows_per_second']:>11,.0f}")
+        if labels is not None:
+            line += f" {m['accuracy']:>9.4f}"
+        print(line + ("  <- elegida" if chosen is not None and name == chosen[0] else ""))
+    print(f"({len(variants)} variantes en {time.perf_counter() - t0:.1f}s)")
+
+    report = {
+        "model_version": pipeline.version,
+        "reference": reference,
+        "min_agreement": args.min_agreement,
+        "latency_budget_ms": args.latency_budget_ms,
+        "baseline": baseline,
+        "variants": [{"variant": name, **m} for name, _, m in variants],
+        "chosen": chosen[0] if chosen is not None else None,
+    }
+
+    if chosen is None:
+        print(f"Ninguna variante alcanza concordancia >= {args.min_agreement}"
+              + ("" if args.latency_budget_ms is None else f" con p50 <= {args.latency_budget_ms} ms")
+              + "; no se exporta")
+    elif not args.dry_run:
+        out_dir = args.out or os.path.join(args.artifact_dir, COMPACT_SUBDIR)
+        name, reduced, measured = chosen
+        manifest = export_compact(pipeline, reduced, out_dir, {
+            "variant": name,
+            "min_agreement": args.min_agreement,
+            "reference": reference,
+            "baseline": baseline,
+            **measured,
+        }, base_dir=args.artifact_dir)
+        report["exported"] = out_dir
+        print(f"Exportada {name} en {out_dir} - versión {manifest['metadata']['version']} "
+              f"(servir con CARDIAI_COMPACT_MODEL=1)")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
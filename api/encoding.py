@@ -0,0 +1,96 @@
+# api/encoding.py
+import json
+
+import numpy as np
+from fastapi.responses import Response
+
+# -----------------------------------------------------------
+# Negociación de la codificación de /predict/ y /predict/batch/
+# -----------------------------------------------------------
+# El header Accept elige la codificación y la vista de la respuesta:
+#
+#   Accept: application/json                      respuesta completa (por defecto)
+#   Accept: application/msgpack                   misma respuesta en MessagePack
+#   Accept: application/json; view=compact        solo predicción y probabilidad
+#   Accept: application/msgpack; view=compact     de alto riesgo, en arreglos paralelos
+#
+# Sin Accept, con */* o con un tipo que no se puede servir se responde el
+# JSON completo de siempre: los clientes existentes no ven ningún cambio.
+# El JSON se serializa con orjson (mismo documento que el encoder de
+# Starlette, varias veces más rápido y sin pasar por jsonable_encoder).
+# orjson y msgpack están en requirements.txt; en una instalación mínima sin
+# ellos el JSON usa el encoder estándar y MessagePack no se ofrece.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+JSON_ALIASES = ("application/json", "application/*", "*/*")
+COMPACT_VIEW = "compact"
+
+
+def _media_ranges(accept):
+    """[(tipo, parámetros)] del header Accept, de mayor a menor q (estable)"""
+    ranges = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        if not media_type:
+            continue
+        options = {}
+        for param in params:
+            key, _, value = param.partition("=")
+            options[key.strip().lower()] = value.strip().strip('"').lower()
+        try:
+            q = float(options.pop("q", "1"))
+        except ValueError:
+            q = 1.0
+        if q > 0:
+            ranges.append((-q, position, media_type.lower(), options))
+    return [(media_type, options) for _, _, media_type, options in sorted(ranges)]
+
+
+def negotiate(accept):
+    """(media type de la respuesta, vista compacta?) para un header Accept"""
+    for media_type, options in _media_ranges(accept or ""):
+        compact = options.get("view") == COMPACT_VIEW
+        if media_type in MSGPACK_ALIASES and msgpack is not None:
+            return MSGPACK_MEDIA_TYPE, compact
+        if media_type in JSON_ALIASES:
+            return JSON_MEDIA_TYPE, compact
+    return JSON_MEDIA_TYPE, False
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def render(content, media_type=JSON_MEDIA_TYPE):
+    """Bytes de `content` en la codificación negociada"""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(content, use_bin_type=True, default=_msgpack_default)
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    # Mismos parámetros que JSONResponse de Starlette
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def encoded_response(content, media_type=JSON_MEDIA_TYPE, headers=None):
+    # Vary: la misma URL responde distinto según Accept (cachés intermedias)
+    return Response(
+        content=render(content, media_type),
+        media_type=media_type,
+        headers={"Vary": "Accept", **(headers or {})}
+    )
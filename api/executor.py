@@ -0,0 +1,282 @@
+# api/executor.py
+import multiprocessing
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from api.shared import attach_pipeline, publish_pipeline
+
+# -----------------------------------------------------------
+# Ejecutor de inferencia en procesos con control de admisión
+# -----------------------------------------------------------
+# /predict/ evalúa el bosque en el threadpool de Starlette: los hilos
+# compiten por el GIL y, bajo sobrecarga, la cola crece sin límite hasta
+# que todos los requests vencen juntos. Con este ejecutor:
+#
+#   - El bosque se evalúa en un pool de procesos (un núcleo por worker).
+#     El pipeline activo se publica en memoria compartida (api/shared.py);
+#     los workers se adjuntan por nombre, sin copiar ni deserializar el
+#     modelo. Una recarga en caliente publica un segmento nuevo.
+#   - Admisión acotada: como máximo `max_pending` requests admitidos a la
+#     vez. Si la cola está llena se rechaza al instante (429); si la espera
+#     estimada ya supera el plazo del request también (503).
+#   - Plazo por request: el worker descarta tareas vencidas sin evaluarlas
+#     y quien espera deja de hacerlo al vencer el plazo (503).
+#
+# Los rechazos ocurren en el event loop, antes de ocupar un hilo.
+
+# Segmentos publicados que se conservan (activo + anterior para rollback).
+# Uno más viejo se retira, pero no se borra mientras algún request en curso
+# lo use: un worker puede adjuntarse recién al tomar la tarea
+KEEP_SEGMENTS = 2
+
+
+class Overloaded(Exception):
+    """Request rechazado por sobrecarga: status HTTP (429/503), motivo y Retry-After"""
+
+    def __init__(self, status_code, reason, message, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """La tarea llegó al worker con el plazo ya vencido"""
+
+
+# -----------------------------------------------------------
+# Lado worker
+# -----------------------------------------------------------
+_worker_pipelines = {}
+
+
+def _warm_worker():
+    return multiprocessing.current_process().pid
+
+
+def _score(segment, final_input, deadline):
+    if time.time() > deadline:
+        raise DeadlineExceeded(segment)
+    pipeline = _worker_pipelines.get(segment)
+    if pipeline is None:
+        if len(_worker_pipelines) >= KEEP_SEGMENTS:
+            _worker_pipelines.pop(next(iter(_worker_pipelines)))
+        pipeline = _worker_pipelines[segment] = attach_pipeline(segment)
+    t0 = time.perf_counter()
+    preds, proba = pipeline.run_model(final_input)
+    return preds, proba, time.perf_counter() - t0
+
+
+# -----------------------------------------------------------
+# Lado servidor
+# -----------------------------------------------------------
+class Ticket:
+    """Lugar admitido en la cola; se libera al terminar el request"""
+    __slots__ = ("executor", "deadline", "_released")
+
+    def __init__(self, executor, deadline):
+        self.executor = executor
+        self.deadline = deadline
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.executor._release()
+
+
+class InferenceExecutor:
+    def __init__(self, workers=2, max_pending=None, deadline_ms=1000.0):
+        self.workers = max(1, int(workers))
+        self.max_pending = int(max_pending or self.workers * 8)
+        self.deadline = max(0.001, float(deadline_ms) / 1000.0)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = {"queue_full": 0, "deadline_estimate": 0, "deadline_expired": 0, "worker_restart": 0,
+                         "segment_gone": 0}
+        # Promedio móvil del tiempo de evaluación en el worker (s)
+        self.service_seconds = 0.0
+        self._pool = None
+        self._segments = []  # [(pipeline, nombre, SharedMemory propio o None)]
+        self._retired = {}  # nombre -> SharedMemory propio, retirado pero todavía en uso
+        self._in_use = {}  # nombre -> tareas en curso que lo usan
+        self._lock = threading.Lock()
+
+    def start(self, pipeline=None):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._new_pool()
+        if pipeline is not None:
+            self.publish(pipeline)
+        # Levanta los procesos antes del primer request
+        for future in [self._pool.submit(_warm_worker) for _ in range(self.workers)]:
+            future.result()
+
+    def _new_pool(self):
+        # spawn: los workers no heredan hilos ni estado del servidor
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def stop(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            segments, self._segments = self._segments, []
+            retired, self._retired = self._retired, {}
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        for _, _, shm in segments:
+            self._unlink(shm)
+        for shm in retired.values():
+            self._unlink(shm)
+
+    @staticmethod
+    def _unlink(shm):
+        if shm is None:
+            return
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    # -------------------------------------------------------
+    # Publicación del pipeline (llamado al activar/recargar)
+    # -------------------------------------------------------
+    def publish(self, pipeline, acquire=False):
+        """
+        Nombre del segmento de `pipeline` (lo publica si hace falta). Con
+        acquire=True además lo marca en uso hasta _release_segment
+        """
+        with self._lock:
+            for published, name, _ in self._segments:
+                if published is pipeline:
+                    if acquire:
+                        self._in_use[name] = self._in_use.get(name, 0) + 1
+                    return name
+            attached = getattr(pipeline, "shared_memory", None)
+            if attached is not None:
+                # Ya vive en memoria compartida (api/serve.py): se reutiliza
+                shm, name = None, attached.name
+            else:
+                shm = publish_pipeline(pipeline)
+                name = shm.name
+            self._segments.append((pipeline, name, shm))
+            if acquire:
+                self._in_use[name] = self._in_use.get(name, 0) + 1
+            stale = []
+            for _, old_name, old in self._segments[:-KEEP_SEGMENTS]:
+                if self._in_use.get(old_name):
+                    self._retired[old_name] = old
+                else:
+                    stale.append(old)
+            del self._segments[:-KEEP_SEGMENTS]
+        for old in stale:
+            self._unlink(old)
+        return name
+
+    def _release_segment(self, name):
+        with self._lock:
+            count = self._in_use.get(name, 0) - 1
+            if count > 0:
+                self._in_use[name] = count
+                return
+            self._in_use.pop(name, None)
+            retired = self._retired.pop(name, None)
+        self._unlink(retired)
+
+    # -------------------------------------------------------
+    # Admisión
+    # -------------------------------------------------------
+    def admit(self):
+        """Reserva un lugar o lanza Overloaded sin esperar"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected["queue_full"] += 1
+                raise Overloaded(429, "queue_full", "Demasiadas solicitudes en cola de inferencia",
+                                 self._retry_after())
+            expected = (self.pending // self.workers + 1) * self.service_seconds
+            if expected > self.deadline:
+                self.rejected["deadline_estimate"] += 1
+                raise Overloaded(503, "deadline_estimate", "La espera estimada supera el plazo del request",
+                                 self._retry_after())
+            self.pending += 1
+        return Ticket(self, time.time() + self.deadline)
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def _retry_after(self):
+        # Segundos enteros para el header Retry-After
+        return max(1, int(self.pending * self.service_seconds / self.workers + 0.999))
+
+    # -------------------------------------------------------
+    # Evaluación
+    # -------------------------------------------------------
+    def run(self, final_input, pipeline, ticket):
+        """(predicciones, probabilidades) evaluadas en un worker antes del plazo del ticket"""
+        segment = self.publish(pipeline, acquire=True)
+        try:
+            remaining = ticket.deadline - time.time()
+            if remaining <= 0:
+                self._expired()
+            pool = self._pool
+            if pool is None:
+                raise RuntimeError("Ejecutor de inferencia detenido")
+
+            try:
+                future = pool.submit(_score, segment, final_input, ticket.deadline)
+                preds, proba, service = future.result(timeout=remaining)
+            except FutureTimeout:
+                future.cancel()
+                self._expired()
+            except DeadlineExceeded:
+                self._expired()
+            except FileNotFoundError:
+                # El segmento se borró antes de que el worker se adjuntara
+                # (p.ej. una tarea vencida que igual llegó a ejecutarse)
+                with self._lock:
+                    self.rejected["segment_gone"] += 1
+                raise Overloaded(503, "segment_gone", "Modelo recargado durante la inferencia")
+            except BrokenProcessPool:
+                self._restart(pool)
+                with self._lock:
+                    self.rejected["worker_restart"] += 1
+                raise Overloaded(503, "worker_restart", "Worker de inferencia reiniciado")
+        finally:
+            self._release_segment(segment)
+
+        with self._lock:
+            self.completed += 1
+            self.service_seconds = service if self.completed == 1 else 0.8 * self.service_seconds + 0.2 * service
+        return preds, proba
+
+    def _expired(self):
+        with self._lock:
+            self.rejected["deadline_expired"] += 1
+        raise Overloaded(503, "deadline_expired", "Plazo de inferencia vencido", self._retry_after())
+
+    def _restart(self, broken):
+        with self._lock:
+            if self._pool is not broken:
+                return
+            self._pool = self._new_pool()
+        warnings.warn("Pool de inferencia roto (un worker terminó); se reinició")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "deadline_ms": self.deadline * 1000.0,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": dict(self.rejected),
+            "avg_service_ms": round(self.service_seconds * 1000.0, 3),
+            "segments": [name for _, name, _ in self._segments],
+            "retired_segments": list(self._retired),
+        }
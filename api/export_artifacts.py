@@ -0,0 +1,38 @@
+# api/export_artifacts.py
+"""
+Exporta el pipeline a un formato mapeable en memoria para arranque rápido.
+
+Genera un directorio con los arreglos del bosque (.npy) y un manifiesto
+JSON con feature_names, metadata, parámetros del MinMaxScaler y el mapeo
+de alcohol. La API lo usa automáticamente (CARDIAI_EXPORT_DIR) si
+corresponde al modelo_rf_final.pkl actual.
+
+Uso:
+    python -m api.export_artifacts
+    python -m api.export_artifacts --artifact-dir api --out api/modelo_rf_final.flat
+"""
+import argparse
+import os
+import time
+
+from api.pipeline import export_pipeline
+
+DEFAULT_EXPORT_DIR = os.path.join("api", "modelo_rf_final.flat")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta el modelo a arreglos mapeables en memoria")
+    parser.add_argument("--artifact-dir", default=os.getenv("CARDIAI_ARTIFACT_DIR", "api"),
+                        help="Directorio con los archivos PKL")
+    parser.add_argument("--out", default=os.getenv("CARDIAI_EXPORT_DIR", DEFAULT_EXPORT_DIR),
+                        help="Directorio de salida")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    manifest = export_pipeline(args.out, base_dir=args.artifact_dir)
+    print(f"Exportado en {args.out} ({time.perf_counter() - t0:.2f}s) - "
+          f"versión {manifest['metadata'].get('version', 'unknown')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# api/forest.py
+import json
+import os
+
+import numpy as np
+
+# -----------------------------------------------------------
+# Motor de inferencia "plano" para RandomForest
+# -----------------------------------------------------------
+# Todos los árboles del bosque se empaquetan en arreglos NumPy contiguos
+# (feature, threshold, left, right, leaf value) con índices globales de nodo.
+# Las hojas apuntan a sí mismas, así que basta con iterar max_depth veces
+# para que todas las filas x árboles lleguen a su hoja en una sola pasada
+# (las que ya llegaron se van descartando, ver apply).
+#
+# Reproduce exactamente la aritmética de sklearn:
+#   - X se convierte a float32 antes de comparar (igual que DTYPE de sklearn)
+#   - el umbral se compara en float64 (promoción implícita)
+#   - NaN baja por el hijo que indica missing_go_to_left de cada nodo
+#   - la probabilidad de cada hoja es value / value.sum()
+#   - las probabilidades se acumulan árbol por árbol y se dividen por n_trees
+
+
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes, missing_left=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        # Modelos de sklearn < 1.3 no tienen missing_go_to_left: NaN va a la derecha
+        self.missing_left = np.zeros(len(feature), dtype=bool) if missing_left is None else missing_left
+        # (diferencias de valor por nodo, variable del padre) para las
+        # contribuciones; se calculan al pedir la primera explicación
+        self._contribution_arrays = None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Construye el motor a partir de un RandomForestClassifier entrenado"""
+        estimators = getattr(model, "estimators_", None)
+        if not estimators:
+            raise ValueError("El modelo no es un bosque entrenado (sin estimators_)")
+
+        features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for est in estimators:
+            tree = est.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Solo se soportan modelos de una salida")
+
+            n = tree.node_count
+            idx = np.arange(n, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # Hojas: apuntan a sí mismas y comparan contra la feature 0
+            left = np.where(is_leaf, idx, tree.children_left) + offset
+            right = np.where(is_leaf, idx, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+            missing_left = getattr(tree, "missing_go_to_left", None)
+            missing_left = np.zeros(n, dtype=bool) if missing_left is None else (missing_left != 0) & ~is_leaf
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value / normalizer)
+            missing.append(missing_left)
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            missing_left=np.ascontiguousarray(np.concatenate(missing), dtype=bool),
+        )
+
+    # -------------------------------------------------------
+    # Exportación a disco (arreglos .npy mapeables en memoria)
+    # -------------------------------------------------------
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "classes_", "missing_left")
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name.rstrip('_')}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, "forest.json"), "w") as f:
+            json.dump({"max_depth": self.max_depth, "n_trees": self.n_trees, "n_nodes": self.n_nodes}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Carga un bosque exportado. Con mmap=True los arreglos se mapean en
+        modo solo lectura: el arranque es inmediato y las páginas se
+        comparten entre procesos a través del page cache del SO.
+        """
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name.rstrip('_')}.npy"), mmap_mode=mode)
+            for name in cls.ARRAYS
+        }
+        with open(os.path.join(directory, "forest.json")) as f:
+            info = json.load(f)
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            value=arrays["value"],
+            roots=np.asarray(arrays["roots"]),
+            max_depth=info["max_depth"],
+            classes=np.asarray(arrays["classes_"]),
+            missing_left=arrays["missing_left"],
+        )
+
+    @staticmethod
+    def _flat_input(X):
+        """
+        X en float32 aplanado por filas, si contiene NaN y su forma. Como
+        sklearn, rechaza infinitos (incluidos valores que desbordan float32)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        flat_x = np.ascontiguousarray(X).ravel()
+        has_nan = False
+        if not np.isfinite(flat_x).all():
+            if np.isinf(flat_x).any():
+                raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+            has_nan = True
+        return flat_x, has_nan, X.shape[0], X.shape[1]
+
+    def _go_left(self, flat_x, row_offset, node, has_nan):
+        """Dirección de un paso para cada posición activa (NaN según missing_left)"""
+        x = flat_x[row_offset + self.feature[node]]
+        go_left = x <= self.threshold[node]
+        if has_nan:
+            go_left |= np.isnan(x) & self.missing_left[node]
+        return go_left
+
+    # Cada cuántos niveles se descartan las posiciones que ya llegaron a su hoja
+    COMPACT_EVERY = 4
+
+    def apply(self, X):
+        """Índice global de la hoja alcanzada por cada fila en cada árbol (N x n_trees)"""
+        flat_x, has_nan, n_rows, n_features = self._flat_input(X)
+        n_trees = self.n_trees
+
+        # Posiciones fila x árbol aplanadas; X se indexa con offset de fila + feature
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(0, n_rows * n_features, n_features), n_trees)
+
+        # Con árboles profundos la mayoría de las posiciones llega a su hoja
+        # mucho antes de max_depth: cada COMPACT_EVERY niveles se guardan las
+        # que terminaron y se sigue solo con las activas
+        out = None
+        pos = None
+        for level in range(self.max_depth):
+            go_left = self._go_left(flat_x, row_offset, node, has_nan)
+            node = np.where(go_left, self.left[node], self.right[node])
+
+            if level % self.COMPACT_EVERY == self.COMPACT_EVERY - 1 and level + 1 < self.max_depth:
+                active = self.left[node] != node
+                if active.all():
+                    continue
+                if out is None:
+                    out = node.copy()
+                    pos = np.flatnonzero(active)
+                else:
+                    out[pos] = node
+                    pos = pos[active]
+                node = node[active]
+                row_offset = row_offset[active]
+                if not len(node):
+                    break
+
+        if out is None:
+            out = node
+        else:
+            out[pos] = node
+        return out.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # Suma secuencial sobre el eje de árboles, igual que el += de sklearn
+        proba = self.value[leaves.T].sum(axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+    # -------------------------------------------------------
+    # Contribuciones por variable (recorrido de caminos de decisión)
+    # -------------------------------------------------------
+    # Cada nodo guarda la distribución de clases de sus muestras. Al bajar
+    # de un nodo a su hijo la probabilidad cambia en value[hijo] - value[padre],
+    # y ese cambio se atribuye a la variable que usó el padre para dividir.
+    # Por árbol: probabilidad de la hoja = valor de la raíz + suma de cambios
+    # del camino. Promediado sobre los árboles:
+    #
+    #     predict_proba(x) = bias + contribuciones(x).sum(variables)
+    #
+    # Las diferencias por nodo (n_nodes x n_classes, del tamaño de value) se
+    # calculan la primera vez que se pide una explicación, no al cargar: así
+    # los workers que solo predicen no duplican memoria privada junto a un
+    # bosque mapeado o compartido. Después una explicación cuesta un
+    # recorrido de los árboles, como una predicción.
+
+    def prepare_contributions(self):
+        arrays = self._contribution_arrays
+        if arrays is None:
+            n = self.n_nodes
+            internal = np.flatnonzero(self.left != np.arange(n))
+            # Las raíces quedan como su propio padre: diferencia 0
+            parent = np.arange(n)
+            parent[self.left[internal]] = internal
+            parent[self.right[internal]] = internal
+            # Una sola asignación: dos requests concurrentes a lo sumo lo calculan dos veces
+            arrays = (np.ascontiguousarray(self.value - self.value[parent]),
+                      np.ascontiguousarray(self.feature[parent]))
+            self._contribution_arrays = arrays
+        return arrays
+
+    def contributions(self, X):
+        """
+        (bias, contribuciones): bias (n_classes,) es el valor medio de las
+        raíces y contribuciones (N x n_features x n_classes) el aporte de cada
+        variable a predict_proba de cada fila.
+        """
+        delta, split_feature = self.prepare_contributions()
+        flat_x, has_nan, n_rows, n_features = self._flat_input(X)
+        n_classes = self.value.shape[1]
+
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(0, n_rows * n_features, n_features), self.n_trees)
+        # (posición fila x variable, nodo hijo) de cada paso; se suman al final
+        slots, children = [], []
+
+        for _ in range(self.max_depth):
+            go_left = self._go_left(flat_x, row_offset, node, has_nan)
+            child = np.where(go_left, self.left[node], self.right[node])
+            # Las hojas apuntan a sí mismas: solo cuentan los pasos reales
+            moved = child != node
+            if not moved.all():
+                child = child[moved]
+                row_offset = row_offset[moved]
+                if not len(child):
+                    break
+            slots.append(row_offset + split_feature[child])
+            children.append(child)
+            node = child
+
+        contributions = np.zeros((n_rows * n_features, n_classes))
+        if slots:
+            slot = np.concatenate(slots)
+            step_delta = delta[np.concatenate(children)]
+            for c in range(n_classes):
+                contributions[:, c] = np.bincount(slot, weights=step_delta[:, c], minlength=n_rows * n_features)
+        bias = self.value[self.roots].mean(axis=0)
+        contributions = contributions.reshape(n_rows, n_features, n_classes) / self.n_trees
+        return bias, contributions
+
+
+def check_parity(forest, model, n_features, n_rows=256, seed=0):
+    """
+    Compara el motor plano contra sklearn sobre filas aleatorias en [0, 1]
+    (el rango de salida del MinMaxScaler) con NaN y valores fuera de rango:
+    mismas probabilidades y mismas hojas, y ambos deben rechazar infinitos.
+    Devuelve True si coinciden.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, n_features))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[rng.random(X.shape) < 0.02] = 1e6
+    X[rng.random(X.shape) < 0.02] = -1e6
+    expected = model.predict_proba(X)
+    got = forest.predict_proba(X)
+    if not np.allclose(expected, got, rtol=0, atol=1e-12):
+        return False
+    # Misma hoja en cada árbol (apply descarta posiciones terminadas a mitad de camino)
+    if not np.array_equal(forest.apply(X), model.apply(X) + np.asarray(forest.roots)):
+        return False
+
+    X_inf = X[:4].copy()
+    X_inf[0, 0] = np.inf
+    X_inf[1, -1] = -np.inf
+    for predict_proba in (model.predict_proba, forest.predict_proba):
+        try:
+            predict_proba(X_inf)
+        except ValueError:
+            continue
+        return False
+    return True
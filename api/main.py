@@ -1,101 +1,378 @@
 # api/main.py
-import pickle
+import hmac
+import json
+import os
+import tempfile
+import time
+import warnings
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
 import numpy as np
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field, field_validator
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from api.analytics import risk_summary
+from api.batcher import BatcherUnavailable, MicroBatcher
+from api.cache import PredictionCache
+from api.columnar import (MEDIA_TYPES, RESPONSE_MEDIA_TYPES, UnsupportedFormat,
+                          decode_columns, encode_results)
+from api.encoding import encoded_response, negotiate
+from api.executor import InferenceExecutor, Overloaded
+from api.metrics import (CONTENT_TYPE, CallbackMetric, Counter, Gauge, Histogram,
+                         MetricsMiddleware, MetricsRegistry)
+from api.persistence import DEFAULT_DB_PATH, INPUT_COLUMNS, PredictionWriter
+from api.pipeline import COMPACT_SUBDIR
+from api.registry import ModelRegistry
+from api.preprocessing import SCALER_COLUMN_ORDER, SCALER_FIELD_MAP
+from api.schemas import BatchPatientData, PatientData
+from api.shared import attach_pipeline
+from api.validation import validate_columns, validate_records
+
+# -----------------------------------------------------------
+# Configuración (variables de entorno)
+# -----------------------------------------------------------
+# Directorio con modelo_rf_final.pkl, minmax_scaler.pkl y alcohol_manual_encoder.pkl
+ARTIFACT_DIR = os.getenv("CARDIAI_ARTIFACT_DIR", "api")
+# Exportación mapeable en memoria del bosque (python -m api.export_artifacts)
+EXPORT_DIR = os.getenv("CARDIAI_EXPORT_DIR", os.path.join(ARTIFACT_DIR, "modelo_rf_final.flat"))
+# Variante reducida del bosque (python -m api.compact_forest): se sirve solo
+# si está habilitada y su concordancia con el original alcanza el mínimo.
+# En modo versionado se busca en <versión>/modelo_rf_final.compact
+COMPACT_MODEL = os.getenv("CARDIAI_COMPACT_MODEL", "0").strip().lower() in ("1", "true", "yes")
+COMPACT_MODEL_DIR = os.getenv("CARDIAI_COMPACT_MODEL_DIR", os.path.join(ARTIFACT_DIR, COMPACT_SUBDIR))
+COMPACT_MIN_AGREEMENT = float(os.getenv("CARDIAI_COMPACT_MIN_AGREEMENT", "0.99"))
+# Registro versionado de modelos: un subdirectorio por versión con los tres PKL.
+# Si no se define se usa ARTIFACT_DIR (recarga en el mismo lugar)
+MODEL_REGISTRY_DIR = os.getenv("CARDIAI_MODEL_REGISTRY_DIR") or None
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("CARDIAI_MODEL_REGISTRY_POLL_SECONDS", "0"))
+# Token para /admin/* (header X-Admin-Token); sin token los endpoints quedan deshabilitados
+ADMIN_TOKEN = os.getenv("CARDIAI_ADMIN_TOKEN", "")
+# Segmento de memoria compartida publicado por `python -m api.serve`: si está
+# definido, el worker se adjunta al bosque del padre en vez de cargar los PKL
+SHARED_MODEL = os.getenv("CARDIAI_SHARED_MODEL") or None
+# Motor de inferencia: "flat" (arreglos NumPy, una sola pasada) o "sklearn"
+INFERENCE_ENGINE = os.getenv("CARDIAI_INFERENCE_ENGINE", "flat").strip().lower()
+# Caché de predicciones: tamaño máximo (0 = deshabilitada) y TTL en segundos (0 = sin TTL)
+PREDICTION_CACHE_SIZE = int(os.getenv("CARDIAI_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("CARDIAI_CACHE_TTL", "0"))
+# Micro-batching de /predict/ (opt-in): ventana máxima de espera y filas por lote
+MICROBATCH_ENABLED = os.getenv("CARDIAI_MICROBATCH", "0").strip().lower() in ("1", "true", "yes")
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("CARDIAI_MICROBATCH_MAX_WAIT_MS", "2"))
+MICROBATCH_MAX_SIZE = int(os.getenv("CARDIAI_MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_TIMEOUT_S = float(os.getenv("CARDIAI_MICROBATCH_TIMEOUT_S", "30"))
+# Ejecutor de inferencia en procesos para /predict/ (opt-in, 0 = deshabilitado):
+# workers, requests admitidos a la vez (por defecto 8 por worker) y plazo por request
+EXECUTOR_WORKERS = int(os.getenv("CARDIAI_EXECUTOR_WORKERS", "0"))
+EXECUTOR_MAX_PENDING = int(os.getenv("CARDIAI_EXECUTOR_MAX_PENDING", "0"))
+EXECUTOR_DEADLINE_MS = float(os.getenv("CARDIAI_EXECUTOR_DEADLINE_MS", "1000"))
+# Streaming NDJSON: filas por bloque, tamaño máximo de una línea, bytes
+# del upload que se mantienen en memoria antes de pasar a disco y tamaño
+# máximo del upload
+STREAM_CHUNK_SIZE = int(os.getenv("CARDIAI_STREAM_CHUNK_SIZE", "512"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("CARDIAI_STREAM_MAX_LINE_BYTES", "65536"))
+STREAM_SPOOL_BYTES = int(os.getenv("CARDIAI_STREAM_SPOOL_BYTES", str(1024 * 1024)))
+STREAM_MAX_BYTES = int(os.getenv("CARDIAI_STREAM_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Tamaño máximo del body en /predict/columnar/ (Arrow, Parquet, .npy)
+COLUMNAR_MAX_BYTES = int(os.getenv("CARDIAI_COLUMNAR_MAX_BYTES", str(256 * 1024 * 1024)))
+# Persistencia write-behind de predicciones en responses.db
+PERSIST_ENABLED = os.getenv("CARDIAI_PERSIST", "1").strip().lower() in ("1", "true", "yes")
+PERSIST_DB_PATH = os.getenv("CARDIAI_DB_PATH", DEFAULT_DB_PATH)
+PERSIST_QUEUE_SIZE = int(os.getenv("CARDIAI_PERSIST_QUEUE_SIZE", "10000"))
+PERSIST_BATCH_SIZE = int(os.getenv("CARDIAI_PERSIST_BATCH_SIZE", "500"))
+PERSIST_FLUSH_INTERVAL = float(os.getenv("CARDIAI_PERSIST_FLUSH_INTERVAL", "1.0"))
+PERSIST_DROP_POLICY = os.getenv("CARDIAI_PERSIST_DROP_POLICY", "drop_new").strip().lower()
 
 # -----------------------------------------------------------
 # Cargar archivos PKL (modelo, scaler, encoder)
 # -----------------------------------------------------------
+# El pipeline precalcula la transformación fusionada (alcohol + scaler +
+# orden del modelo, ver api/preprocessing.py) y el motor de inferencia
+# Si existe una exportación vigente (EXPORT_DIR) se mapea en memoria en
+# lugar de deserializar el RandomForest: arranque casi inmediato y páginas
+# compartidas entre workers vía page cache
+# El registro de modelos mantiene el pipeline activo y permite recargarlo
+# en caliente (ver api/registry.py). Con varios workers lanzados por
+# api/serve.py el bosque se lee de memoria compartida (ver api/shared.py);
+# una recarga posterior carga una copia privada en ese worker
+_load_started = time.perf_counter()
+registry = ModelRegistry(
+    default_dir=ARTIFACT_DIR,
+    root=MODEL_REGISTRY_DIR,
+    engine=INFERENCE_ENGINE,
+    export_dir=EXPORT_DIR,
+    poll_seconds=MODEL_REGISTRY_POLL_SECONDS,
+    compact=COMPACT_MODEL,
+    compact_dir=COMPACT_MODEL_DIR,
+    min_agreement=COMPACT_MIN_AGREEMENT
+)
 try:
-    with open("api/modelo_rf_final.pkl", "rb") as f:
-        modelo_pkl = pickle.load(f)
-    model = modelo_pkl["model"]
-    feature_names = modelo_pkl["feature_names"]
+    if SHARED_MODEL:
+        registry.install(attach_pipeline(SHARED_MODEL, base_dir=ARTIFACT_DIR))
+    else:
+        registry.activate()
+except Exception as e:
+    raise RuntimeError(f"Error cargando los modelos/encoders PKL: {e}")
+STARTUP_SECONDS = time.perf_counter() - _load_started
+first_prediction_seconds = None
 
-    with open("api/minmax_scaler.pkl", "rb") as f:
-        scaler = pickle.load(f)
 
-    with open("api/alcohol_manual_encoder.pkl", "rb") as f:
-        alcohol_encoder = pickle.load(f)
+def cache_tag(pipeline):
+    # Versión + id de carga: una recarga de la misma versión también invalida
+    return f"{pipeline.version}#{pipeline.load_id}"
 
-except Exception as e:
-    raise RuntimeError(f"Error cargando los modelos/encoders PKL: {e}")
+
+prediction_cache = PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+prediction_cache.set_model_version(cache_tag(registry.active))
+registry.add_listener(lambda p: prediction_cache.set_model_version(cache_tag(p)))
+
+prediction_writer = None
+if PERSIST_ENABLED:
+    prediction_writer = PredictionWriter(
+        db_path=PERSIST_DB_PATH,
+        max_queue=PERSIST_QUEUE_SIZE,
+        batch_size=PERSIST_BATCH_SIZE,
+        flush_interval=PERSIST_FLUSH_INTERVAL,
+        drop_policy=PERSIST_DROP_POLICY
+    )
 
 # -----------------------------------------------------------
-# Orden de las columnas que espera el scaler
-# IMPORTANTE: El scaler fue entrenado con estas 9 variables en este orden específico
+# Helpers del pipeline
 # -----------------------------------------------------------
-SCALER_COLUMN_ORDER = [
-    'Age', 'Blood Pressure', 'Cholesterol Level', 'BMI',
-    'Sleep Hours', 'Triglyceride Level', 'Fasting Blood Sugar',
-    'CRP Level', 'Homocysteine Level'
-]
+def run_model(final_input, pipeline=None):
+    """Ejecuta el motor de inferencia configurado: (predicciones, probabilidades)"""
+    result = (pipeline or registry.active).run_model(final_input)
+    _mark_first_prediction()
+    return result
+
+
+def _mark_first_prediction():
+    """Registra el tiempo hasta la primera predicción (lo usan todos los caminos de evaluación)"""
+    global first_prediction_seconds
+    if first_prediction_seconds is None:
+        first_prediction_seconds = time.perf_counter() - _load_started
+
+
+def _row_error(index, exc):
+    """Resultado de error para una fila (validación o parseo)"""
+    if isinstance(exc, ValidationError):
+        errors = [
+            {"field": ".".join(str(loc) for loc in err["loc"]), "message": err["msg"]}
+            for err in exc.errors()
+        ]
+    else:
+        errors = [{"field": "", "message": str(exc)}]
+    return {"index": index, "error": errors}
+
+
+def _score_valid(records):
+    """
+    Validación columnar + evaluación de las filas válidas de un lote:
+    (pipeline, lote validado, filas válidas, predicciones, probabilidades,
+    alcohol codificado). Sin filas válidas los tres últimos son None.
+    """
+    pipeline = registry.active
+    t0 = time.perf_counter()
+    batch = validate_records(records)
+    t1 = time.perf_counter()
+    STAGE_VALIDATION.observe(t1 - t0)
+
+    valid_rows = batch.valid_indices
+    preds = proba = alcohol_values = None
+    if len(valid_rows):
+        preds, proba, alcohol_values = pipeline.score_columns(batch.columns, valid_rows)
+        STAGE_BATCH_SCORING.observe(time.perf_counter() - t1)
+        _record_batch(batch, valid_rows, preds, proba, pipeline)
+    return pipeline, batch, valid_rows, preds, proba, alcohol_values
+
+
+def score_records(records, start=0):
+    """
+    Valida y evalúa una lista de registros crudos (dicts).
+
+    La validación es columnar (api/validation.py): mismas reglas y mensajes
+    que PatientData, sin crear un objeto por fila. Las filas válidas se
+    evalúan juntas como una sola matriz. Un registro que ya es una excepción
+    (p.ej. JSON inválido) se reporta como error. Los índices empiezan en `start`.
+    """
+    pipeline, batch, valid_rows, preds, proba, alcohol_values = _score_valid(records)
+    results = [None] * len(records)
+    for j, errors in batch.errors.items():
+        raw = records[j]
+        results[j] = _row_error(start + j, raw) if isinstance(raw, Exception) else {"index": start + j, "error": errors}
+
+    if preds is not None:
+        for j, pred, p, alcohol_value in zip(
+            valid_rows.tolist(), preds.tolist(), proba.tolist(), alcohol_values.tolist()
+        ):
+            results[j] = {
+                "index": start + j,
+                **format_prediction(int(pred), p, alcohol_value, pipeline)
+            }
+
+    return results
+
+
+def score_records_compact(records):
+    """
+    Como score_records, en la vista compacta: predicción y probabilidad de
+    alto riesgo como arreglos paralelos (null en las filas inválidas), sin
+    armar un dict por fila. Los errores se listan aparte.
+    """
+    pipeline, batch, valid_rows, preds, proba, _ = _score_valid(records)
+    n = len(records)
+    if preds is None:
+        prediction, prob_high_risk = [None] * n, [None] * n
+    elif len(valid_rows) == n:
+        prediction, prob_high_risk = preds.tolist(), proba[:, 1].tolist()
+    else:
+        prediction, prob_high_risk = [None] * n, [None] * n
+        for j, pred, p in zip(valid_rows.tolist(), preds.tolist(), proba[:, 1].tolist()):
+            prediction[j] = pred
+            prob_high_risk[j] = p
+
+    return {
+        "model_version": pipeline.version,
+        "count": n,
+        "valid": len(valid_rows),
+        "invalid": len(batch.errors),
+        "prediction": prediction,
+        "prob_high_risk": prob_high_risk,
+        "errors": [{"index": j, "error": errors} for j, errors in sorted(batch.errors.items())]
+    }
+
+
+def _record_batch(batch, valid_rows, preds, proba, pipeline):
+    """Encola (write-behind) las filas válidas de un lote validado columnar"""
+    if prediction_writer is None:
+        return
+    input_rows = batch.iter_rows([attr for _, attr in INPUT_COLUMNS], valid_rows)
+    for values, pred, p in zip(input_rows, preds.tolist(), proba.tolist()):
+        prediction_writer.record_values(values, pred, p, pipeline.version)
+
+
+def format_prediction(pred: int, proba: List[float], alcohol_value: int, pipeline=None) -> Dict[str, Any]:
+    """Respuesta estándar de /predict/ (también usada por cada fila del lote)"""
+    pipeline = pipeline or registry.active
+    risk_label = "Alto Riesgo" if pred == 1 else "Bajo Riesgo"
+
+    return {
+        "prediction": pred,
+        "risk_label": risk_label,
+        "probabilities": {
+            "class_0_low_risk": proba[0],
+            "class_1_high_risk": proba[1]
+        },
+        "confidence": max(proba),
+        "metadata": {
+            "model_version": pipeline.version,
+            "feature_count": len(pipeline.feature_names),
+            "alcohol_encoded": alcohol_value
+        }
+    }
+
+micro_batcher = None
+if MICROBATCH_ENABLED:
+    micro_batcher = MicroBatcher(run_model, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+                                 timeout_s=MICROBATCH_TIMEOUT_S)
+
+# Los workers se adjuntan al bosque plano publicado en memoria compartida:
+# requiere el motor "flat"
+inference_executor = None
+if EXECUTOR_WORKERS > 0:
+    if registry.active.flat_forest is None:
+        warnings.warn("CARDIAI_EXECUTOR_WORKERS requiere el motor 'flat'; se evalúa en el threadpool")
+    else:
+        inference_executor = InferenceExecutor(
+            workers=EXECUTOR_WORKERS,
+            max_pending=EXECUTOR_MAX_PENDING or None,
+            deadline_ms=EXECUTOR_DEADLINE_MS
+        )
+        registry.add_listener(inference_executor.publish)
 
 # -----------------------------------------------------------
-# Pydantic Input Model
+# Métricas (Prometheus, expuestas en /metrics)
 # -----------------------------------------------------------
-class PatientData(BaseModel):
-    Alcohol_Consumption: str = Field(..., description="Low, Medium, High")
-    Homocysteine_Level: float
-    CRP_Level: float
-    BMI: float
-    Sleep_Hours: float
-    Triglyceride_Level: float
-    Cholesterol_Level: float
-    Fasting_Blood_Sugar: float
-    Blood_Pressure: float
-    Age: int
-
-    @field_validator("Alcohol_Consumption", mode="before")
-    @classmethod
-    def validate_alcohol(cls, v):
-        if not isinstance(v, str):
-            raise ValueError("Debe ser texto")
-        normalized = v.strip().lower()
-        mapping = {
-            "low": "Low",
-            "medium": "Medium",
-            "high": "High",
-            "bajo": "Low",
-            "medio": "Medium",
-            "alto": "High"
-        }
-        if normalized not in mapping:
-            raise ValueError("Alcohol_Consumption debe ser Low/Medium/High")
-        return mapping[normalized]
-
-    @field_validator(
-        "Homocysteine_Level", "CRP_Level", "BMI", "Sleep_Hours",
-        "Triglyceride_Level", "Cholesterol_Level",
-        "Fasting_Blood_Sugar", "Blood_Pressure",
-        mode="before"
-    )
-    @classmethod
-    def validate_numeric(cls, v, info):
-        try:
-            val = float(v)
-        except:
-            raise ValueError(f"{info.field_name} debe ser numérico")
-        if val < 0:
-            raise ValueError(f"{info.field_name} debe ser >= 0")
-        return val
-
-    @field_validator("Age", mode="before")
-    @classmethod
-    def validate_age(cls, v):
-        try:
-            age = int(v)
-        except:
-            raise ValueError("Age debe ser entero")
-        if not (0 <= age <= 120):
-            raise ValueError("Age debe estar entre 0 y 120")
-        return age
+metrics = MetricsRegistry()
+http_requests_total = metrics.register(Counter(
+    "cardiai_http_requests_total", "Requests HTTP por método, ruta y status",
+    ("method", "path", "status")))
+http_errors_total = metrics.register(Counter(
+    "cardiai_http_errors_total", "Respuestas HTTP con status >= 400",
+    ("method", "path", "status")))
+http_request_seconds = metrics.register(Histogram(
+    "cardiai_http_request_duration_seconds", "Latencia total del request",
+    ("method", "path")))
+http_in_flight = metrics.register(Gauge(
+    "cardiai_http_requests_in_flight", "Requests en curso", ("path",)))
+stage_seconds = metrics.register(Histogram(
+    "cardiai_predict_stage_seconds", "Latencia por etapa del pipeline de predicción", ("stage",)))
+metrics.register(CallbackMetric(
+    "cardiai_microbatch_queue_depth", "Filas esperando al micro-batcher",
+    lambda: micro_batcher.stats()["queued"] if micro_batcher is not None else None))
+metrics.register(CallbackMetric(
+    "cardiai_inference_pending", "Requests admitidos por el ejecutor de inferencia",
+    lambda: inference_executor.pending if inference_executor is not None else None))
+inference_rejected_total = metrics.register(Counter(
+    "cardiai_inference_rejected_total", "Requests rechazados por sobrecarga", ("reason",)))
+metrics.register(CallbackMetric(
+    "cardiai_persistence_queue_depth", "Predicciones pendientes de escribir en la base",
+    lambda: prediction_writer.stats()["queued"] if prediction_writer is not None else None))
+metrics.register(CallbackMetric(
+    "cardiai_prediction_cache_hits_total", "Aciertos de la caché de predicciones",
+    lambda: prediction_cache.hits, kind="counter"))
+metrics.register(CallbackMetric(
+    "cardiai_prediction_cache_misses_total", "Fallos de la caché de predicciones",
+    lambda: prediction_cache.misses, kind="counter"))
+
+# Etapas de /predict/ (el escalado y el orden final son una sola operación fusionada)
+STAGE_ALCOHOL = stage_seconds.labels("alcohol_encoding")
+STAGE_NUMERIC = stage_seconds.labels("numeric_assembly")
+STAGE_SCALING = stage_seconds.labels("scaling_and_order")
+STAGE_CACHE = stage_seconds.labels("cache_lookup")
+STAGE_FOREST = stage_seconds.labels("forest_prediction")
+STAGE_FORMAT = stage_seconds.labels("response_formatting")
+STAGE_PERSIST = stage_seconds.labels("persistence_enqueue")
+# Etapas de /predict/batch/ y /predict/stream/
+STAGE_VALIDATION = stage_seconds.labels("batch_validation")
+STAGE_BATCH_SCORING = stage_seconds.labels("batch_scoring")
 
 # -----------------------------------------------------------
 # FastAPI
 # -----------------------------------------------------------
-app = FastAPI(title="Heart Disease Prediction API", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if micro_batcher is not None:
+        micro_batcher.start()
+    if inference_executor is not None:
+        inference_executor.start(registry.active)
+    if prediction_writer is not None:
+        prediction_writer.start()
+    registry.start_watcher()
+    yield
+    registry.stop()
+    if micro_batcher is not None:
+        micro_batcher.stop()
+    if inference_executor is not None:
+        inference_executor.stop()
+    if prediction_writer is not None:
+        # Flush de lo pendiente antes de salir
+        prediction_writer.stop()
+
+
+app = FastAPI(title="Heart Disease Prediction API", version="1.0", lifespan=lifespan)
+# Rutas conocidas (etiqueta "path" de las métricas); se completa al final del módulo
+_route_paths = set()
+app.add_middleware(
+    MetricsMiddleware,
+    requests_total=http_requests_total,
+    errors_total=http_errors_total,
+    duration=http_request_seconds,
+    in_flight=http_in_flight,
+    paths=_route_paths
+)
 
 @app.get("/")
 def root():
@@ -104,39 +381,157 @@ def root():
         "version": "1.0",
         "endpoints": {
             "/predict/": "POST - Realizar predicción",
-            "/health/": "GET - Health check"
+            "/predict/batch/": "POST - Predicción por lotes",
+            "/predict/stream/": "POST - Predicción en streaming (NDJSON)",
+            "/predict/columnar/": "POST - Predicción por lotes en Arrow IPC, Parquet o .npy",
+            "/health/": "GET - Health check",
+            "/metrics": "GET - Métricas Prometheus (latencia por etapa, requests, errores)",
+            "/analytics/risk/": "GET - Tasa de alto riesgo por edad, alcohol y BMI",
+            "/admin/models/": "GET - Versiones de modelo disponibles y activa (X-Admin-Token)",
+            "/admin/reload/": "POST - Recargar modelo en caliente (X-Admin-Token)",
+            "/admin/rollback/": "POST - Volver a la versión anterior (X-Admin-Token)"
         }
     }
 
 @app.get("/health/")
 def health_check():
+    pipeline = registry.active
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
-        "scaler_loaded": scaler is not None,
-        "encoder_loaded": alcohol_encoder is not None,
-        "expected_features": len(feature_names),
-        "feature_names": feature_names
+        "model_version": pipeline.version,
+        "model_loaded": pipeline.flat_forest is not None or pipeline.model_loaded,
+        "scaler_loaded": pipeline.scaler is not None,
+        "encoder_loaded": pipeline.alcohol_encoder is not None,
+        "inference_engine": pipeline.engine,
+        "artifact_source": pipeline.source,
+        "startup_seconds": STARTUP_SECONDS,
+        "time_to_first_prediction_seconds": first_prediction_seconds,
+        "expected_features": len(pipeline.feature_names),
+        "feature_names": pipeline.feature_names,
+        "prediction_cache": prediction_cache.stats(),
+        "micro_batching": micro_batcher.stats() if micro_batcher is not None else {"enabled": False},
+        "inference_executor": inference_executor.stats() if inference_executor is not None else {"enabled": False},
+        "persistence": prediction_writer.stats() if prediction_writer is not None else {"enabled": False},
+        "model_registry": registry.status()
     }
 
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/analytics/risk/")
+def analytics_risk(hours: int = Query(24, ge=1, le=24 * 366, description="Ventana en horas")):
+    """
+    Tasa de alto riesgo por banda de edad, nivel de alcohol y categoría de
+    BMI en las últimas `hours` horas. Lee los agregados por hora que el
+    escritor mantiene al insertar, sin recorrer la tabla responses.
+    """
+    if prediction_writer is None:
+        raise HTTPException(
+            status_code=503,
+            detail="La persistencia de predicciones está deshabilitada (CARDIAI_PERSIST=0)"
+        )
+    prediction_writer.start()  # asegura esquema y tabla de agregados
+    try:
+        return risk_summary(PERSIST_DB_PATH, hours=hours)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error consultando analytics: {str(e)}"
+        )
+
 @app.post("/predict/")
-def predict(data: PatientData):
+async def predict(data: PatientData, request: Request):
     """
     Realiza predicción de riesgo de enfermedad cardíaca.
     
     Pipeline:
     1. Codificar Alcohol_Consumption (Low/Medium/High -> 0/1/2)
-    2. Normalizar las 9 variables numéricas con MinMaxScaler
-    3. Reconstruir vector en el orden que espera el modelo
-    4. Predecir con RandomForest
+    2. Normalizar las 9 variables numéricas y reordenar según el modelo
+       (transformación fusionada precalculada a partir del MinMaxScaler)
+    3. Predecir con RandomForest
+    4. Formatear respuesta
+
+    Con el ejecutor de inferencia habilitado (CARDIAI_EXECUTOR_WORKERS) el
+    request pasa antes por el control de admisión en el event loop: si hay
+    sobrecarga se rechaza de inmediato (429/503 con Retry-After) y el
+    bosque se evalúa en el pool de procesos dentro del plazo del request.
+
+    La codificación se negocia con Accept (ver api/encoding.py): JSON por
+    defecto, MessagePack, y la vista compacta (view=compact).
     """
-    
+    media_type, compact = negotiate(request.headers.get("accept"))
+    ticket = None
+    prepared = None
+    if inference_executor is not None:
+        # Vector final y caché en el event loop (microsegundos): un acierto
+        # se responde sin ocupar lugar en la cola ni arriesgar un 429
+        prepared = _prepare(data)
+        if prepared[3][1] is None:
+            ticket = _admit()
+    try:
+        result = await run_in_threadpool(_predict, data, ticket, prepared)
+    finally:
+        if ticket is not None:
+            ticket.release()
+    if compact:
+        result = compact_prediction(result)
+    return encoded_response(result, media_type)
+
+
+def compact_prediction(result):
+    """Vista compacta de una respuesta de /predict/ (misma forma que la del lote)"""
+    return {
+        "model_version": result["metadata"]["model_version"],
+        "prediction": [result["prediction"]],
+        "prob_high_risk": [result["probabilities"]["class_1_high_risk"]]
+    }
+
+
+def _admit():
+    try:
+        return inference_executor.admit()
+    except Overloaded as e:
+        raise _overloaded(e)
+
+
+def _overloaded(e):
+    inference_rejected_total.labels(e.reason).inc()
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def _prepare(data):
+    """(pipeline, alcohol codificado, vector final, (clave, resultado en caché o None))"""
+    # Pipeline activo al inicio del request (una recarga en caliente no lo afecta)
+    pipeline = registry.active
+    alcohol_value, final_input = _final_vector(data, pipeline)
+    return pipeline, alcohol_value, final_input, _cache_lookup(final_input, pipeline)
+
+
+def _predict(data, ticket=None, prepared=None):
+    pipeline, alcohol_value, final_input, lookup = prepared or _prepare(data)
+    pred, proba = _cached_prediction(final_input, pipeline, ticket, lookup)
+
+    # -------------------------------------------------------
+    # PASO 4: Registrar (write-behind) y formatear respuesta
+    # -------------------------------------------------------
+    return _respond(data, pred, proba, alcohol_value, pipeline)
+
+
+def _final_vector(data, pipeline):
+    """Pasos 1 y 2 de /predict/: (alcohol codificado, vector final 1 x n_features)"""
+    transform = pipeline.transform
+
     # -------------------------------------------------------
     # PASO 1: Codificar Alcohol Consumption
     # -------------------------------------------------------
+    t0 = time.perf_counter()
     try:
-        # FIX: Usar 'mapping' dentro del encoder
-        alcohol_value = alcohol_encoder['mapping'][data.Alcohol_Consumption]
+        alcohol_value = transform.encode_alcohol(data.Alcohol_Consumption)
     except KeyError:
         raise HTTPException(
             status_code=400, 
@@ -149,108 +544,294 @@ def predict(data: PatientData):
         )
 
     # -------------------------------------------------------
-    # PASO 2: Preparar datos numéricos para normalización
+    # PASO 2: Vector final (escalado + orden del modelo)
     # -------------------------------------------------------
-    # El scaler espera las 9 variables numéricas en un orden específico
-    # SIN incluir Alcohol Consumption
-    
-    numeric_data = {
-        'Age': float(data.Age),
-        'Blood Pressure': data.Blood_Pressure,
-        'Cholesterol Level': data.Cholesterol_Level,
-        'BMI': data.BMI,
-        'Sleep Hours': data.Sleep_Hours,
-        'Triglyceride Level': data.Triglyceride_Level,
-        'Fasting Blood Sugar': data.Fasting_Blood_Sugar,
-        'CRP Level': data.CRP_Level,
-        'Homocysteine Level': data.Homocysteine_Level
-    }
-
+    # Una sola operación vectorizada precalculada al cargar:
+    # permutación a feature_names + scale_/min_ del MinMaxScaler,
+    # con Alcohol Consumption sin normalizar
+    t1 = time.perf_counter()
+    STAGE_ALCOHOL.observe(t1 - t0)
     try:
-        # Ordenar según el orden del scaler
-        x_to_scale = np.array([numeric_data[col] for col in SCALER_COLUMN_ORDER]).reshape(1, -1)
-    except KeyError as e:
+        raw = transform.raw_row(data, alcohol_value)
+        t2 = time.perf_counter()
+        STAGE_NUMERIC.observe(t2 - t1)
+        final_input = transform.transform(raw)
+        t1 = time.perf_counter()
+        STAGE_SCALING.observe(t1 - t2)
+    except Exception as e:
         raise HTTPException(
-            status_code=400, 
-            detail=f"Falta variable para scaler: {str(e)}"
+            status_code=500, 
+            detail=f"Error construyendo vector final: {str(e)}"
         )
+    return alcohol_value, final_input
+
 
+def _cache_lookup(final_input, pipeline):
+    """(clave, resultado en caché o None) del vector final"""
+    t1 = time.perf_counter()
+    cache_key = prediction_cache.make_key(final_input, cache_tag(pipeline))
+    cached = prediction_cache.get(cache_key)
+    STAGE_CACHE.observe(time.perf_counter() - t1)
+    return cache_key, cached
+
+
+def _cached_prediction(final_input, pipeline, ticket=None, lookup=None):
+    """
+    Paso 3 de /predict/: (predicción, probabilidades) usando la caché LRU.
+    `lookup` es el resultado de _cache_lookup si ya se consultó la caché
+    """
     # -------------------------------------------------------
-    # PASO 3: Normalizar con MinMaxScaler
+    # PASO 3: Realizar Predicción (con caché LRU)
     # -------------------------------------------------------
+    cache_key, cached = lookup or _cache_lookup(final_input, pipeline)
+    t2 = time.perf_counter()
+    if cached is not None:
+        return cached[0], list(cached[1])
+
     try:
-        x_scaled = scaler.transform(x_to_scale)
+        if ticket is not None:
+            # Se evalúa en un proceso del pool, dentro del plazo del request
+            preds, probas = inference_executor.run(final_input, pipeline, ticket)
+            _mark_first_prediction()
+            pred = int(preds[0])
+            proba = probas[0].tolist()
+        elif micro_batcher is not None:
+            # Se evalúa junto con otros requests concurrentes
+            pred, proba = micro_batcher.submit(final_input, pipeline)
+        else:
+            preds, probas = run_model(final_input, pipeline)
+            pred = int(preds[0])
+            proba = probas[0].tolist()
+        prediction_cache.put(cache_key, (pred, tuple(proba)))
+        
+    except Overloaded as e:
+        raise _overloaded(e)
+    except BatcherUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Predicción no disponible: {str(e)}")
     except Exception as e:
         raise HTTPException(
             status_code=500, 
-            detail=f"Error aplicando scaler: {str(e)}"
+            detail=f"Error en predicción: {str(e)}"
         )
+    STAGE_FOREST.observe(time.perf_counter() - t2)
+    return pred, proba
 
-    # -------------------------------------------------------
-    # PASO 4: Reconstruir vector en el orden del modelo
-    # -------------------------------------------------------
-    # feature_names = ['Alcohol Consumption', 'Homocysteine Level', 'CRP Level', 
-    #                  'BMI', 'Sleep Hours', 'Triglyceride Level', 
-    #                  'Cholesterol Level', 'Fasting Blood Sugar', 
-    #                  'Blood Pressure', 'Age']
-    
+
+def _respond(data, pred, proba, alcohol_value, pipeline):
+    t0 = time.perf_counter()
+    if prediction_writer is not None:
+        prediction_writer.record(data, pred, proba, pipeline.version)
+    t1 = time.perf_counter()
+    STAGE_PERSIST.observe(t1 - t0)
+    response = format_prediction(pred, proba, alcohol_value, pipeline)
+    STAGE_FORMAT.observe(time.perf_counter() - t1)
+    return response
+
+
+def predict_record(payload):
+    """
+    /predict/ sin HTTP, para quien importa este módulo en el mismo proceso
+    (p.ej. la app de Streamlit en modo local, ver app/inference.py). Mismas
+    validaciones, caché, persistencia y respuesta que el endpoint; se evalúa
+    en el hilo que llama (sin control de admisión). Lanza ValidationError si
+    el payload no es un PatientData válido y HTTPException ante errores del
+    pipeline.
+    """
+    return _predict(PatientData.model_validate(payload))
+
+
+@app.post("/predict/batch/")
+def predict_batch(data: BatchPatientData, request: Request):
+    """
+    Predicción por lotes.
+
+    Valida cada paciente por separado y ejecuta codificación, escalado,
+    reordenamiento y predict_proba UNA sola vez sobre la matriz Nx10 de
+    las filas válidas. Las filas inválidas se reportan con su error sin
+    afectar al resto del lote.
+
+    Con Accept: ...; view=compact la respuesta trae solo `prediction` y
+    `prob_high_risk` como arreglos paralelos (null en las filas inválidas)
+    y los errores aparte; MessagePack se pide con Accept: application/msgpack.
+    """
+    media_type, compact = negotiate(request.headers.get("accept"))
     try:
-        # Crear diccionario completo con valores normalizados
-        complete_data = {
-            'Alcohol Consumption': alcohol_value,  # NO normalizado
-            'Homocysteine Level': x_scaled[0, SCALER_COLUMN_ORDER.index('Homocysteine Level')],
-            'CRP Level': x_scaled[0, SCALER_COLUMN_ORDER.index('CRP Level')],
-            'BMI': x_scaled[0, SCALER_COLUMN_ORDER.index('BMI')],
-            'Sleep Hours': x_scaled[0, SCALER_COLUMN_ORDER.index('Sleep Hours')],
-            'Triglyceride Level': x_scaled[0, SCALER_COLUMN_ORDER.index('Triglyceride Level')],
-            'Cholesterol Level': x_scaled[0, SCALER_COLUMN_ORDER.index('Cholesterol Level')],
-            'Fasting Blood Sugar': x_scaled[0, SCALER_COLUMN_ORDER.index('Fasting Blood Sugar')],
-            'Blood Pressure': x_scaled[0, SCALER_COLUMN_ORDER.index('Blood Pressure')],
-            'Age': x_scaled[0, SCALER_COLUMN_ORDER.index('Age')]
-        }
-        
-        # Ordenar según feature_names del modelo
-        final_input = np.array([complete_data[f] for f in feature_names]).reshape(1, -1)
-        
+        if compact:
+            return encoded_response(score_records_compact(data.patients), media_type)
+        results = score_records(data.patients)
     except Exception as e:
         raise HTTPException(
-            status_code=500, 
-            detail=f"Error construyendo vector final: {str(e)}"
+            status_code=500,
+            detail=f"Error en predicción por lotes: {str(e)}"
         )
 
-    # -------------------------------------------------------
-    # PASO 5: Realizar Predicción
-    # -------------------------------------------------------
+    invalid = sum(1 for r in results if "error" in r)
+    return encoded_response({
+        "count": len(results),
+        "valid": len(results) - invalid,
+        "invalid": invalid,
+        "results": results
+    }, media_type)
+
+
+@app.post("/predict/stream/")
+async def predict_stream(request: Request):
+    """
+    Predicción en streaming (NDJSON).
+
+    El body (un PatientData JSON por línea) se lee de forma incremental a
+    un SpooledTemporaryFile, que pasa a disco al superar STREAM_SPOOL_BYTES;
+    un upload de más de STREAM_MAX_BYTES se rechaza con 413. Luego se
+    evalúa en bloques de STREAM_CHUNK_SIZE filas y cada resultado se
+    devuelve como una línea NDJSON (mismo formato que /predict/batch/) en
+    el orden de entrada. La memoria no crece con el tamaño del upload.
+    """
+    # El body se lee completo antes de responder. Evaluar mientras llega
+    # exigiría HTTP full-duplex: requests, httpx o curl envían todo el body
+    # antes de leer la respuesta, y con los buffers del socket llenos el
+    # servidor se bloquearía escribiendo. Además StreamingResponse escucha
+    # http.disconnect en paralelo y competiría por receive()
+    too_large = HTTPException(status_code=413, detail=f"El body excede {STREAM_MAX_BYTES} bytes")
     try:
-        pred = int(model.predict(final_input)[0])
-        proba = model.predict_proba(final_input)[0].tolist()
-        confidence = max(proba)
-        
+        declared = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        declared = 0
+    if declared > STREAM_MAX_BYTES:
+        raise too_large
+
+    spool = tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_BYTES)
+    try:
+        size = 0
+        async for data in request.stream():
+            size += len(data)
+            if size > STREAM_MAX_BYTES:
+                raise too_large
+            if size > STREAM_SPOOL_BYTES:
+                # Ya está (o pasa ahora) en disco: la escritura no bloquea el event loop
+                await run_in_threadpool(spool.write, data)
+            else:
+                spool.write(data)
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+
+    def results():
+        try:
+            chunk = []
+            start = 0
+            for record in _iter_ndjson(spool):
+                chunk.append(record)
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    yield _score_chunk_ndjson(chunk, start)
+                    start += len(chunk)
+                    chunk = []
+            if chunk:
+                yield _score_chunk_ndjson(chunk, start)
+        finally:
+            spool.close()
+
+    # Generador síncrono: Starlette lo itera en el threadpool
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _iter_ndjson(f):
+    """Registros de un archivo NDJSON; líneas inválidas o muy largas -> ValueError"""
+    while True:
+        line = f.readline(STREAM_MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        if len(line) > STREAM_MAX_LINE_BYTES and not line.endswith(b"\n"):
+            # Línea demasiado larga: se descarta hasta el próximo salto
+            while line and not line.endswith(b"\n"):
+                line = f.readline(STREAM_MAX_LINE_BYTES + 1)
+            yield ValueError(f"Línea excede {STREAM_MAX_LINE_BYTES} bytes")
+            continue
+        if line.strip():
+            yield _parse_line(line)
+
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"JSON inválido: {e}")
+
+
+def _score_chunk_ndjson(chunk, start):
+    try:
+        results = score_records(chunk, start)
     except Exception as e:
+        results = [_row_error(start + j, e) for j in range(len(chunk))]
+    return "".join(json.dumps(r) + "\n" for r in results).encode()
+
+
+@app.post("/predict/columnar/")
+async def predict_columnar(request: Request):
+    """
+    Predicción por lotes en formato columnar.
+
+    El Content-Type define el formato del body y de la respuesta:
+    application/vnd.apache.arrow.stream, application/vnd.apache.arrow.file,
+    application/vnd.apache.parquet o application/x-npy (arreglo estructurado).
+    Las columnas se nombran como en SCALER_COLUMN_ORDER + 'Alcohol Consumption'
+    (también se aceptan los nombres de PatientData). Se valida y evalúa
+    columna por columna sin pasar por JSON; la respuesta trae index,
+    prediction, risk_label, prob_low_risk, prob_high_risk y error por fila.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = MEDIA_TYPES.get(media_type)
+    if fmt is None:
         raise HTTPException(
-            status_code=500, 
-            detail=f"Error en predicción: {str(e)}"
+            status_code=415,
+            detail=f"Content-Type no soportado: '{media_type}'. Use uno de: {', '.join(MEDIA_TYPES)}"
         )
 
-    # -------------------------------------------------------
-    # PASO 6: Formatear respuesta
-    # -------------------------------------------------------
-    risk_label = "Alto Riesgo" if pred == 1 else "Bajo Riesgo"
-    
-    return {
-        "prediction": pred,
-        "risk_label": risk_label,
-        "probabilities": {
-            "class_0_low_risk": proba[0],
-            "class_1_high_risk": proba[1]
-        },
-        "confidence": confidence,
-        "metadata": {
-            "model_version": modelo_pkl.get("metadata", {}).get("version", "unknown"),
-            "feature_count": len(feature_names),
-            "alcohol_encoded": alcohol_value
-        }
-    }
+    chunks = []
+    size = 0
+    async for data in request.stream():
+        size += len(data)
+        if size > COLUMNAR_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"El body excede {COLUMNAR_MAX_BYTES} bytes")
+        chunks.append(data)
+
+    return await run_in_threadpool(_predict_columnar, b"".join(chunks), fmt)
+
+
+def _predict_columnar(body, fmt):
+    try:
+        columns, n_rows = decode_columns(body, fmt)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    pipeline = registry.active
+    t0 = time.perf_counter()
+    batch = validate_columns(columns, n_rows)
+    t1 = time.perf_counter()
+    STAGE_VALIDATION.observe(t1 - t0)
+
+    try:
+        valid_rows = batch.valid_indices
+        preds = np.empty(0, dtype=np.int64)
+        proba = np.empty((0, 2))
+        if len(valid_rows):
+            preds, proba, _ = pipeline.score_columns(batch.columns, valid_rows)
+            STAGE_BATCH_SCORING.observe(time.perf_counter() - t1)
+            _record_batch(batch, valid_rows, preds, proba, pipeline)
+        content = encode_results(fmt, n_rows, valid_rows, preds, proba, batch.errors, pipeline.version)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error en predicción columnar: {str(e)}"
+        )
+
+    return Response(
+        content=content,
+        media_type=RESPONSE_MEDIA_TYPES[fmt],
+        headers={"X-Model-Version": str(pipeline.version)}
+    )
 
 
 # -----------------------------------------------------------
@@ -259,58 +840,94 @@ def predict(data: PatientData):
 @app.post("/predict/debug/")
 def predict_debug(data: PatientData):
     """
-    Versión debug que muestra el proceso paso a paso
+    Versión debug que muestra el proceso paso a paso.
+
+    Usa el mismo pipeline activo, la misma transformación y la misma caché
+    que /predict/ (no registra la predicción). Agrega la contribución de
+    cada variable a la probabilidad de alto riesgo, calculada recorriendo
+    el camino de decisión de cada árbol: base_value + suma de
+    contribuciones = probabilidad predicha.
     """
-    
-    # Paso 1: Alcohol
-    alcohol_value = alcohol_encoder['mapping'][data.Alcohol_Consumption]
-    
-    # Paso 2: Datos numéricos
-    numeric_data = {
-        'Age': float(data.Age),
-        'Blood Pressure': data.Blood_Pressure,
-        'Cholesterol Level': data.Cholesterol_Level,
-        'BMI': data.BMI,
-        'Sleep Hours': data.Sleep_Hours,
-        'Triglyceride Level': data.Triglyceride_Level,
-        'Fasting Blood Sugar': data.Fasting_Blood_Sugar,
-        'CRP Level': data.CRP_Level,
-        'Homocysteine Level': data.Homocysteine_Level
-    }
-    
-    x_to_scale = np.array([numeric_data[col] for col in SCALER_COLUMN_ORDER]).reshape(1, -1)
-    x_scaled = scaler.transform(x_to_scale)
-    
-    # Paso 3: Vector final
-    complete_data = {
-        'Alcohol Consumption': alcohol_value,
-        'Homocysteine Level': x_scaled[0, SCALER_COLUMN_ORDER.index('Homocysteine Level')],
-        'CRP Level': x_scaled[0, SCALER_COLUMN_ORDER.index('CRP Level')],
-        'BMI': x_scaled[0, SCALER_COLUMN_ORDER.index('BMI')],
-        'Sleep Hours': x_scaled[0, SCALER_COLUMN_ORDER.index('Sleep Hours')],
-        'Triglyceride Level': x_scaled[0, SCALER_COLUMN_ORDER.index('Triglyceride Level')],
-        'Cholesterol Level': x_scaled[0, SCALER_COLUMN_ORDER.index('Cholesterol Level')],
-        'Fasting Blood Sugar': x_scaled[0, SCALER_COLUMN_ORDER.index('Fasting Blood Sugar')],
-        'Blood Pressure': x_scaled[0, SCALER_COLUMN_ORDER.index('Blood Pressure')],
-        'Age': x_scaled[0, SCALER_COLUMN_ORDER.index('Age')]
-    }
-    
-    final_input = np.array([complete_data[f] for f in feature_names]).reshape(1, -1)
-    
-    # Predicción
-    pred = int(model.predict(final_input)[0])
-    proba = model.predict_proba(final_input)[0].tolist()
-    
+    pipeline = registry.active
+    alcohol_value, final_input = _final_vector(data, pipeline)
+    pred, proba = _cached_prediction(final_input, pipeline)
+
+    numeric_data = {col: float(getattr(data, SCALER_FIELD_MAP[col])) for col in SCALER_COLUMN_ORDER}
+    x_scaled = pipeline.transform.scaled_values(final_input)
+
+    try:
+        bias, contributions = pipeline.explain(final_input)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error calculando contribuciones: {str(e)}"
+        )
+    # Contribuciones hacia la clase de alto riesgo (1)
+    classes = pipeline.classes_.tolist()
+    target = classes.index(1) if 1 in classes else len(classes) - 1
+    by_feature = dict(zip(pipeline.feature_names, contributions[0, :, target].tolist()))
+
     return {
         "debug_info": {
             "step_1_alcohol_encoded": alcohol_value,
             "step_2_numeric_data_original": numeric_data,
             "step_3_scaler_input_order": SCALER_COLUMN_ORDER,
             "step_4_scaled_values": x_scaled.tolist()[0],
-            "step_5_final_vector_order": feature_names,
+            "step_5_final_vector_order": pipeline.feature_names,
             "step_6_final_vector_values": final_input.tolist()[0]
         },
         "prediction": pred,
         "probabilities": proba,
-        "confidence": max(proba)
-    }
\ No newline at end of file
+        "confidence": max(proba),
+        "explanation": {
+            "target_class": classes[target],
+            "base_value": float(bias[target]),
+            "contributions": by_feature,
+            "top_features": sorted(by_feature, key=lambda f: abs(by_feature[f]), reverse=True)
+        },
+        "metadata": {
+            "model_version": pipeline.version
+        }
+    }
+
+
+# -----------------------------------------------------------
+# Administración de modelos (recarga en caliente / rollback)
+# -----------------------------------------------------------
+def _check_admin(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Administración deshabilitada (defina CARDIAI_ADMIN_TOKEN)")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+
+@app.get("/admin/models/")
+def admin_models(x_admin_token: str = Header(None)):
+    _check_admin(x_admin_token)
+    return registry.status()
+
+
+@app.post("/admin/reload/")
+def admin_reload(version: str = Query(None, description="Versión a cargar (por defecto la más nueva)"),
+                 x_admin_token: str = Header(None)):
+    """
+    Carga y calienta el modelo en segundo plano; el pipeline activo se
+    reemplaza de forma atómica solo cuando el nuevo está listo.
+    """
+    _check_admin(x_admin_token)
+    if version is not None and version not in registry.versions():
+        raise HTTPException(status_code=404, detail=f"Versión inexistente: {version}")
+    if not registry.reload(version):
+        raise HTTPException(status_code=409, detail="Ya hay una recarga en curso")
+    return {"status": "loading", **registry.status()}
+
+
+@app.post("/admin/rollback/")
+def admin_rollback(x_admin_token: str = Header(None)):
+    _check_admin(x_admin_token)
+    if not registry.rollback():
+        raise HTTPException(status_code=409, detail="No hay una versión anterior para rollback")
+    return {"status": "rolled_back", **registry.status()}
+
+
+_route_paths.update(route.path for route in app.routes)
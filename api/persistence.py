@@ -0,0 +1,268 @@
+# api/persistence.py
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from api.analytics import ensure_aggregates, update_aggregates
+
+# -----------------------------------------------------------
+# Persistencia write-behind de predicciones en responses.db
+# -----------------------------------------------------------
+# El request solo encola una tupla (sin tocar SQLite). Un hilo dedicado
+# vacía la cola cada `flush_interval` segundos o cada `batch_size` filas
+# e inserta todo en una sola transacción (WAL + synchronous=NORMAL).
+#
+# Si la cola se llena se aplica la política configurada:
+#   - "drop_new":    se descarta el registro nuevo
+#   - "drop_oldest": se descarta el más antiguo de la cola
+# En ambos casos el request nunca se bloquea y se cuenta en `dropped`.
+#
+# La base por defecto vive fuera del repo (~/.cardiai/responses.db): el
+# responses.db versionado no se modifica y los archivos -wal/-shm de WAL
+# no ensucian el árbol de trabajo. CARDIAI_DB_PATH elige otra ubicación.
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".cardiai", "responses.db")
+
+INPUT_COLUMNS = [
+    ("alcohol_consumption", "Alcohol_Consumption"),
+    ("homocysteine_level", "Homocysteine_Level"),
+    ("bmi", "BMI"),
+    ("crp_level", "CRP_Level"),
+    ("sleep_hours", "Sleep_Hours"),
+    ("triglyceride_level", "Triglyceride_Level"),
+    ("cholesterol_level", "Cholesterol_Level"),
+    ("fasting_blood_sugar", "Fasting_Blood_Sugar"),
+    ("blood_pressure", "Blood_Pressure"),
+    ("age", "Age"),
+]
+
+# Columnas agregadas a la tabla original `responses`
+PREDICTION_COLUMNS = [
+    ("prediction", "INTEGER"),
+    ("prob_low_risk", "FLOAT"),
+    ("prob_high_risk", "FLOAT"),
+    ("model_version", "VARCHAR(64)"),
+    ("created_at", "DATETIME"),
+]
+
+CREATE_RESPONSES = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER NOT NULL,
+    alcohol_consumption VARCHAR(16) NOT NULL,
+    homocysteine_level FLOAT NOT NULL,
+    bmi FLOAT NOT NULL,
+    crp_level FLOAT NOT NULL,
+    sleep_hours FLOAT NOT NULL,
+    triglyceride_level FLOAT NOT NULL,
+    cholesterol_level FLOAT NOT NULL,
+    fasting_blood_sugar FLOAT NOT NULL,
+    blood_pressure FLOAT NOT NULL,
+    age INTEGER NOT NULL,
+    PRIMARY KEY (id)
+)
+"""
+
+DROP_POLICIES = ("drop_new", "drop_oldest")
+
+# NaN (dato faltante que el modelo enruta como sklearn) se guardaría como
+# NULL y violaría las columnas NOT NULL: se audita como el texto "NaN"
+MISSING_VALUE = "NaN"
+
+
+def connect(db_path):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def ensure_schema(conn):
+    """Crea `responses` si no existe y agrega las columnas de predicción que falten"""
+    conn.execute(CREATE_RESPONSES)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(responses)")}
+    for name, sql_type in PREDICTION_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE responses ADD COLUMN {name} {sql_type}")
+    conn.commit()
+    ensure_aggregates(conn)
+
+
+def _audit_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return MISSING_VALUE
+    return value
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+class PredictionWriter:
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_queue=10000, batch_size=500,
+                 flush_interval=1.0, drop_policy="drop_new"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy debe ser uno de {DROP_POLICIES}")
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.drop_policy = drop_policy
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._columns = [c for c, _ in INPUT_COLUMNS] + [c for c, _ in PREDICTION_COLUMNS]
+        self._insert = (
+            f"INSERT INTO responses ({', '.join(self._columns)}) "
+            f"VALUES ({', '.join('?' for _ in self._columns)})"
+        )
+
+    # -------------------------------------------------------
+    # Ciclo de vida
+    # -------------------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            conn = connect(self.db_path)
+            ensure_schema(conn)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(conn,), name="cardiai-db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Hook de apagado: vacía lo pendiente y cierra la conexión"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+
+    # -------------------------------------------------------
+    # Camino del request (no bloqueante)
+    # -------------------------------------------------------
+    def record(self, patient, prediction, proba, model_version):
+        return self.record_values(
+            tuple(getattr(patient, attr) for _, attr in INPUT_COLUMNS), prediction, proba, model_version
+        )
+
+    def record_values(self, values, prediction, proba, model_version):
+        """Como record(), con los valores de entrada ya en el orden de INPUT_COLUMNS"""
+        if self._thread is None:
+            self.start()
+        row = tuple(_audit_value(v) for v in values) + (
+            int(prediction), float(proba[0]), float(proba[1]), str(model_version), _utc_now()
+        )
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            pass
+
+        if self.drop_policy == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(row)
+                self._count_dropped(1)
+                return True
+            except queue.Full:
+                pass
+        self._count_dropped(1)
+        return False
+
+    def _count_dropped(self, n):
+        with self._lock:
+            self.dropped += n
+
+    # -------------------------------------------------------
+    # Hilo escritor
+    # -------------------------------------------------------
+    def _take_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stop.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _insert_batch(self, conn, batch):
+        with conn:
+            conn.executemany(self._insert, batch)
+            # Agregados de analytics en la misma transacción
+            update_aggregates(conn, (
+                (row[0], row[2], row[9], row[10], row[12], row[14]) for row in batch
+            ))
+        with self._lock:
+            self.written += len(batch)
+
+    def _flush(self, conn, batch):
+        if not batch:
+            return
+        try:
+            self._insert_batch(conn, batch)
+        except sqlite3.IntegrityError as e:
+            # Una fila que viola el esquema no debe descartar el lote entero
+            self.last_error = str(e)
+            for row in batch:
+                try:
+                    self._insert_batch(conn, [row])
+                except sqlite3.Error as row_error:
+                    self.last_error = str(row_error)
+                    self._count_dropped(1)
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+            self._count_dropped(len(batch))
+            return
+        with self._lock:
+            self.flushes += 1
+
+    def _run(self, conn):
+        try:
+            while not self._stop.is_set():
+                self._flush(conn, self._take_batch())
+            # Apagado: se escribe todo lo que quedó en cola
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                self._flush(conn, batch)
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            written, dropped, flushes = self.written, self.dropped, self.flushes
+        return {
+            "enabled": True,
+            "db_path": self.db_path,
+            "queued": self._queue.qsize(),
+            "written": written,
+            "dropped": dropped,
+            "flushes": flushes,
+            "drop_policy": self.drop_policy,
+            "last_error": self.last_error,
+        }
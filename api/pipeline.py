@@ -0,0 +1,276 @@
+# api/pipeline.py
+import json
+import os
+import pickle
+import threading
+import warnings
+from types import SimpleNamespace
+
+import numpy as np
+
+from api.forest import FlatForest, check_parity
+from api.preprocessing import FusedTransform
+
+# -----------------------------------------------------------
+# Artefactos del modelo (mismos archivos que carga api/main.py)
+# -----------------------------------------------------------
+MODEL_FILE = "modelo_rf_final.pkl"
+SCALER_FILE = "minmax_scaler.pkl"
+ENCODER_FILE = "alcohol_manual_encoder.pkl"
+
+# Exportación mapeable en memoria (ver api/export_artifacts.py)
+EXPORT_MANIFEST = "pipeline.json"
+# 2: el bosque incluye missing_left (dirección de NaN en cada nodo)
+EXPORT_FORMAT_VERSION = 2
+# Variante reducida del bosque (ver api/compact_forest.py), junto a los PKL
+COMPACT_SUBDIR = "modelo_rf_final.compact"
+
+
+def load_artifacts(base_dir="api"):
+    """Carga (modelo_pkl, scaler, alcohol_encoder) desde un directorio"""
+    with open(os.path.join(base_dir, MODEL_FILE), "rb") as f:
+        modelo_pkl = pickle.load(f)
+
+    with open(os.path.join(base_dir, SCALER_FILE), "rb") as f:
+        scaler = pickle.load(f)
+
+    with open(os.path.join(base_dir, ENCODER_FILE), "rb") as f:
+        alcohol_encoder = pickle.load(f)
+
+    return modelo_pkl, scaler, alcohol_encoder
+
+
+def _source_signature(base_dir):
+    """Tamaño y mtime del pickle del modelo, para detectar exportaciones viejas"""
+    try:
+        st = os.stat(os.path.join(base_dir, MODEL_FILE))
+    except OSError:
+        return None
+    return {"size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def build_flat_forest(model, n_features):
+    """Motor plano verificado contra sklearn; None si no es posible construirlo"""
+    try:
+        forest = FlatForest.from_sklearn(model)
+        if not check_parity(forest, model, n_features):
+            raise ValueError("las probabilidades no coinciden con sklearn")
+        return forest
+    except Exception as e:
+        warnings.warn(f"Motor 'flat' deshabilitado, se usa sklearn: {e}")
+        return None
+
+
+# -----------------------------------------------------------
+# Pipeline de scoring: transformación fusionada + motor de inferencia
+# -----------------------------------------------------------
+class ScoringPipeline:
+    def __init__(self, feature_names, scaler, alcohol_encoder, metadata=None,
+                 model=None, flat_forest=None, base_dir="api", source="pickle"):
+        self.feature_names = list(feature_names)
+        self.scaler = scaler
+        self.alcohol_encoder = alcohol_encoder
+        self.metadata = metadata or {}
+        self.version = self.metadata.get("version", "unknown")
+        self.base_dir = base_dir
+        self.source = source
+        # Identificador de carga (lo asigna el registro de modelos)
+        self.load_id = 0
+        self.flat_forest = flat_forest
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._explainer = None
+
+        self.transform = FusedTransform(self.feature_names, scaler, alcohol_encoder['mapping'])
+
+    @classmethod
+    def from_artifacts(cls, modelo_pkl, scaler, alcohol_encoder, engine="flat", base_dir="api"):
+        model = modelo_pkl["model"]
+        feature_names = modelo_pkl["feature_names"]
+        flat_forest = build_flat_forest(model, len(feature_names)) if engine == "flat" else None
+        return cls(feature_names, scaler, alcohol_encoder, metadata=modelo_pkl.get("metadata", {}),
+                   model=model, flat_forest=flat_forest, base_dir=base_dir, source="pickle")
+
+    @classmethod
+    def from_export(cls, export_dir, base_dir="api", mmap=True):
+        """
+        Arranque rápido: lee el manifiesto JSON y mapea los arreglos del
+        bosque sin deserializar el pickle (ni importar sklearn). El modelo
+        sklearn solo se carga si algo lo pide explícitamente.
+        """
+        with open(os.path.join(export_dir, EXPORT_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Versión de exportación no soportada: {manifest.get('format_version')}")
+        return cls.from_manifest(manifest, FlatForest.load(export_dir, mmap=mmap),
+                                 base_dir=base_dir, source="export-mmap" if mmap else "export")
+
+    @classmethod
+    def from_manifest(cls, manifest, flat_forest, base_dir="api", source="export"):
+        """Pipeline a partir del manifiesto JSON (ver pipeline_manifest) y un bosque ya cargado"""
+        scaler = SimpleNamespace(**{
+            k: np.asarray(v) if isinstance(v, list) and k != "feature_range" else v
+            for k, v in manifest["scaler"].items()
+        })
+        return cls(manifest["feature_names"], scaler, manifest["alcohol_encoder"],
+                   metadata=manifest.get("metadata", {}),
+                   flat_forest=flat_forest, base_dir=base_dir, source=source)
+
+    @classmethod
+    def from_dir(cls, base_dir="api", engine="flat", export_dir=None):
+        """Usa la exportación si existe y corresponde al pickle actual; si no, los PKL"""
+        if engine == "flat" and export_dir and export_is_current(export_dir, base_dir):
+            return cls.from_export(export_dir, base_dir)
+        return cls.from_artifacts(*load_artifacts(base_dir), engine=engine, base_dir=base_dir)
+
+    # -------------------------------------------------------
+    # Modelo sklearn (carga diferida)
+    # -------------------------------------------------------
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    with open(os.path.join(self.base_dir, MODEL_FILE), "rb") as f:
+                        self._model = pickle.load(f)["model"]
+        return self._model
+
+    @property
+    def model_loaded(self):
+        return self._model is not None
+
+    @property
+    def classes_(self):
+        if self.flat_forest is not None:
+            return self.flat_forest.classes_
+        return self.model.classes_
+
+    @property
+    def engine(self):
+        return "flat" if self.flat_forest is not None else "sklearn"
+
+    def run_model(self, final_input):
+        """
+        Ejecuta el bosque sobre la matriz final y devuelve (predicciones, probabilidades).
+        La clase se deriva de las probabilidades: un solo recorrido de los árboles.
+        """
+        if self.flat_forest is not None:
+            proba = self.flat_forest.predict_proba(final_input)
+        else:
+            proba = self.model.predict_proba(final_input)
+        preds = self.classes_.take(np.argmax(proba, axis=1))
+        return preds, proba
+
+    # -------------------------------------------------------
+    # Explicaciones (contribución de cada variable)
+    # -------------------------------------------------------
+    @property
+    def explainer(self):
+        """Bosque plano para las contribuciones (con motor sklearn se construye en la primera explicación)"""
+        if self.flat_forest is not None:
+            return self.flat_forest
+        if self._explainer is None:
+            with self._model_lock:
+                if self._explainer is None:
+                    self._explainer = FlatForest.from_sklearn(self.model)
+        return self._explainer
+
+    def explain(self, final_input):
+        """(bias, contribuciones) en el orden de feature_names; ver FlatForest.contributions"""
+        return self.explainer.contributions(final_input)
+
+    def score_columns(self, columns, rows=None):
+        """Columnas validadas -> (predicciones, probabilidades, alcohol codificado)"""
+        final_input, alcohol_values = self.transform.transform_columns(columns, rows)
+        preds, proba = self.run_model(final_input)
+        return preds, proba, alcohol_values
+
+    def score_patients(self, patients):
+        """PatientData validados -> (predicciones, probabilidades, alcohol codificado)"""
+        final_input, alcohol_values = self.transform.transform_patients(patients)
+        preds, proba = self.run_model(final_input)
+        return preds, proba, alcohol_values
+
+
+# -----------------------------------------------------------
+# Exportación
+# -----------------------------------------------------------
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def pipeline_manifest(feature_names, metadata, scaler, alcohol_encoder):
+    """feature_names, metadata, parámetros del scaler y mapeo de alcohol como JSON"""
+    scaler_params = {"min_": scaler.min_, "scale_": scaler.scale_,
+                     "n_features_in_": getattr(scaler, "n_features_in_", len(scaler.min_)),
+                     "clip": getattr(scaler, "clip", False),
+                     "feature_range": list(getattr(scaler, "feature_range", (0, 1)))}
+    if getattr(scaler, "feature_names_in_", None) is not None:
+        scaler_params["feature_names_in_"] = scaler.feature_names_in_
+
+    return {
+        "format_version": EXPORT_FORMAT_VERSION,
+        "feature_names": list(feature_names),
+        "metadata": metadata,
+        "scaler": {k: _jsonable(v) for k, v in scaler_params.items()},
+        "alcohol_encoder": {"mapping": {k: _jsonable(v) for k, v in alcohol_encoder["mapping"].items()}},
+    }
+
+
+def export_pipeline(export_dir, base_dir="api"):
+    """Exporta bosque (arreglos .npy) + scaler/encoder/metadata (JSON) para carga con mmap"""
+    modelo_pkl, scaler, alcohol_encoder = load_artifacts(base_dir)
+    feature_names = modelo_pkl["feature_names"]
+    forest = FlatForest.from_sklearn(modelo_pkl["model"])
+    if not check_parity(forest, modelo_pkl["model"], len(feature_names)):
+        raise ValueError("El motor plano no coincide con sklearn; no se exporta")
+
+    forest.save(export_dir)
+    manifest = pipeline_manifest(feature_names, modelo_pkl.get("metadata", {}), scaler, alcohol_encoder)
+    manifest["source"] = _source_signature(base_dir)
+    with open(os.path.join(export_dir, EXPORT_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def export_is_current(export_dir, base_dir="api"):
+    """True si la exportación existe y (si hay pickle) corresponde a ese pickle"""
+    try:
+        with open(os.path.join(export_dir, EXPORT_MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("format_version") != EXPORT_FORMAT_VERSION:
+        warnings.warn(f"Exportación en {export_dir} con formato {manifest.get('format_version')} "
+                      f"(se espera {EXPORT_FORMAT_VERSION}); se usan los PKL")
+        return False
+    current = _source_signature(base_dir)
+    if current is not None and manifest.get("source") != current:
+        warnings.warn(f"Exportación en {export_dir} desactualizada respecto a {MODEL_FILE}; se usan los PKL")
+        return False
+    return True
+
+
+def compact_is_servable(compact_dir, base_dir="api", min_agreement=0.99):
+    """
+    True si la variante reducida existe, corresponde al pickle actual y su
+    concordancia medida con el original alcanza `min_agreement`
+    """
+    try:
+        with open(os.path.join(compact_dir, EXPORT_MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    agreement = manifest.get("compact", {}).get("agreement")
+    if agreement is None:
+        warnings.warn(f"{compact_dir} no es una variante reducida (falta la sección compact); se usa el modelo completo")
+        return False
+    if agreement < min_agreement:
+        warnings.warn(f"Variante reducida en {compact_dir} con concordancia {agreement:.4f} < {min_agreement}; "
+                      "se usa el modelo completo")
+        return False
+    return export_is_current(compact_dir, base_dir)
@@ -0,0 +1,127 @@
+# api/preprocessing.py
+import numpy as np
+
+# -----------------------------------------------------------
+# Orden de las columnas que espera el scaler
+# IMPORTANTE: El scaler fue entrenado con estas 9 variables en este orden específico
+# -----------------------------------------------------------
+SCALER_COLUMN_ORDER = [
+    'Age', 'Blood Pressure', 'Cholesterol Level', 'BMI',
+    'Sleep Hours', 'Triglyceride Level', 'Fasting Blood Sugar',
+    'CRP Level', 'Homocysteine Level'
+]
+
+ALCOHOL_COLUMN = 'Alcohol Consumption'
+
+# Atributo de PatientData correspondiente a cada columna del scaler
+SCALER_FIELD_MAP = {
+    'Age': 'Age',
+    'Blood Pressure': 'Blood_Pressure',
+    'Cholesterol Level': 'Cholesterol_Level',
+    'BMI': 'BMI',
+    'Sleep Hours': 'Sleep_Hours',
+    'Triglyceride Level': 'Triglyceride_Level',
+    'Fasting Blood Sugar': 'Fasting_Blood_Sugar',
+    'CRP Level': 'CRP_Level',
+    'Homocysteine Level': 'Homocysteine_Level'
+}
+
+# Orden "crudo" de entrada: alcohol codificado + las 9 variables del scaler
+INPUT_COLUMN_ORDER = [ALCOHOL_COLUMN] + SCALER_COLUMN_ORDER
+
+
+# -----------------------------------------------------------
+# Transformación fusionada (se calcula una vez al cargar)
+# -----------------------------------------------------------
+# Codificación de alcohol + MinMaxScaler + reordenamiento según feature_names
+# quedan reducidos a:
+#
+#     final = raw[:, permutation] * scale + offset
+#
+# donde scale/offset vienen de scaler.scale_ / scaler.min_ y la columna de
+# alcohol pasa sin cambios (scale=1, offset=0). Misma aritmética que
+# scaler.transform (X * scale_ + min_), por lo que el resultado es idéntico.
+
+
+class FusedTransform:
+    def __init__(self, feature_names, scaler, alcohol_mapping):
+        if getattr(scaler, "n_features_in_", len(SCALER_COLUMN_ORDER)) != len(SCALER_COLUMN_ORDER):
+            raise ValueError(f"El scaler espera {scaler.n_features_in_} variables, se esperaban {len(SCALER_COLUMN_ORDER)}")
+        scaler_names = getattr(scaler, "feature_names_in_", None)
+        if scaler_names is not None and list(scaler_names) != SCALER_COLUMN_ORDER:
+            raise ValueError(f"Orden de columnas del scaler inesperado: {list(scaler_names)}")
+        missing = set(feature_names) ^ set(INPUT_COLUMN_ORDER)
+        if missing:
+            raise ValueError(f"feature_names no coincide con las variables de entrada: {sorted(missing)}")
+
+        self.feature_names = list(feature_names)
+        self.alcohol_mapping = dict(alcohol_mapping)
+
+        scale = np.concatenate([[1.0], np.asarray(scaler.scale_, dtype=np.float64)])
+        offset = np.concatenate([[0.0], np.asarray(scaler.min_, dtype=np.float64)])
+
+        self.permutation = np.array([INPUT_COLUMN_ORDER.index(f) for f in self.feature_names], dtype=np.intp)
+        self.scale = scale[self.permutation]
+        self.offset = offset[self.permutation]
+
+        # Columnas escaladas a recortar si el scaler usa clip=True
+        self.clip = bool(getattr(scaler, "clip", False))
+        self.clip_range = tuple(getattr(scaler, "feature_range", (0, 1)))
+        self.scaled_mask = self.permutation != 0
+
+        # Posición de cada columna del scaler dentro del vector del modelo
+        self.scaler_positions = np.array(
+            [self.feature_names.index(col) for col in SCALER_COLUMN_ORDER], dtype=np.intp
+        )
+
+    def raw_row(self, patient, alcohol_value):
+        """Valores de un PatientData validado en INPUT_COLUMN_ORDER"""
+        return [float(alcohol_value)] + [float(getattr(patient, SCALER_FIELD_MAP[col])) for col in SCALER_COLUMN_ORDER]
+
+    def transform(self, raw):
+        """Matriz cruda N x 10 (INPUT_COLUMN_ORDER) -> matriz N x 10 en el orden del modelo"""
+        raw = np.asarray(raw, dtype=np.float64)
+        if raw.ndim == 1:
+            raw = raw.reshape(1, -1)
+        final = raw[:, self.permutation] * self.scale
+        final += self.offset
+        if self.clip:
+            final[:, self.scaled_mask] = np.clip(final[:, self.scaled_mask], *self.clip_range)
+        return final
+
+    def encode_alcohol(self, value):
+        return self.alcohol_mapping[value]
+
+    def transform_patients(self, patients):
+        """PatientData validados -> (matriz del modelo, alcohol codificado por fila)"""
+        alcohol_values = [self.encode_alcohol(p.Alcohol_Consumption) for p in patients]
+        raw = np.array(
+            [self.raw_row(p, a) for p, a in zip(patients, alcohol_values)], dtype=np.float64
+        ).reshape(len(patients), len(INPUT_COLUMN_ORDER))
+        return self.transform(raw), alcohol_values
+
+    def encode_alcohol_column(self, labels):
+        """Arreglo de etiquetas normalizadas -> arreglo de códigos (mapeo por valor único)"""
+        uniques, inverse = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+        codes = np.array([self.alcohol_mapping[u] for u in uniques.tolist()], dtype=np.int64)
+        return codes[inverse]
+
+    def transform_columns(self, columns, rows=None):
+        """
+        Columnas validadas (ver api/validation.py) -> (matriz del modelo,
+        alcohol codificado). `rows` selecciona las filas válidas.
+        """
+        def col(field):
+            values = columns[field]
+            return values if rows is None else values[rows]
+
+        alcohol_values = self.encode_alcohol_column(col("Alcohol_Consumption"))
+        raw = np.empty((len(alcohol_values), len(INPUT_COLUMN_ORDER)), dtype=np.float64)
+        raw[:, 0] = alcohol_values
+        for j, name in enumerate(SCALER_COLUMN_ORDER, start=1):
+            raw[:, j] = col(SCALER_FIELD_MAP[name])
+        return self.transform(raw), alcohol_values
+
+    def scaled_values(self, final):
+        """Valores escalados en SCALER_COLUMN_ORDER (para /predict/debug/)"""
+        return np.asarray(final)[..., self.scaler_positions]
@@ -0,0 +1,222 @@
+# api/registry.py
+import os
+import re
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from api.pipeline import COMPACT_SUBDIR, MODEL_FILE, ScoringPipeline, compact_is_servable
+
+# -----------------------------------------------------------
+# Registro de modelos con recarga en caliente
+# -----------------------------------------------------------
+# Dos modos:
+#   - Directorio versionado (root): cada subdirectorio (v1/, v2/, 2024-06-01/...)
+#     contiene los tres PKL (y opcionalmente su exportación .flat). La
+#     versión es el nombre del subdirectorio; la "más nueva" es la mayor en
+#     orden natural.
+#   - Directorio único (default_dir): se recargan los PKL en su lugar, p.ej.
+#     después de reemplazar modelo_rf_final.pkl.
+#
+# Con compact_dir (o, en modo versionado, <versión>/modelo_rf_final.compact)
+# se sirve la variante reducida del bosque si su concordancia registrada
+# alcanza min_agreement (ver api/compact_forest.py); si no, el modelo completo.
+#
+# La carga y el calentamiento ocurren en segundo plano; el pipeline activo
+# solo se reemplaza (asignación atómica) cuando el nuevo está listo. Los
+# requests leen `registry.active` una sola vez, así un request en vuelo
+# termina con el pipeline con el que empezó. Se conserva el anterior para
+# poder hacer rollback.
+
+EXPORT_SUBDIR = "modelo_rf_final.flat"
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+class ModelRegistry:
+    def __init__(self, default_dir="api", root=None, engine="flat", export_dir=None, poll_seconds=0,
+                 compact=False, compact_dir=None, min_agreement=0.99):
+        self.default_dir = default_dir
+        self.root = root
+        self.engine = engine
+        self.export_dir = export_dir
+        self.compact = compact
+        self.compact_dir = compact_dir
+        self.min_agreement = min_agreement
+        self.poll_seconds = float(poll_seconds or 0)
+        self.active = None
+        self.previous = None
+        self.loading = None
+        self.last_error = None
+        self.last_swap = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._load_counter = 0
+
+    # -------------------------------------------------------
+    # Versiones disponibles
+    # -------------------------------------------------------
+    def versions(self):
+        if not self.root or not os.path.isdir(self.root):
+            return []
+        names = [
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, MODEL_FILE))
+        ]
+        return sorted(names, key=_natural_key)
+
+    def latest_version(self):
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def _location(self, version):
+        if self.root:
+            version = version or self.latest_version()
+            if version is None:
+                raise ValueError(f"No hay versiones en {self.root}")
+            path = os.path.join(self.root, version)
+            if not os.path.isfile(os.path.join(path, MODEL_FILE)):
+                raise ValueError(f"Versión inexistente: {version}")
+            return version, path, os.path.join(path, EXPORT_SUBDIR), os.path.join(path, COMPACT_SUBDIR)
+        return None, self.default_dir, self.export_dir, self.compact_dir
+
+    # -------------------------------------------------------
+    # Carga, calentamiento e intercambio
+    # -------------------------------------------------------
+    def load(self, version=None):
+        """Carga y calienta un pipeline (sin activarlo)"""
+        version, path, export_dir, compact_dir = self._location(version)
+        compact = (self.compact and self.engine == "flat" and compact_dir
+                   and compact_is_servable(compact_dir, path, self.min_agreement))
+        if compact:
+            pipeline = ScoringPipeline.from_export(compact_dir, base_dir=path)
+        else:
+            pipeline = ScoringPipeline.from_dir(path, engine=self.engine, export_dir=export_dir)
+        if version is not None:
+            pipeline.version = version
+            if compact:
+                # Las predicciones de la variante se distinguen en caché y en responses.db
+                pipeline.version += f"+{pipeline.metadata['compact_variant']}"
+        return self._prepare(pipeline)
+
+    def _prepare(self, pipeline):
+        self._warm(pipeline)
+        with self._lock:
+            self._load_counter += 1
+            pipeline.load_id = self._load_counter
+        return pipeline
+
+    @staticmethod
+    def _warm(pipeline):
+        # Toca todas las páginas del bosque y valida la forma de la salida
+        X = np.zeros((8, len(pipeline.feature_names)))
+        preds, proba = pipeline.run_model(X)
+        if proba.shape != (8, len(pipeline.classes_)):
+            raise ValueError(f"Salida inesperada del modelo: {proba.shape}")
+
+    def add_listener(self, fn):
+        """fn(nuevo_pipeline) se llama después de cada intercambio"""
+        self._listeners.append(fn)
+
+    def _swap(self, pipeline):
+        with self._lock:
+            self.previous, self.active = self.active, pipeline
+            self.last_swap = time.time()
+        for fn in self._listeners:
+            fn(pipeline)
+
+    def activate(self, version=None):
+        """Carga (bloqueante) y activa; usado al arrancar"""
+        pipeline = self.load(version)
+        self._swap(pipeline)
+        return pipeline
+
+    def install(self, pipeline):
+        """Calienta y activa un pipeline ya construido (p.ej. adjunto a memoria compartida)"""
+        self._swap(self._prepare(pipeline))
+        return pipeline
+
+    def reload(self, version=None, background=True):
+        """
+        Carga la versión pedida (o la más nueva) y la activa cuando esté lista.
+        Devuelve False si ya hay una recarga en curso.
+        """
+        with self._lock:
+            if self.loading is not None:
+                return False
+            self.loading = version or self.latest_version() or "current"
+
+        def _do():
+            try:
+                self._swap(self.load(version))
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                warnings.warn(f"Recarga de modelo fallida, se mantiene la versión activa: {e}")
+            finally:
+                with self._lock:
+                    self.loading = None
+
+        if background:
+            threading.Thread(target=_do, name="cardiai-model-reload", daemon=True).start()
+        else:
+            _do()
+        return True
+
+    def rollback(self):
+        """Vuelve a la versión anterior (ya cargada, intercambio inmediato)"""
+        with self._lock:
+            if self.previous is None:
+                return False
+            self.active, self.previous = self.previous, self.active
+            self.last_swap = time.time()
+            active = self.active
+        for fn in self._listeners:
+            fn(active)
+        return True
+
+    # -------------------------------------------------------
+    # Vigilancia del directorio versionado
+    # -------------------------------------------------------
+    def start_watcher(self):
+        if not self.root or self.poll_seconds <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="cardiai-model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(5.0)
+            self._watcher = None
+
+    def _watch(self):
+        seen = self.latest_version()
+        while not self._stop.wait(self.poll_seconds):
+            latest = self.latest_version()
+            if latest is not None and latest != seen:
+                seen = latest
+                self.reload(latest, background=False)
+
+    def status(self):
+        active = self.active
+        previous = self.previous
+        return {
+            "mode": "versioned" if self.root else "single",
+            "root": self.root or self.default_dir,
+            "active_version": active.version if active is not None else None,
+            "previous_version": previous.version if previous is not None else None,
+            "compact_variant": active.metadata.get("compact_variant") if active is not None else None,
+            "available_versions": self.versions(),
+            "loading": self.loading,
+            "last_error": self.last_error,
+            "last_swap": self.last_swap,
+            "watch_interval_seconds": self.poll_seconds if self.root else None,
+        }
@@ -0,0 +1,77 @@
+# api/schemas.py
+import math
+from typing import Any, List
+
+from pydantic import BaseModel, Field, field_validator
+
+# Valores aceptados de Alcohol_Consumption (normalizados a minúsculas)
+ALCOHOL_ALIASES = {
+    "low": "Low",
+    "medium": "Medium",
+    "high": "High",
+    "bajo": "Low",
+    "medio": "Medium",
+    "alto": "High"
+}
+
+# -----------------------------------------------------------
+# Pydantic Input Model
+# -----------------------------------------------------------
+class PatientData(BaseModel):
+    Alcohol_Consumption: str = Field(..., description="Low, Medium, High")
+    Homocysteine_Level: float
+    CRP_Level: float
+    BMI: float
+    Sleep_Hours: float
+    Triglyceride_Level: float
+    Cholesterol_Level: float
+    Fasting_Blood_Sugar: float
+    Blood_Pressure: float
+    Age: int
+
+    @field_validator("Alcohol_Consumption", mode="before")
+    @classmethod
+    def validate_alcohol(cls, v):
+        if not isinstance(v, str):
+            raise ValueError("Debe ser texto")
+        normalized = v.strip().lower()
+        if normalized not in ALCOHOL_ALIASES:
+            raise ValueError("Alcohol_Consumption debe ser Low/Medium/High")
+        return ALCOHOL_ALIASES[normalized]
+
+    @field_validator(
+        "Homocysteine_Level", "CRP_Level", "BMI", "Sleep_Hours",
+        "Triglyceride_Level", "Cholesterol_Level",
+        "Fasting_Blood_Sugar", "Blood_Pressure",
+        mode="before"
+    )
+    @classmethod
+    def validate_numeric(cls, v, info):
+        try:
+            val = float(v)
+        except:
+            raise ValueError(f"{info.field_name} debe ser numérico")
+        # NaN se acepta (el modelo lo enruta como sklearn); infinito no
+        if math.isinf(val):
+            raise ValueError(f"{info.field_name} debe ser finito")
+        if val < 0:
+            raise ValueError(f"{info.field_name} debe ser >= 0")
+        return val
+
+    @field_validator("Age", mode="before")
+    @classmethod
+    def validate_age(cls, v):
+        try:
+            age = int(v)
+        except:
+            raise ValueError("Age debe ser entero")
+        if not (0 <= age <= 120):
+            raise ValueError("Age debe estar entre 0 y 120")
+        return age
+
+
+class BatchPatientData(BaseModel):
+    # Se reciben valores crudos para validar cada fila por separado: una
+    # fila inválida (incluso si no es un objeto, p.ej. null o un número)
+    # no debe tumbar todo el lote
+    patients: List[Any] = Field(..., description="Lista de pacientes (mismo formato que /predict/)")
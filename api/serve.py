@@ -0,0 +1,66 @@
+# api/serve.py
+"""
+Lanza la API con varios workers de uvicorn que comparten un único bosque.
+
+El proceso padre carga el pipeline una vez, publica los arreglos del
+bosque plano en memoria compartida (api/shared.py) y pasa el nombre del
+segmento a los workers en CARDIAI_SHARED_MODEL. Cada worker se adjunta en
+modo solo lectura: las predicciones son idénticas y la memoria privada por
+worker queda en la base de Python. El segmento se libera al salir.
+
+Uso:
+    python -m api.serve --workers 4 --port 10000
+    python -m api.serve --workers 8 --registry-dir /models
+"""
+import argparse
+import gc
+import os
+
+from api.pipeline import COMPACT_SUBDIR
+from api.registry import ModelRegistry
+from api.shared import publish_pipeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API con bosque en memoria compartida entre workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--artifact-dir", default=os.getenv("CARDIAI_ARTIFACT_DIR", "api"),
+                        help="Directorio con los archivos PKL")
+    parser.add_argument("--export-dir", default=os.getenv("CARDIAI_EXPORT_DIR"),
+                        help="Exportación .flat (por defecto <artifact-dir>/modelo_rf_final.flat)")
+    parser.add_argument("--registry-dir", default=os.getenv("CARDIAI_MODEL_REGISTRY_DIR") or None,
+                        help="Registro versionado: se publica la versión más nueva")
+    parser.add_argument("--compact", action="store_true",
+                        default=os.getenv("CARDIAI_COMPACT_MODEL", "0").strip().lower() in ("1", "true", "yes"),
+                        help="Publicar la variante reducida si alcanza la concordancia mínima (api/compact_forest.py)")
+    parser.add_argument("--compact-dir", default=os.getenv("CARDIAI_COMPACT_MODEL_DIR"),
+                        help=f"Variante reducida (por defecto <artifact-dir>/{COMPACT_SUBDIR})")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    export_dir = args.export_dir or os.path.join(args.artifact_dir, "modelo_rf_final.flat")
+    registry = ModelRegistry(default_dir=args.artifact_dir, root=args.registry_dir,
+                             engine="flat", export_dir=export_dir, compact=args.compact,
+                             compact_dir=args.compact_dir or os.path.join(args.artifact_dir, COMPACT_SUBDIR),
+                             min_agreement=float(os.getenv("CARDIAI_COMPACT_MIN_AGREEMENT", "0.99")))
+    pipeline = registry.load()
+    shm = publish_pipeline(pipeline)
+    print(f"Bosque publicado en memoria compartida '{shm.name}' ({shm.size / 1e6:.1f} MB) - "
+          f"versión {pipeline.version}")
+    # El padre no necesita su copia privada una vez publicada
+    del pipeline, registry
+    gc.collect()
+
+    os.environ["CARDIAI_SHARED_MODEL"] = shm.name
+    try:
+        uvicorn.run("api.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+if __name__ == "__main__":
+    main()
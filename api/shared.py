@@ -0,0 +1,137 @@
+# api/shared.py
+import json
+import mmap
+import os
+import struct
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from api.forest import FlatForest
+from api.pipeline import ScoringPipeline, pipeline_manifest
+
+# -----------------------------------------------------------
+# Bosque en memoria compartida entre workers
+# -----------------------------------------------------------
+# El proceso padre (api/serve.py) publica UNA vez los arreglos del bosque
+# plano en un segmento de memoria compartida; cada worker de uvicorn se
+# adjunta por nombre (CARDIAI_SHARED_MODEL) y crea vistas NumPy de solo
+# lectura sobre ese buffer. Los workers no deserializan el pickle ni
+# importan sklearn: su memoria privada queda en la base de Python.
+#
+# Formato del segmento:
+#   [u64 largo del header][header JSON][arreglos alineados a 64 bytes]
+# El header contiene el manifiesto del pipeline (igual al de la exportación)
+# y, por cada arreglo, su offset, dtype y forma.
+
+ALIGN = 64
+_LENGTH = struct.Struct("<Q")
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def publish_pipeline(pipeline, name=None):
+    """
+    Copia el bosque y el manifiesto del pipeline a un segmento nuevo.
+    Devuelve el SharedMemory; quien publica debe hacer close() + unlink().
+    """
+    forest = pipeline.flat_forest
+    if forest is None:
+        raise ValueError("La memoria compartida requiere el motor 'flat'")
+
+    arrays = {name_: np.ascontiguousarray(getattr(forest, name_)) for name_ in FlatForest.ARRAYS}
+    if arrays["classes_"].dtype.hasobject:
+        arrays["classes_"] = arrays["classes_"].astype(str)
+
+    layout = {}
+    offset = 0
+    for key, arr in arrays.items():
+        layout[key] = {"offset": offset, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+        offset = _align(offset + arr.nbytes)
+
+    header = json.dumps({
+        "pipeline": pipeline_manifest(pipeline.feature_names, pipeline.metadata,
+                                      pipeline.scaler, pipeline.alcohol_encoder),
+        "version": pipeline.version,
+        "forest": {"max_depth": forest.max_depth},
+        "arrays": layout,
+    }, default=str).encode()
+    data_start = _align(_LENGTH.size + len(header))
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=data_start + max(offset, 1))
+    _LENGTH.pack_into(shm.buf, 0, len(header))
+    shm.buf[_LENGTH.size:_LENGTH.size + len(header)] = header
+    for key, arr in arrays.items():
+        start = data_start + layout[key]["offset"]
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf, offset=start)[...] = arr
+    return shm
+
+
+class _AttachedSegment:
+    """Segmento POSIX mapeado por nombre, sin pasar por el resource_tracker"""
+
+    def __init__(self, name):
+        import _posixshmem
+
+        self.name = name
+        fd = _posixshmem.shm_open("/" + name.lstrip("/"), os.O_RDWR, mode=0o600)
+        try:
+            self.size = os.fstat(fd).st_size
+            self._mmap = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        self.buf = memoryview(self._mmap)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+
+def _open(name):
+    """Se adjunta sin registrar el segmento en el resource_tracker del worker"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    if os.name != "posix":
+        # En Windows adjuntarse no registra nada en el tracker
+        return shared_memory.SharedMemory(name=name)
+    # Antes de 3.13 SharedMemory(name=...) registra el segmento en el tracker,
+    # que haría unlink al terminar el worker (borrándolo para los demás), y
+    # desregistrarlo después borraría también el registro de quien publica
+    # (el tracker es compartido y guarda un conjunto). Se mapea directamente.
+    return _AttachedSegment(name)
+
+
+def attach_pipeline(name, base_dir="api"):
+    """ScoringPipeline cuyo bosque son vistas de solo lectura sobre el segmento `name`"""
+    shm = _open(name)
+    (length,) = _LENGTH.unpack_from(shm.buf, 0)
+    header = json.loads(bytes(shm.buf[_LENGTH.size:_LENGTH.size + length]))
+    data_start = _align(_LENGTH.size + length)
+
+    arrays = {}
+    for key, spec in header["arrays"].items():
+        arr = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]),
+                         buffer=shm.buf, offset=data_start + spec["offset"])
+        arr.flags.writeable = False
+        arrays[key] = arr
+
+    forest = FlatForest(
+        feature=arrays["feature"],
+        threshold=arrays["threshold"],
+        left=arrays["left"],
+        right=arrays["right"],
+        value=arrays["value"],
+        roots=arrays["roots"],
+        max_depth=header["forest"]["max_depth"],
+        classes=arrays["classes_"],
+        missing_left=arrays["missing_left"],
+    )
+    pipeline = ScoringPipeline.from_manifest(header["pipeline"], forest, base_dir=base_dir,
+                                             source="shared-memory")
+    pipeline.version = header["version"]
+    # Las vistas dependen del buffer: el segmento vive mientras viva el pipeline
+    pipeline.shared_memory = shm
+    return pipeline
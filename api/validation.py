@@ -0,0 +1,248 @@
+# api/validation.py
+import numpy as np
+
+from api.schemas import ALCOHOL_ALIASES, PatientData
+
+# -----------------------------------------------------------
+# Validación columnar para lotes
+# -----------------------------------------------------------
+# Aplica las mismas reglas que PatientData (validate_alcohol,
+# validate_numeric, validate_age) sobre columnas NumPy completas en vez de
+# fila por fila, sin crear un objeto Pydantic por paciente.
+#
+# Los mensajes de error son idénticos a los de Pydantic ("Value error, ...",
+# "Field required"), en el mismo orden de campos, así /predict/batch/ y
+# /predict/stream/ responden exactamente igual que antes.
+#
+# Camino rápido: si la columna ya es numérica (lo normal con JSON) o son
+# todos textos parseables (CSV), se valida con operaciones vectorizadas.
+# Si hay valores mezclados o inválidos, esa columna se revisa valor por
+# valor con la misma semántica de float()/int() de Python.
+
+FIELDS = list(PatientData.model_fields)
+ALCOHOL_FIELD = "Alcohol_Consumption"
+AGE_FIELD = "Age"
+NUMERIC_FIELDS = [f for f in FIELDS if f not in (ALCOHOL_FIELD, AGE_FIELD)]
+
+MISSING_MESSAGE = "Field required"
+MODEL_TYPE_MESSAGE = "Input should be a valid dictionary or instance of PatientData"
+
+# Marcador de campo ausente (distinto de None, que es un valor inválido)
+_MISSING = object()
+
+
+def _value_error(message):
+    return f"Value error, {message}"
+
+
+class ValidatedColumns:
+    """
+    Resultado de la validación columnar.
+
+    - valid: máscara booleana por fila
+    - errors: {fila: [{"field", "message"}, ...]} solo para filas inválidas
+    - columns: {campo: arreglo NumPy} con los valores ya normalizados
+      (alcohol como "Low"/"Medium"/"High", numéricos float64, Age int64).
+      En filas inválidas el contenido no está definido.
+    """
+
+    def __init__(self, n_rows, valid, errors, columns):
+        self.n_rows = n_rows
+        self.valid = valid
+        self.errors = errors
+        self.columns = columns
+
+    @property
+    def valid_indices(self):
+        return np.flatnonzero(self.valid)
+
+    def select(self, field, rows=None):
+        column = self.columns[field]
+        return column if rows is None else column[rows]
+
+    def iter_rows(self, fields, rows=None):
+        """Tuplas de valores Python por fila (p.ej. para persistir)"""
+        rows = self.valid_indices if rows is None else rows
+        return zip(*(self.columns[f][rows].tolist() for f in fields))
+
+
+# -----------------------------------------------------------
+# Validadores por columna: devuelven (valores, {fila: mensaje})
+# -----------------------------------------------------------
+def _as_array(values):
+    if isinstance(values, np.ndarray):
+        return values
+    try:
+        arr = np.asarray(values)
+    except (ValueError, TypeError):
+        arr = None
+    if arr is None or arr.ndim != 1:
+        # Valores anidados (listas, dicts): se conservan como objetos
+        arr = np.empty(len(values), dtype=object)
+        for i, v in enumerate(values):
+            arr[i] = v
+    return arr
+
+
+def _items(values, arr):
+    """Valores originales (no los convertidos por np.asarray) para el camino lento"""
+    return arr.tolist() if isinstance(values, np.ndarray) else values
+
+
+def _all_str(values, arr):
+    if arr.dtype.kind != "U":
+        return False
+    # np.asarray(["a", 1]) también da dtype U: hay que confirmar los tipos originales
+    return isinstance(values, np.ndarray) or set(map(type, values)) == {str}
+
+
+def _validate_alcohol(values, n):
+    arr = _as_array(values)
+    out = np.empty(n, dtype=object)
+    errors = {}
+
+    if _all_str(values, arr):
+        uniques, inverse = np.unique(arr, return_inverse=True)
+        canonical = [ALCOHOL_ALIASES.get(u.strip().lower()) for u in uniques.tolist()]
+        out[:] = np.asarray(canonical, dtype=object)[inverse]
+        bad = [i for i, c in enumerate(canonical) if c is None]
+        if bad:
+            for row in np.flatnonzero(np.isin(inverse, bad)).tolist():
+                errors[row] = _value_error("Alcohol_Consumption debe ser Low/Medium/High")
+        return out, errors
+
+    for i, v in enumerate(_items(values, arr)):
+        if v is _MISSING:
+            errors[i] = MISSING_MESSAGE
+        elif not isinstance(v, str):
+            errors[i] = _value_error("Debe ser texto")
+        else:
+            canonical = ALCOHOL_ALIASES.get(v.strip().lower())
+            if canonical is None:
+                errors[i] = _value_error("Alcohol_Consumption debe ser Low/Medium/High")
+            out[i] = canonical
+    return out, errors
+
+
+def _validate_numeric(values, n, field):
+    arr = _as_array(values)
+    errors = {}
+
+    out = None
+    if arr.dtype.kind in "biuf":
+        # Sin copia si ya es float64 (p.ej. vista sobre un buffer Arrow)
+        out = arr.astype(np.float64, copy=False)
+    elif _all_str(values, arr):
+        try:
+            out = arr.astype(np.float64)
+        except ValueError:
+            out = None
+
+    if out is None:
+        out = np.zeros(n, dtype=np.float64)
+        for i, v in enumerate(_items(values, arr)):
+            if v is _MISSING:
+                errors[i] = MISSING_MESSAGE
+                continue
+            try:
+                out[i] = float(v)
+            except Exception:
+                errors[i] = _value_error(f"{field} debe ser numérico")
+
+    # NaN no es < 0: pasa igual que en PatientData; infinito se rechaza
+    for row in np.flatnonzero(np.isinf(out)).tolist():
+        errors.setdefault(row, _value_error(f"{field} debe ser finito"))
+    for row in np.flatnonzero(out < 0).tolist():
+        errors.setdefault(row, _value_error(f"{field} debe ser >= 0"))
+    return out, errors
+
+
+def _validate_age(values, n):
+    arr = _as_array(values)
+    errors = {}
+    out = np.zeros(n, dtype=np.int64)
+    not_int = _value_error("Age debe ser entero")
+
+    if arr.dtype.kind in "biu":
+        ages = arr.astype(np.float64)
+        out[:] = arr
+    elif arr.dtype.kind == "f":
+        # int(v) trunca hacia cero; NaN/inf no son enteros
+        finite = np.isfinite(arr)
+        for row in np.flatnonzero(~finite).tolist():
+            errors[row] = not_int
+        ages = np.where(finite, np.trunc(np.where(finite, arr, 0)), 0)
+        out[finite] = np.clip(ages[finite], -1, 121).astype(np.int64)
+    else:
+        ages = np.zeros(n, dtype=np.float64)
+        for i, v in enumerate(_items(values, arr)):
+            if v is _MISSING:
+                errors[i] = MISSING_MESSAGE
+                continue
+            try:
+                age = int(v)
+            except Exception:
+                errors[i] = not_int
+                continue
+            ages[i] = max(-1, min(121, age))
+            out[i] = ages[i]
+
+    out_of_range = (ages < 0) | (ages > 120)
+    for row in np.flatnonzero(out_of_range).tolist():
+        errors.setdefault(row, _value_error("Age debe estar entre 0 y 120"))
+    return out, errors
+
+
+# -----------------------------------------------------------
+# API
+# -----------------------------------------------------------
+def validate_columns(columns, n_rows=None, invalid_rows=None):
+    """
+    Valida un lote dado como {campo: secuencia/arreglo}. Un campo ausente
+    del dict se reporta como "Field required" en todas las filas; dentro de
+    una secuencia el marcador _MISSING indica ausencia en esa fila.
+    `invalid_rows` = {fila: mensaje} para filas rechazadas antes (p.ej. no
+    eran un objeto JSON).
+    """
+    if n_rows is None:
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+
+    values = {}
+    field_errors = {}
+    for field in FIELDS:
+        column = columns.get(field)
+        if column is None and field not in columns:
+            values[field] = np.zeros(n_rows, dtype=object if field == ALCOHOL_FIELD else np.float64)
+            field_errors[field] = dict.fromkeys(range(n_rows), MISSING_MESSAGE)
+            continue
+        if field == ALCOHOL_FIELD:
+            values[field], field_errors[field] = _validate_alcohol(column, n_rows)
+        elif field == AGE_FIELD:
+            values[field], field_errors[field] = _validate_age(column, n_rows)
+        else:
+            values[field], field_errors[field] = _validate_numeric(column, n_rows, field)
+
+    # Errores por fila en el orden de campos de PatientData
+    errors = {}
+    for field in FIELDS:
+        for row, message in field_errors[field].items():
+            errors.setdefault(row, []).append({"field": field, "message": message})
+    for row, message in (invalid_rows or {}).items():
+        errors[row] = [{"field": "", "message": message}]
+
+    valid = np.ones(n_rows, dtype=bool)
+    if errors:
+        valid[list(errors)] = False
+    return ValidatedColumns(n_rows, valid, errors, values)
+
+
+def validate_records(records):
+    """Lista de dicts crudos (JSON) -> ValidatedColumns"""
+    invalid_rows = {}
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            invalid_rows[i] = MODEL_TYPE_MESSAGE
+    empty = {}
+    rows = [r if isinstance(r, dict) else empty for r in records] if invalid_rows else records
+    columns = {field: [r.get(field, _MISSING) for r in rows] for field in FIELDS}
+    return validate_columns(columns, len(records), invalid_rows)
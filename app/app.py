@@ -1,5 +1,6 @@
 import streamlit as st
-import base64
+
+from assets import LANDING_OVERLAY, LANDING_STYLESHEETS, background_css, build_background, page_style
 
 
 st.set_page_config(
@@ -9,120 +10,21 @@ st.set_page_config(
 )
 
 # ---------------------------------------------------------
-# Cargar fondo como base64
+# Fondo y CSS (ver app/assets.py)
 # ---------------------------------------------------------
-def get_base64(bin_file):
-    with open(bin_file, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+# Las variantes del fondo se generan una vez por proceso y el navegador las
+# descarga como archivos estáticos; en cada rerun solo viaja un <style> chico
+@st.cache_resource
+def background_variants():
+    return build_background()
 
-bg_image = get_base64("assets/images/fondo.jpg")
 
-# ---------------------------------------------------------
-# CSS
-# ---------------------------------------------------------
-st.markdown(
-    f"""
-    <style>
-
-    /* Fondo global */
-    [data-testid="stAppViewContainer"] {{
-        background:
-            linear-gradient(rgba(0,0,0,0.45), rgba(0,0,0,0.45)),
-            url("data:image/jpg;base64,{bg_image}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-    }}
-
-    /* Contenedor del contenido */
-    .block-container {{
-        background: rgba(255,255,255,0.92);
-        padding: 2rem 2.5rem;
-        border-radius: 15px;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.25);
-        backdrop-filter: blur(5px);
-        max-width: 850px;
-        margin-top: 2rem;
-        margin-bottom: 2rem;
-    }}
-
-    /* Título */
-    h1 {{
-        text-align: center;
-        color: black;
-        font-size: 2.6rem;
-        font-weight: 700;
-    }}
-
-    /* Línea decorativa */
-    h1::after {{
-        content: "";
-        display: block;
-        width: 120px;
-        height: 4px;
-        background: #3b62f0;
-        margin: 10px auto 0 auto;
-        border-radius: 5px;
-        animation: fadeIn 1.2s ease-out;
-    }}
-
-    /* Slogan */
-    .slogan {{
-        text-align: center;
-        font-size: 1.35rem;
-        font-weight: 500;
-        color: #374151;
-        margin-top: -10px;
-        margin-bottom: 1.5rem;
-    }}
-
-    /* Animación */
-    @keyframes fadeIn {{
-        0% {{ opacity: 0; transform: translateY(10px); }}
-        100% {{ opacity: 1; transform: translateY(0); }}
-    }}
-
-    /* Íconos */
-    .icon-title {{
-        font-size: 4.2rem;
-        text-align: center;
-        animation: fadeIn 1s ease-in-out;
-    }}
-
-    /* Subtítulos */
-    .section-title {{
-        background: rgba(59, 98, 240, 0.15);
-        padding: 6px 14px;
-        border-left: 5px solid #3b62f0;
-        border-radius: 8px;
-        font-weight: 700;
-        display: inline-block;
-    }}
-
-    /* BOTÓN — selector actualizado */
-    div.btn-enter button[kind="primary"] {{
-        background-color: #3b62f0 !important;
-        color: white !important;
-        border-radius: 12px;
-        padding: 0.9rem 2.2rem;
-        font-size: 1.3rem;
-        font-weight: bold;
-        width: 100%;
-        border: none;
-        box-shadow: 0 6px 16px rgba(0,0,0,0.25);
-        transition: 0.3s;
-    }}
-
-    div.btn-enter button[kind="primary"]:hover {{
-        background-color: #2748c7 !important;
-        transform: scale(1.06);
-    }}
-
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+@st.cache_data
+def landing_style():
+    return page_style(LANDING_STYLESHEETS, background_css(background_variants(), LANDING_OVERLAY))
+
+
+st.markdown(landing_style(), unsafe_allow_html=True)
 
 # ---------------------------------------------------------
 # CONTENIDO
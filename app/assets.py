@@ -0,0 +1,190 @@
+# app/assets.py
+"""
+Assets estáticos de la app de Streamlit.
+
+Antes cada rerun leía fondo.jpg, lo codificaba en base64 y lo enviaba
+embebido en un bloque CSS (~76 KB por interacción). Ahora:
+
+  - El fondo se genera UNA vez en variantes redimensionadas (JPEG
+    progresivo + WebP) con el hash del original en el nombre, dentro de
+    app/static/generated/. Streamlit las sirve como archivos estáticos
+    (server.enableStaticServing en .streamlit/config.toml), así el
+    navegador las descarga una vez y las reutiliza.
+  - El CSS de cada página vive en app/styles/*.css y se envía minificado.
+    No se sirve como estático: Streamlit entrega los .css como text/plain
+    con nosniff y el navegador no los aplicaría.
+
+Las páginas llaman a build_background() con st.cache_resource (una vez por
+proceso) y arman el <style> con st.cache_data (compartido entre reruns y
+sesiones).
+
+Uso:
+    python app/assets.py    # genera las variantes y muestra el reporte de tamaños
+"""
+import base64
+import hashlib
+import io
+import logging
+import os
+import re
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+GENERATED_DIR = os.path.join(STATIC_DIR, "generated")
+STYLES_DIR = os.path.join(APP_DIR, "styles")
+# Ruta pública de app/static (relativa a la página, respeta server.baseUrlPath)
+STATIC_URL = "app/static"
+
+BACKGROUND_SOURCE = os.path.join(os.path.dirname(APP_DIR), "assets", "images", "fondo.jpg")
+BACKGROUND_WIDTHS = (1024, 768, 480)
+JPEG_QUALITY = 78
+WEBP_QUALITY = 72
+BACKGROUND_SELECTOR = '[data-testid="stAppViewContainer"]'
+
+# Hojas de estilo de cada página (en app/styles/)
+LANDING_STYLESHEETS = ("landing.css",)
+LANDING_OVERLAY = "linear-gradient(rgba(0,0,0,0.45), rgba(0,0,0,0.45))"
+APP_STYLESHEETS = ("app.css",)
+
+logger = logging.getLogger("cardiai.assets")
+
+
+def _digest(data, length=10):
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def _write_atomic(path, data):
+    # Varias sesiones pueden generar a la vez: se escribe aparte y se renombra
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# -----------------------------------------------------------
+# Variantes del fondo
+# -----------------------------------------------------------
+def build_background(source=BACKGROUND_SOURCE, widths=BACKGROUND_WIDTHS, out_dir=GENERATED_DIR):
+    """
+    Genera (si no existen) las variantes del fondo. Devuelve una lista de
+    dicts {"width", "jpeg", "webp", "jpeg_bytes", "webp_bytes"} de mayor a
+    menor ancho; "jpeg"/"webp" son URLs relativas a la página.
+    """
+    from PIL import Image, ImageOps
+
+    with open(source, "rb") as f:
+        data = f.read()
+    tag = _digest(data + f"{JPEG_QUALITY}:{WEBP_QUALITY}".encode())
+    stem = os.path.splitext(os.path.basename(source))[0]
+    os.makedirs(out_dir, exist_ok=True)
+
+    image = None
+    variants = []
+    for width in sorted(set(widths), reverse=True):
+        entry = {"width": width}
+        for fmt, ext, options in (
+            ("JPEG", "jpeg", {"quality": JPEG_QUALITY, "optimize": True, "progressive": True}),
+            ("WEBP", "webp", {"quality": WEBP_QUALITY, "method": 6}),
+        ):
+            name = f"{stem}-{width}-{tag}.{ext}"
+            path = os.path.join(out_dir, name)
+            if not os.path.exists(path):
+                if image is None:
+                    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert("RGB")
+                # Nunca se agranda: el ancho máximo es el del original
+                w = min(width, image.width)
+                resized = image if w == image.width else image.resize(
+                    (w, round(image.height * w / image.width)), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, fmt, **options)
+                _write_atomic(path, buffer.getvalue())
+            entry[ext] = f"{STATIC_URL}/{os.path.relpath(path, STATIC_DIR)}"
+            entry[f"{ext}_bytes"] = os.path.getsize(path)
+        variants.append(entry)
+
+    logger.info("Fondo: %s", ", ".join(
+        f"{v['width']}px {v['webp_bytes'] // 1024} KB webp / {v['jpeg_bytes'] // 1024} KB jpeg" for v in variants))
+    return variants
+
+
+def background_css(variants, overlay, selector=BACKGROUND_SELECTOR):
+    """
+    Reglas background-image: la variante más grande por defecto y media
+    queries para pantallas angostas. image-set() elige WebP si el navegador
+    lo soporta; la declaración previa en JPEG es el respaldo.
+    """
+    def declarations(v):
+        return (
+            f'background-image: {overlay}, url("{v["jpeg"]}");'
+            f' background-image: {overlay}, image-set(url("{v["webp"]}") type("image/webp"),'
+            f' url("{v["jpeg"]}") type("image/jpeg"));'
+        )
+
+    rules = [f"{selector} {{ {declarations(variants[0])} }}"]
+    for smaller in variants[1:]:
+        # Con pantallas de hasta el ancho de la variante chica alcanza con ella
+        rules.append(f"@media (max-width: {smaller['width']}px) {{ {selector} {{ {declarations(smaller)} }} }}")
+    return "\n".join(rules)
+
+
+# -----------------------------------------------------------
+# Hojas de estilo
+# -----------------------------------------------------------
+def minify_css(css):
+    """Quita comentarios y espacios redundantes"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};])\s*", r"\1", css).strip()
+
+
+def page_style(stylesheets, extra_css=""):
+    """<style> de la página: hojas de app/styles/ + CSS dinámico, minificado"""
+    parts = []
+    for name in stylesheets:
+        with open(os.path.join(STYLES_DIR, name), encoding="utf-8") as f:
+            parts.append(f.read())
+    parts.append(extra_css)
+    return f"<style>{minify_css(chr(10).join(parts))}</style>"
+
+
+# -----------------------------------------------------------
+# Reporte de tamaños
+# -----------------------------------------------------------
+def payload_report():
+    """Bytes que se envían por rerun (antes/después) y tamaño de cada asset"""
+    with open(BACKGROUND_SOURCE, "rb") as f:
+        inline_before = len(base64.b64encode(f.read()))
+    css_before = {
+        name: os.path.getsize(os.path.join(STYLES_DIR, name))
+        for name in LANDING_STYLESHEETS + APP_STYLESHEETS
+    }
+    variants = build_background()
+    landing = page_style(LANDING_STYLESHEETS, background_css(variants, LANDING_OVERLAY))
+    return {
+        "background_source_bytes": os.path.getsize(BACKGROUND_SOURCE),
+        "inline_background_bytes_before": inline_before,
+        "stylesheet_bytes_unminified": css_before,
+        "inline_style_bytes_per_rerun": {
+            "app.py": len(landing.encode()),
+            "pages/1_App.py": len(page_style(APP_STYLESHEETS).encode()),
+        },
+        "static_files": {
+            os.path.relpath(os.path.join(root, name), APP_DIR): os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(STATIC_DIR) for name in sorted(names)
+        },
+    }
+
+
+if __name__ == "__main__":
+    report = payload_report()
+    print(f"Fondo original:                 {report['background_source_bytes']:>8,} bytes")
+    print(f"Fondo en base64 (antes, por rerun): {report['inline_background_bytes_before']:>8,} bytes")
+    print("CSS sin minificar:")
+    for name, size in report["stylesheet_bytes_unminified"].items():
+        print(f"  {name:<48} {size:>8,} bytes")
+    print("<style> enviado por rerun:")
+    for page, size in report["inline_style_bytes_per_rerun"].items():
+        print(f"  {page:<48} {size:>8,} bytes")
+    print("Archivos estáticos (se descargan una vez y quedan en caché):")
+    for name, size in report["static_files"].items():
+        print(f"  {name:<48} {size:>8,} bytes")
@@ -0,0 +1,221 @@
+# app/batch.py
+import io
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import requests
+
+# -----------------------------------------------------------
+# Evaluación por lotes desde un archivo (pages/2_Lote.py)
+# -----------------------------------------------------------
+# Flujo: leer CSV/Excel -> mapear columnas a los campos de PatientData ->
+# validar en el cliente (vectorizado, mismas reglas que api/schemas.py) ->
+# enviar SOLO las filas válidas a /predict/batch/ en chunks (varios en
+# paralelo por el pool keep-alive del cliente) -> reunir los resultados en
+# el orden original. Un chunk fallido marca sus filas con el error y no
+# detiene el resto.
+
+# Campos de PatientData (api/schemas.py), en el mismo orden
+FIELDS = (
+    "Alcohol_Consumption", "Homocysteine_Level", "CRP_Level", "BMI", "Sleep_Hours",
+    "Triglyceride_Level", "Cholesterol_Level", "Fasting_Blood_Sugar", "Blood_Pressure", "Age"
+)
+NUMERIC_FIELDS = FIELDS[1:-1]
+
+# Mismo mapa que api/schemas.py: la app se despliega aparte y no importa la API
+ALCOHOL_ALIASES = {
+    "low": "Low",
+    "medium": "Medium",
+    "high": "High",
+    "bajo": "Low",
+    "medio": "Medium",
+    "alto": "High"
+}
+
+# Filas por request y requests simultáneos
+CHUNK_SIZE = int(os.getenv("CARDIAI_BATCH_CHUNK_SIZE", "500"))
+PARALLEL_CHUNKS = int(os.getenv("CARDIAI_BATCH_PARALLEL", "4"))
+MAX_ROWS = int(os.getenv("CARDIAI_BATCH_MAX_ROWS", "50000"))
+
+# Solo .xlsx: openpyxl (app/requirements.txt) no lee el formato .xls antiguo
+EXCEL_EXTENSIONS = (".xlsx",)
+
+# Columnas que se agregan al archivo evaluado
+RESULT_COLUMNS = ("prediction", "risk_label", "prob_high_risk", "confidence", "error")
+
+
+# -----------------------------------------------------------
+# Lectura y columnas
+# -----------------------------------------------------------
+def read_table(name, data):
+    """DataFrame del archivo subido (CSV con ',' o ';', o Excel .xlsx)"""
+    if name.lower().endswith(EXCEL_EXTENSIONS):
+        # Requiere openpyxl (ImportError si no está instalado)
+        return pd.read_excel(io.BytesIO(data))
+    first_line = data.split(b"\n", 1)[0]
+    sep = ";" if first_line.count(b";") > first_line.count(b",") else ","
+    return pd.read_csv(io.BytesIO(data), sep=sep, encoding="utf-8-sig")
+
+
+def _column_key(name):
+    # "Alcohol Consumption", "alcohol-consumption" y "Alcohol_Consumption" son la misma columna
+    return re.sub(r"[\s\-]+", "_", str(name).strip()).lower()
+
+
+def match_columns(df):
+    """({campo: columna del archivo}, campos faltantes)"""
+    by_key = {}
+    for column in df.columns:
+        by_key.setdefault(_column_key(column), column)
+    mapping = {field: by_key[field.lower()] for field in FIELDS if field.lower() in by_key}
+    missing = [field for field in FIELDS if field not in mapping]
+    return mapping, missing
+
+
+# -----------------------------------------------------------
+# Validación en el cliente
+# -----------------------------------------------------------
+def validate(df, mapping):
+    """
+    Valida todas las filas de una vez. Devuelve (valores normalizados con
+    los nombres de PatientData, Serie de errores por fila: "" si es válida).
+    Las reglas son las de PatientData; los mensajes son propios de la app
+    (en español) y no coinciden textualmente con los de la API.
+    """
+    values = pd.DataFrame(index=df.index)
+    messages = []
+
+    def flag(mask, message):
+        messages.append(np.where(mask, message, ""))
+
+    raw = df[mapping["Alcohol_Consumption"]]
+    alcohol = raw.astype("string").str.strip().str.lower().map(ALCOHOL_ALIASES)
+    flag(raw.isna(), "Alcohol_Consumption: campo requerido")
+    flag(raw.notna() & alcohol.isna(), "Alcohol_Consumption debe ser Low/Medium/High")
+    values["Alcohol_Consumption"] = alcohol
+
+    for field in NUMERIC_FIELDS + ("Age",):
+        raw = df[mapping[field]]
+        number = pd.to_numeric(raw, errors="coerce")
+        flag(raw.isna(), f"{field}: campo requerido")
+        flag(raw.notna() & number.isna(), f"{field} debe ser {'entero' if field == 'Age' else 'numérico'}")
+        if field == "Age":
+            # Como int(): se trunca y debe quedar entre 0 y 120
+            number = np.trunc(number)
+            flag((number < 0) | (number > 120), "Age debe estar entre 0 y 120")
+        else:
+            flag(np.isinf(number), f"{field} debe ser finito")
+            flag((number < 0) & ~np.isinf(number), f"{field} debe ser >= 0")
+        values[field] = number
+
+    errors = pd.Series(["; ".join(m for m in row if m) for row in zip(*messages)], index=df.index, dtype=object)
+    return values, errors
+
+
+def to_records(values):
+    """Filas válidas como dicts con tipos nativos (JSON)"""
+    records = values.astype({"Age": "int64"}).to_dict("records")
+    return [{k: (v.item() if hasattr(v, "item") else v) for k, v in r.items()} for r in records]
+
+
+# -----------------------------------------------------------
+# Envío en chunks
+# -----------------------------------------------------------
+def _score_chunk(client, records):
+    """Lista de resultados (mismo formato que /predict/batch/) o un mensaje de error"""
+    try:
+        response = client.predict({"patients": records})
+    except requests.exceptions.Timeout:
+        return "La API tardó demasiado en responder"
+    except requests.exceptions.ConnectionError:
+        return "No se pudo conectar con la API"
+    if response.status_code != 200:
+        return f"Error {response.status_code}: {response.text[:200]}"
+    return response.json()["results"]
+
+
+def score(client, values, valid, chunk_size=CHUNK_SIZE, parallel=PARALLEL_CHUNKS, on_progress=None):
+    """
+    Evalúa las filas `valid` (índices posicionales de `values`) en chunks.
+    Devuelve un DataFrame con RESULT_COLUMNS alineado a `values`;
+    on_progress(filas_procesadas, total) se llama desde el hilo que invoca.
+    """
+    n = len(values)
+    rows = {col: [None] * n for col in RESULT_COLUMNS}
+
+    valid = np.asarray(valid, dtype=np.int64)
+    chunk_size = max(1, int(chunk_size))
+    chunks = [valid[i:i + chunk_size] for i in range(0, len(valid), chunk_size)]
+    records = to_records(values.iloc[valid]) if len(valid) else []
+    offsets = np.cumsum([0] + [len(c) for c in chunks])
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, int(parallel))) as pool:
+        futures = {
+            pool.submit(_score_chunk, client, records[offsets[k]:offsets[k + 1]]): chunk
+            for k, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            chunk = futures[future].tolist()
+            results = future.result()
+            if isinstance(results, str):
+                for position in chunk:
+                    rows["error"][position] = results
+            else:
+                for position, result in zip(chunk, results):
+                    if "error" in result:
+                        rows["error"][position] = "; ".join(e["message"] for e in result["error"])
+                        continue
+                    rows["prediction"][position] = result["prediction"]
+                    rows["risk_label"][position] = result["risk_label"]
+                    rows["prob_high_risk"][position] = result["probabilities"]["class_1_high_risk"]
+                    rows["confidence"][position] = result["confidence"]
+            done += len(chunk)
+            if on_progress is not None:
+                on_progress(done, len(valid))
+
+    return pd.DataFrame({
+        "prediction": pd.array(rows["prediction"], dtype="Int64"),
+        "risk_label": pd.array(rows["risk_label"], dtype="string"),
+        "prob_high_risk": pd.array(rows["prob_high_risk"], dtype="Float64"),
+        "confidence": pd.array(rows["confidence"], dtype="Float64"),
+        "error": pd.array(rows["error"], dtype="string"),
+    }, index=values.index)
+
+
+def score_file(client, df, mapping, **kwargs):
+    """
+    Valida y evalúa el archivo completo. Devuelve (archivo con las columnas
+    de resultado agregadas, resumen). Las filas que no pasan la validación
+    del cliente llevan su error y no se envían.
+    """
+    t0 = time.perf_counter()
+    values, errors = validate(df, mapping)
+    valid = np.flatnonzero((errors == "").to_numpy())
+    results = score(client, values, valid, **kwargs)
+    invalid = errors != ""
+    results.loc[invalid, "error"] = errors[invalid]
+
+    scored = pd.concat([df, results.add_prefix("cardiai_")], axis=1)
+    summary = {
+        "rows": len(df),
+        "sent": len(valid),
+        "scored": int(results["prediction"].notna().sum()),
+        "invalid": int(invalid.sum()),
+        "failed": int(results["error"].notna().sum() - invalid.sum()),
+        "high_risk": int((results["prediction"] == 1).sum()),
+        "seconds": time.perf_counter() - t0,
+    }
+    return scored, summary
+
+
+def risk_distribution(probabilities, bins=10):
+    """Cantidad de pacientes por tramo de probabilidad de alto riesgo"""
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    labels = [f"{round(a * 100)}–{round(b * 100)}%" for a, b in zip(edges[:-1], edges[1:])]
+    binned = pd.cut(probabilities.dropna(), edges, labels=labels, include_lowest=True)
+    return binned.value_counts().reindex(labels, fill_value=0).rename("pacientes")
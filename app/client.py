@@ -0,0 +1,104 @@
+# app/client.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# -----------------------------------------------------------
+# Cliente HTTP de la API para la app de Streamlit
+# -----------------------------------------------------------
+# Una sola instancia compartida entre reruns y sesiones (st.cache_resource):
+#   - requests.Session con pool keep-alive: no se repite el handshake TLS
+#     en cada submit
+#   - timeouts de conexión y lectura: un backend lento no cuelga la página
+#   - reintentos con backoff exponencial ante 5xx, 429 y errores de
+#     conexión (respeta Retry-After). /predict/ es idempotente, así que
+#     también se reintenta el POST. Un timeout de lectura no se reintenta:
+#     la espera total queda acotada por el timeout
+#   - caché LRU de resultados por payload: reenviar los mismos datos se
+#     responde sin tocar la red
+
+# (conexión, lectura) en segundos; la lectura contempla el arranque en frío de Render
+DEFAULT_TIMEOUT = (5.0, 60.0)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def payload_key(payload):
+    """Clave estable del payload (independiente del orden de los campos)"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class PredictionClient:
+    def __init__(self, url, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5,
+                 pool_size=10, cache_size=128, cache_ttl=600.0):
+        self.url = url
+        self.timeout = timeout
+        self.cache_size = int(cache_size)
+        self.cache_ttl = float(cache_ttl or 0)
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=False,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def predict(self, payload):
+        """
+        POST del payload a la API. Devuelve el requests.Response; las
+        respuestas 200 quedan en caché y un payload repetido se sirve desde
+        ahí. Lanza requests.exceptions.Timeout si la API no responde a tiempo
+        y ConnectionError si se agotan los reintentos de conexión.
+        """
+        # Sin caché (p.ej. lotes grandes) no se calcula la clave
+        key = payload_key(payload) if self.cache_size > 0 else None
+        cached = self._get(key) if key is not None else None
+        if cached is not None:
+            return cached
+
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        if response.status_code == 200 and key is not None:
+            self._put(key, response)
+        return response
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                stored_at, response = entry
+                if not self.cache_ttl or time.monotonic() - stored_at < self.cache_ttl:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._cache[key]
+            self.misses += 1
+        return None
+
+    def _put(self, key, response):
+        with self._lock:
+            self._cache[key] = (time.monotonic(), response)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,172 @@
+# app/inference.py
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+
+import requests
+
+# -----------------------------------------------------------
+# Inferencia local o remota para la app de Streamlit
+# -----------------------------------------------------------
+# Si la app corre en el mismo host que el modelo no hace falta salir por
+# HTTP: en modo "local" se importa el pipeline de api/main.py y se evalúa
+# en el proceso de Streamlit (cargado una sola vez por servidor, la página
+# guarda el Predictor con st.cache_resource). El resultado tiene la misma
+# forma que /predict/.
+#
+#   CARDIAI_APP_INFERENCE           "remote" (por defecto) o "local": qué se intenta primero
+#   CARDIAI_APP_INFERENCE_FALLBACK  "1" (por defecto): si el primero falla se usa el otro
+#
+# Fallback: en modo local, si el pipeline no se puede cargar (faltan los
+# PKL o las dependencias de la API) o falla con 5xx se usa la API remota.
+# En modo remoto, ante errores de conexión, timeouts o 5xx se evalúa
+# localmente (la carga se intenta la primera vez que hace falta y, si
+# falla, no se reintenta).
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+MODES = ("remote", "local")
+INFERENCE_MODE = os.getenv("CARDIAI_APP_INFERENCE", "remote").strip().lower()
+INFERENCE_FALLBACK = os.getenv("CARDIAI_APP_INFERENCE_FALLBACK", "1").strip().lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("cardiai.inference")
+
+
+class LocalUnavailable(Exception):
+    """El pipeline local no se pudo cargar (y no hay fallback remoto)"""
+
+
+class LocalResponse:
+    """Resultado local con la interfaz de requests.Response que usa la página"""
+    backend = "local"
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    @property
+    def text(self):
+        return json.dumps(self._body, ensure_ascii=False, default=str)
+
+
+def load_local(repo_root=REPO_ROOT):
+    """
+    Importa api.main (carga y calienta el modelo) y devuelve su
+    predict_record. Los artefactos se buscan en <repo>/api y un
+    CARDIAI_DB_PATH relativo se resuelve contra la raíz del repo, aunque
+    Streamlit se lance desde otro directorio (por defecto la persistencia
+    usa ~/.cardiai/responses.db, ver api/persistence.py).
+
+    Dentro de Streamlit no corre el lifespan de FastAPI: el flush de las
+    predicciones en cola se registra con atexit para no perderlas al salir.
+    """
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    os.environ.setdefault("CARDIAI_ARTIFACT_DIR", os.path.join(repo_root, "api"))
+    db_path = os.environ.get("CARDIAI_DB_PATH")
+    if db_path and not os.path.isabs(db_path):
+        os.environ["CARDIAI_DB_PATH"] = os.path.join(repo_root, db_path)
+
+    from api import main
+    if main.prediction_writer is not None:
+        atexit.register(main.prediction_writer.stop)
+    return main.predict_record
+
+
+class Predictor:
+    def __init__(self, client, mode=INFERENCE_MODE, fallback=INFERENCE_FALLBACK, loader=load_local):
+        if mode not in MODES:
+            raise ValueError(f"CARDIAI_APP_INFERENCE debe ser uno de {MODES}: {mode!r}")
+        self.client = client
+        self.mode = mode
+        self.fallback = fallback
+        self._loader = loader
+        self._local = None
+        self._local_error = None
+        self._lock = threading.Lock()
+
+    @property
+    def backends(self):
+        order = ("local", "remote") if self.mode == "local" else ("remote", "local")
+        return order if self.fallback else order[:1]
+
+    # -------------------------------------------------------
+    # Pipeline local (una sola carga por proceso)
+    # -------------------------------------------------------
+    def local(self):
+        """predict_record local, o None si no se pudo cargar"""
+        with self._lock:
+            if self._local is None and self._local_error is None:
+                try:
+                    self._local = self._loader()
+                    logger.info("Inferencia local cargada")
+                except Exception as e:
+                    self._local_error = f"{type(e).__name__}: {e}"
+                    logger.warning("Inferencia local no disponible: %s", self._local_error)
+            return self._local
+
+    def _predict_local(self, predict_record, payload):
+        # Mismas respuestas de error que FastAPI (422 de validación, HTTPException)
+        from fastapi import HTTPException
+        from pydantic import ValidationError
+        try:
+            return LocalResponse(200, predict_record(payload))
+        except ValidationError as e:
+            return LocalResponse(422, {"detail": json.loads(e.json(include_url=False))})
+        except HTTPException as e:
+            return LocalResponse(e.status_code, {"detail": e.detail})
+        except Exception as e:
+            return LocalResponse(500, {"detail": f"Error en predicción: {str(e)}"})
+
+    # -------------------------------------------------------
+    # Predicción con fallback
+    # -------------------------------------------------------
+    def predict(self, payload):
+        """
+        Evalúa el payload con el primer backend disponible. Devuelve un
+        requests.Response (remoto) o LocalResponse (local). Si ninguno
+        responde se relanza el error del backend principal: Timeout /
+        ConnectionError del remoto o LocalUnavailable. Si el fallback no
+        está disponible se devuelve el 5xx del principal.
+        """
+        error = None
+        failed = None
+        backends = self.backends
+        for i, backend in enumerate(backends):
+            last = i == len(backends) - 1
+            if backend == "local":
+                predict_record = self.local()
+                if predict_record is None:
+                    error = error or LocalUnavailable(self._local_error)
+                    continue
+                response = self._predict_local(predict_record, payload)
+            else:
+                try:
+                    response = self.client.predict(payload)
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                    error = error or e
+                    continue
+            # Un 5xx se reintenta con el otro backend; un 4xx (payload inválido) no
+            if response.status_code >= 500 and not last:
+                logger.warning("Backend %s respondió %s; se usa el fallback", backend, response.status_code)
+                failed = response
+                continue
+            return response
+        if failed is not None:
+            return failed
+        raise error
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "fallback": self.fallback,
+            "local_loaded": self._local is not None,
+            "local_error": self._local_error,
+        }
@@ -1,111 +1,48 @@
 # app/app.py
 
+import os
+
 import streamlit as st
 import requests
 
+from assets import APP_STYLESHEETS, page_style
+from client import PredictionClient
+from inference import LocalResponse, LocalUnavailable, Predictor
+
 st.set_page_config(
     page_title="Heart Disease Predictor",
     layout="centered",
     page_icon="❤️"
 )
 
-# Estilos CSS personalizados
-st.markdown("""
-    <style>
-    /* Fondo con imagen - usando stApp para el contenedor principal */
-    [data-testid="stAppViewContainer"] {
-        background: linear-gradient(rgba(0, 20, 50, 0.5), rgba(0, 20, 50, 0.7)), 
-                    url('data:image/svg+xml;utf8,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1024 1024"><defs><linearGradient id="bg" x1="0%" y1="0%" x2="0%" y2="100%"><stop offset="0%" style="stop-color:rgb(30,41,82);stop-opacity:1" /><stop offset="100%" style="stop-color:rgb(15,23,42);stop-opacity:1" /></linearGradient></defs><rect fill="url(%23bg)" width="1024" height="1024"/><g opacity="0.3" fill="none" stroke="%2364748b" stroke-width="1"><line x1="100" y1="150" x2="200" y2="100"/><line x1="200" y1="100" x2="150" y2="250"/><line x1="300" y1="200" x2="400" y2="300"/><line x1="500" y1="150" x2="600" y2="200"/><line x1="700" y1="300" x2="800" y2="250"/><line x1="150" y1="400" x2="250" y2="500"/><line x1="400" y1="450" x2="500" y2="550"/><line x1="650" y1="500" x2="750" y2="600"/><circle cx="100" cy="150" r="3"/><circle cx="200" cy="100" r="3"/><circle cx="150" cy="250" r="3"/><circle cx="300" cy="200" r="3"/><circle cx="400" cy="300" r="3"/><circle cx="500" cy="150" r="3"/><circle cx="600" cy="200" r="3"/><circle cx="700" cy="300" r="3"/><circle cx="800" cy="250" r="3"/></g></svg>');
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-    }
-    
-    [data-testid="stHeader"] {
-        background: transparent;
-    }
-    
-    /* Contenedor principal */
-    .block-container {
-        padding: 2rem 1rem;
-        background: rgba(255, 255, 255, 0.95);
-        border-radius: 20px;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Título principal */
-    h1 {
-        color: #667eea;
-        text-align: center;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }
-    
-    /* Subtítulos */
-    h3 {
-        color: #764ba2;
-        border-bottom: 2px solid #667eea;
-        padding-bottom: 0.5rem;
-    }
-    
-    /* Inputs */
-    .stNumberInput > div > div > input,
-    .stSelectbox > div > div {
-        border-radius: 10px;
-        border: 2px solid #e0e0e0;
-        transition: all 0.3s;
-    }
-    
-    .stNumberInput > div > div > input:focus,
-    .stSelectbox > div > div:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 2px rgba(102, 126, 234, 0.2);
-    }
-    
-    /* Botón de submit */
-    .stButton > button {
-        width: 100%;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 1.5rem;
-        font-size: 1.1rem;
-        font-weight: 600;
-        transition: all 0.3s;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.6);
-    }
-    
-    /* Tarjetas de resultado */
-    .result-card {
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        margin: 1rem 0;
-        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Métricas */
-    [data-testid="stMetricValue"] {
-        font-size: 2rem;
-        color: #667eea;
-        font-weight: 700;
-    }
-    
-    /* Alertas personalizadas */
-    .stAlert {
-        border-radius: 12px;
-        border-left: 4px solid;
-    }
-    </style>
-""", unsafe_allow_html=True)
+# Estilos CSS personalizados (app/styles/app.css, leído y minificado una sola vez)
+@st.cache_data
+def app_style():
+    return page_style(APP_STYLESHEETS)
+
+
+st.markdown(app_style(), unsafe_allow_html=True)
+
+# Con barra final: sin ella FastAPI responde 307 y cada submit hace dos requests
+API_URL = os.getenv("CARDIAI_API_URL", "https://cardiai.onrender.com/predict/")
+
+
+@st.cache_resource
+def get_client():
+    # Compartido entre reruns y sesiones: conexiones keep-alive y caché de resultados
+    return PredictionClient(API_URL)
+
+
+@st.cache_resource
+def get_predictor():
+    # Local (api/main.py en este proceso) o remoto según CARDIAI_APP_INFERENCE,
+    # con fallback al otro (ver app/inference.py). En modo local el modelo se
+    # carga una sola vez por servidor, al abrir la página por primera vez
+    predictor = Predictor(get_client())
+    if predictor.mode == "local":
+        predictor.local()
+    return predictor
 
-API_URL = "https://cardiai.onrender.com/predict"
 
 # ---- Header ----
 st.title("❤️ Heart Disease Risk Predictor")
@@ -184,7 +121,7 @@ if submitted:
 
     with st.spinner("🔄 Analizando datos..."):
         try:
-            response = requests.post(API_URL, json=payload)
+            response = get_predictor().predict(payload)
 
             if response.status_code == 200:
                 result = response.json()
@@ -193,6 +130,10 @@ if submitted:
 
                 # Debug: Mostrar respuesta completa
                 with st.expander("🔍 Ver datos de respuesta (Debug)", expanded=False):
+                    st.caption(
+                        "Evaluado localmente (en este servidor)" if isinstance(response, LocalResponse)
+                        else f"Evaluado por la API: {API_URL}"
+                    )
                     st.json(result)
                     st.write("**Datos enviados:**")
                     st.json(payload)
@@ -244,6 +185,16 @@ if submitted:
             else:
                 st.error(f"❌ Error {response.status_code}: {response.text}")
 
+        except requests.exceptions.Timeout:
+            st.error(
+                "⏱️ **La API tardó demasiado en responder**\n\n"
+                "Intente nuevamente en unos segundos."
+            )
+        except LocalUnavailable as e:
+            st.error(
+                "⚠️ **No se pudo cargar el modelo local**\n\n"
+                f"`{e}`"
+            )
         except requests.exceptions.ConnectionError:
             st.error(
                 "⚠️ **No se pudo conectar con la API**\n\n"
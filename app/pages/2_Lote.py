@@ -0,0 +1,162 @@
+# app/pages/2_Lote.py
+
+import hashlib
+import os
+
+import streamlit as st
+
+from assets import APP_STYLESHEETS, page_style
+from batch import (
+    CHUNK_SIZE, FIELDS, MAX_ROWS, PARALLEL_CHUNKS,
+    match_columns, read_table, risk_distribution, score_file
+)
+from client import PredictionClient
+
+st.set_page_config(
+    page_title="Evaluación por Lotes",
+    layout="wide",
+    page_icon="❤️"
+)
+
+
+@st.cache_data
+def app_style():
+    return page_style(APP_STYLESHEETS)
+
+
+st.markdown(app_style(), unsafe_allow_html=True)
+
+API_URL = os.getenv("CARDIAI_API_URL", "https://cardiai.onrender.com/predict/")
+BATCH_URL = os.getenv("CARDIAI_API_BATCH_URL", API_URL.rstrip("/") + "/batch/")
+
+
+@st.cache_resource
+def get_batch_client():
+    # Lectura más larga que /predict/ (un chunk son cientos de filas) y sin
+    # caché de resultados: cada archivo se evalúa una vez y queda en la sesión
+    return PredictionClient(BATCH_URL, timeout=(5.0, 120.0), pool_size=max(PARALLEL_CHUNKS, 1), cache_size=0)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_table(name, data):
+    return read_table(name, data)
+
+
+# ---- Header ----
+st.title("📁 Evaluación por Lotes")
+st.markdown(
+    "<p style='text-align: center; color: #666; font-size: 1.1rem;'>"
+    "Suba un archivo CSV o Excel (.xlsx) con un paciente por fila para evaluar el riesgo de todos a la vez"
+    "</p>",
+    unsafe_allow_html=True
+)
+
+with st.expander("📋 Formato del archivo", expanded=False):
+    st.markdown(
+        "Una columna por campo (se aceptan espacios o guiones en lugar de `_` y cualquier "
+        "combinación de mayúsculas). Las demás columnas se conservan en el archivo de salida.\n\n"
+        + "\n".join(f"- `{field}`" for field in FIELDS)
+        + "\n\n`Alcohol_Consumption`: Low/Medium/High (o Bajo/Medio/Alto). `Age`: entero entre 0 y 120. "
+        "El resto: numérico >= 0."
+    )
+
+st.markdown("---")
+
+uploaded = st.file_uploader("Archivo de pacientes", type=["csv", "xlsx"])
+if uploaded is None:
+    st.stop()
+
+data = uploaded.getvalue()
+file_key = hashlib.sha256(data).hexdigest()
+
+try:
+    df = load_table(uploaded.name, data)
+except ImportError:
+    st.error("⚠️ Para leer archivos Excel se necesita `openpyxl`. Suba el archivo como CSV.")
+    st.stop()
+except Exception as e:
+    st.error(f"⚠️ No se pudo leer el archivo: {e}")
+    st.stop()
+
+if df.empty:
+    st.warning("⚠️ El archivo no tiene filas.")
+    st.stop()
+if len(df) > MAX_ROWS:
+    st.error(f"⚠️ El archivo tiene {len(df):,} filas; el máximo es {MAX_ROWS:,}.")
+    st.stop()
+
+mapping, missing = match_columns(df)
+if missing:
+    st.error("⚠️ **Faltan columnas:** " + ", ".join(f"`{field}`" for field in missing))
+    st.stop()
+
+st.subheader("👀 Vista previa")
+st.caption(f"{len(df):,} filas · {len(df.columns)} columnas")
+st.dataframe(df.head(20), use_container_width=True)
+
+# Los resultados quedan en la sesión: descargar o reordenar la tabla
+# provoca un rerun y no debe volver a evaluar el archivo
+if st.button("🔍 Evaluar archivo"):
+    progress = st.progress(0.0, text="🔄 Validando filas...")
+
+    def on_progress(done, total):
+        progress.progress(done / total, text=f"🔄 Evaluando... {done:,} / {total:,} filas")
+
+    scored, summary = score_file(
+        get_batch_client(), df, mapping,
+        chunk_size=CHUNK_SIZE, parallel=PARALLEL_CHUNKS, on_progress=on_progress
+    )
+    progress.empty()
+    st.session_state["batch_result"] = (file_key, scored, summary)
+
+result = st.session_state.get("batch_result")
+if result is None or result[0] != file_key:
+    st.stop()
+_, scored, summary = result
+
+# ---- Resumen ----
+st.markdown("---")
+st.subheader("📊 Resultados")
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Filas evaluadas", f"{summary['scored']:,} / {summary['rows']:,}")
+col2.metric("Alto riesgo", f"{summary['high_risk']:,}",
+            f"{summary['high_risk'] / summary['scored']:.1%}" if summary["scored"] else None,
+            delta_color="off")
+col3.metric("Con errores", f"{summary['invalid'] + summary['failed']:,}")
+col4.metric("Tiempo", f"{summary['seconds']:.1f} s")
+
+if summary["invalid"]:
+    st.warning(f"⚠️ {summary['invalid']:,} filas no pasaron la validación y no se enviaron (ver columna `cardiai_error`).")
+if summary["failed"]:
+    st.error(f"❌ {summary['failed']:,} filas no se pudieron evaluar en la API (ver columna `cardiai_error`).")
+
+if summary["scored"]:
+    col_dist, col_labels = st.columns([2, 1])
+    with col_dist:
+        st.markdown("##### Distribución de la probabilidad de alto riesgo")
+        st.bar_chart(risk_distribution(scored["cardiai_prob_high_risk"]))
+    with col_labels:
+        st.markdown("##### Clasificación")
+        st.dataframe(scored["cardiai_risk_label"].value_counts().rename("pacientes"), use_container_width=True)
+
+# Tabla ordenable: click en el encabezado de cada columna
+only_errors = st.toggle("Mostrar solo filas con errores", value=False)
+table = scored[scored["cardiai_error"].notna()] if only_errors else scored
+st.dataframe(
+    table,
+    use_container_width=True,
+    column_config={
+        "cardiai_prob_high_risk": st.column_config.ProgressColumn(
+            "Prob. alto riesgo", min_value=0.0, max_value=1.0, format="%.2f"),
+        "cardiai_confidence": st.column_config.NumberColumn("Confianza", format="%.2f"),
+    },
+)
+
+base_name = os.path.splitext(uploaded.name)[0]
+st.download_button(
+    "⬇️ Descargar archivo evaluado (CSV)",
+    data=scored.to_csv(index=False).encode("utf-8-sig"),
+    file_name=f"{base_name}_evaluado.csv",
+    mime="text/csv",
+)
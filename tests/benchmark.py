@@ -0,0 +1,318 @@
+"""
+Benchmarks del camino caliente de la API (sin red y sin modelo_rf_final.pkl).
+
+Genera un RandomForest sintético con los mismos 10 feature_names del
+modelo real, un MinMaxScaler con los rangos de minmax_scaler.pkl y el
+encoder de alcohol, en un directorio temporal. Luego mide:
+
+  - pipeline: transformación + bosque sin HTTP, lotes de 1 a 10.000 filas
+  - http_predict: /predict/ vía cliente ASGI en proceso, con varios
+    niveles de concurrencia
+  - http_batch: /predict/batch/ con distintos tamaños de lote
+
+Los resultados se guardan en JSON (--out) para comparar corridas:
+
+    python tests/benchmark.py --out bench.json
+    python tests/benchmark.py --quick --out nuevo.json --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Mismo orden que el modelo entrenado (ver tests/test.py)
+FEATURE_NAMES = [
+    'Alcohol Consumption', 'Homocysteine Level', 'CRP Level', 'BMI', 'Sleep Hours',
+    'Triglyceride Level', 'Cholesterol Level', 'Fasting Blood Sugar', 'Blood Pressure', 'Age'
+]
+
+# Rangos (min, max) de minmax_scaler.pkl por columna del scaler
+SCALER_RANGES = {
+    'Age': (18, 80),
+    'Blood Pressure': (120, 180),
+    'Cholesterol Level': (150, 300),
+    'BMI': (18, 40),
+    'Sleep Hours': (4, 10),
+    'Triglyceride Level': (100, 400),
+    'Fasting Blood Sugar': (80, 160),
+    'CRP Level': (0, 15),
+    'Homocysteine Level': (5, 20),
+}
+
+ALCOHOL_LEVELS = ["Low", "Medium", "High"]
+
+
+# -----------------------------------------------------------
+# Artefactos sintéticos
+# -----------------------------------------------------------
+def make_artifacts(directory, n_estimators=100, max_depth=None, n_train=8000, seed=0):
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import MinMaxScaler
+
+    from api.preprocessing import SCALER_COLUMN_ORDER
+
+    rng = np.random.default_rng(seed)
+    raw = np.column_stack([rng.uniform(*SCALER_RANGES[c], n_train) for c in SCALER_COLUMN_ORDER])
+    scaler = MinMaxScaler().fit(pd.DataFrame(raw, columns=SCALER_COLUMN_ORDER))
+    scaled = dict(zip(SCALER_COLUMN_ORDER, scaler.transform(raw).T))
+    scaled['Alcohol Consumption'] = rng.integers(0, 3, n_train).astype(float)
+    X = np.column_stack([scaled[name] for name in FEATURE_NAMES])
+
+    risk = (X[:, FEATURE_NAMES.index('Age')] + X[:, FEATURE_NAMES.index('Blood Pressure')]
+            + 0.2 * X[:, 0] + rng.normal(0, 0.3, n_train))
+    y = (risk > 1.2).astype(int)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                   random_state=seed, n_jobs=1).fit(X, y)
+
+    modelo_pkl = {"model": model, "feature_names": FEATURE_NAMES,
+                  "metadata": {"version": f"synthetic-{n_estimators}x{max_depth or 'full'}"}}
+    encoder = {"mapping": {"Low": 0, "Medium": 1, "High": 2},
+               "inverse_mapping": {0: "Low", 1: "Medium", 2: "High"}}
+    for name, obj in (("modelo_rf_final.pkl", modelo_pkl), ("minmax_scaler.pkl", scaler),
+                      ("alcohol_manual_encoder.pkl", encoder)):
+        with open(os.path.join(directory, name), "wb") as f:
+            pickle.dump(obj, f)
+    return modelo_pkl["metadata"]["version"]
+
+
+def make_patients(n, seed=1):
+    from api.preprocessing import SCALER_FIELD_MAP
+
+    rng = np.random.default_rng(seed)
+    columns = {field: rng.uniform(*SCALER_RANGES[col], n) for col, field in SCALER_FIELD_MAP.items()}
+    alcohol = rng.integers(0, 3, n)
+    patients = []
+    for i in range(n):
+        p = {field: round(float(values[i]), 3) for field, values in columns.items()}
+        p["Age"] = int(p["Age"])
+        p["Alcohol_Consumption"] = ALCOHOL_LEVELS[alcohol[i]]
+        patients.append(p)
+    return patients
+
+
+# -----------------------------------------------------------
+# Medición
+# -----------------------------------------------------------
+def summarize(name, params, latencies, rows_per_call=1, wall=None):
+    lat = np.asarray(latencies) * 1000.0
+    wall = wall if wall is not None else float(np.sum(latencies))
+    calls = len(latencies)
+    return {
+        "name": name,
+        "params": params,
+        "calls": calls,
+        "rows": calls * rows_per_call,
+        "mean_ms": round(float(lat.mean()), 4),
+        "p50_ms": round(float(np.percentile(lat, 50)), 4),
+        "p95_ms": round(float(np.percentile(lat, 95)), 4),
+        "p99_ms": round(float(np.percentile(lat, 99)), 4),
+        "max_ms": round(float(lat.max()), 4),
+        "calls_per_s": round(calls / wall, 2) if wall > 0 else None,
+        "rows_per_s": round(calls * rows_per_call / wall, 2) if wall > 0 else None,
+    }
+
+
+def time_calls(fn, repeats, warmup=3):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def repeats_for(rows, budget_rows, minimum=5, maximum=2000):
+    return int(min(maximum, max(minimum, budget_rows // max(rows, 1))))
+
+
+def bench_pipeline(pipeline, patients_json, batch_sizes, budget_rows):
+    from api.schemas import PatientData
+    from api.validation import validate_records
+
+    results = []
+    for size in batch_sizes:
+        rows = [PatientData.model_validate(p) for p in patients_json[:size]]
+        X, _ = pipeline.transform.transform_patients(rows)
+        repeats = repeats_for(size, budget_rows)
+
+        lat = time_calls(lambda: pipeline.score_patients(rows), repeats)
+        results.append(summarize("pipeline_score_patients", {"batch_size": size}, lat, size))
+
+        lat = time_calls(lambda: pipeline.run_model(X), repeats)
+        results.append(summarize("pipeline_forest_only", {"batch_size": size}, lat, size))
+
+        raw = patients_json[:size]
+        lat = time_calls(lambda: [PatientData.model_validate(p) for p in raw], repeats)
+        results.append(summarize("pipeline_validation", {"batch_size": size}, lat, size))
+
+        lat = time_calls(lambda: validate_records(raw), repeats)
+        results.append(summarize("pipeline_validation_columnar", {"batch_size": size}, lat, size))
+    return results
+
+
+async def bench_http(app, patients_json, concurrency_levels, batch_sizes, requests_per_level, budget_rows):
+    import httpx
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for concurrency in concurrency_levels:
+                queue = list(range(requests_per_level))
+                latencies = []
+
+                async def worker():
+                    while queue:
+                        i = queue.pop()
+                        body = patients_json[i % len(patients_json)]
+                        t0 = time.perf_counter()
+                        r = await client.post("/predict/", json=body)
+                        latencies.append(time.perf_counter() - t0)
+                        if r.status_code != 200:
+                            raise RuntimeError(f"/predict/ devolvió {r.status_code}: {r.text}")
+
+                for _ in range(3):
+                    await client.post("/predict/", json=patients_json[0])
+                t0 = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                wall = time.perf_counter() - t0
+                results.append(summarize("http_predict", {"concurrency": concurrency}, latencies, wall=wall))
+
+            for size in batch_sizes:
+                body = {"patients": patients_json[:size]}
+                latencies = []
+                for _ in range(repeats_for(size, budget_rows, minimum=3, maximum=200)):
+                    t0 = time.perf_counter()
+                    r = await client.post("/predict/batch/", json=body)
+                    latencies.append(time.perf_counter() - t0)
+                    if r.status_code != 200:
+                        raise RuntimeError(f"/predict/batch/ devolvió {r.status_code}")
+                results.append(summarize("http_batch", {"batch_size": size}, latencies, size))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(r):
+        return (r["name"], json.dumps(r["params"], sort_keys=True))
+
+    base = {key(r): r for r in baseline["results"]}
+    print(f"\n=== COMPARACIÓN CONTRA {baseline_path} (p50 / rows_per_s) ===")
+    for r in current["results"]:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        p50 = r["p50_ms"] / b["p50_ms"] if b["p50_ms"] else float("nan")
+        rps = r["rows_per_s"] / b["rows_per_s"] if b["rows_per_s"] else float("nan")
+        print(f"{r['name']:<26} {json.dumps(r['params']):<24} p50 x{p50:5.2f}   rows/s x{rps:5.2f}")
+
+
+# -----------------------------------------------------------
+# Main
+# -----------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del camino caliente de la API")
+    parser.add_argument("--out", default="benchmark_results.json", help="Archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--quick", action="store_true", help="Menos repeticiones (humo en CI)")
+    parser.add_argument("--engine", default="flat", choices=["flat", "sklearn"])
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--batch-sizes", default="1,10,100,1000,10000")
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    args = parser.parse_args(argv)
+
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",")]
+    concurrency_levels = [int(x) for x in args.concurrency.split(",")]
+    budget_rows = 20_000 if args.quick else 200_000
+    requests_per_level = 200 if args.quick else 2000
+
+    # El modelo sintético y la API viven en un directorio temporal que se
+    # borra al terminar (también si la corrida falla)
+    workdir = tempfile.mkdtemp(prefix="cardiai-bench-")
+    try:
+        t0 = time.perf_counter()
+        version = make_artifacts(workdir, n_estimators=args.trees, max_depth=args.max_depth)
+        print(f"Modelo sintético {version} generado en {time.perf_counter() - t0:.1f}s ({workdir})")
+
+        # La API se configura por entorno antes de importarla: sin persistencia
+        # ni caché, para medir el camino completo en cada request
+        os.environ.update({
+            "CARDIAI_ARTIFACT_DIR": workdir,
+            "CARDIAI_EXPORT_DIR": os.path.join(workdir, "sin-exportacion"),
+            "CARDIAI_INFERENCE_ENGINE": args.engine,
+            "CARDIAI_PERSIST": "0",
+            "CARDIAI_CACHE_SIZE": "0",
+        })
+        os.environ.pop("CARDIAI_MODEL_REGISTRY_DIR", None)
+        os.environ.pop("CARDIAI_SHARED_MODEL", None)
+        import api.main as main_module
+
+        pipeline = main_module.registry.active
+        patients_json = make_patients(max(batch_sizes + [1000]))
+
+        results = bench_pipeline(pipeline, patients_json, batch_sizes, budget_rows)
+        results += asyncio.run(bench_http(main_module.app, patients_json, concurrency_levels,
+                                          batch_sizes, requests_per_level, budget_rows))
+
+        import sklearn
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "numpy": np.__version__,
+                "sklearn": sklearn.__version__,
+                "engine": pipeline.engine,
+                "model_version": version,
+                "trees": args.trees,
+                "max_depth": args.max_depth,
+                "quick": args.quick,
+            },
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'benchmark':<26} {'params':<24} {'p50 ms':>9} {'p99 ms':>9} {'rows/s':>12}")
+    for r in results:
+        print(f"{r['name']:<26} {json.dumps(r['params']):<24} {r['p50_ms']:>9.3f} "
+              f"{r['p99_ms']:>9.3f} {r['rows_per_s']:>12.0f}")
+    print(f"\nResultados guardados en {args.out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Replay de tráfico grabado contra la API a tasa controlada (lazo abierto).
+
+Lee payloads PatientData grabados y los envía a una tasa objetivo fija o
+en rampa, sin esperar a que termine el request anterior: si la API se
+satura las latencias crecen (no se "frena" al cliente), que es lo que
+permite encontrar el punto de saturación real.
+
+Fuentes soportadas:
+  - la base de auditoría (~/.cardiai/responses.db o CARDIAI_DB_PATH; tabla
+    `responses`: cada predicción queda registrada ahí)
+  - .jsonl / .ndjson: un PatientData por línea, o {"body"|"payload"|"patient": {...}}
+    (las líneas que no son JSON válido se omiten y se informa cuántas)
+  - .json: lista de PatientData
+  - .csv: columnas de PatientData
+
+Por cada escalón se reporta p50/p95/p99/max de latencia, tasa de error y
+throughput logrado. La latencia se mide desde el instante programado del
+envío (incluye la espera si el cliente se atrasa).
+
+Uso:
+    uvicorn api.main:app --port 8000 &
+    python tests/replay.py ~/.cardiai/responses.db --url http://127.0.0.1:8000 --rps 50 --duration 30
+    python tests/replay.py trafico.jsonl --ramp 20:400:20 --step-seconds 15 --out replay.json
+    python tests/replay.py trafico.jsonl --in-process --rps 100   # sin servidor (humo)
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PATIENT_FIELDS = [
+    "Alcohol_Consumption", "Homocysteine_Level", "CRP_Level", "BMI", "Sleep_Hours",
+    "Triglyceride_Level", "Cholesterol_Level", "Fasting_Blood_Sugar", "Blood_Pressure", "Age"
+]
+WRAPPER_KEYS = ("body", "payload", "patient", "data")
+
+
+# -----------------------------------------------------------
+# Carga del tráfico grabado
+# -----------------------------------------------------------
+def _unwrap(record):
+    if isinstance(record, dict):
+        for key in WRAPPER_KEYS:
+            if isinstance(record.get(key), dict):
+                return record[key]
+    return record
+
+
+def load_payloads(path, limit=None):
+    ext = os.path.splitext(path)[1].lower()
+    skipped = 0
+    if ext in (".db", ".sqlite", ".sqlite3"):
+        columns = ", ".join(field.lower() for field in PATIENT_FIELDS)
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            sql = f"SELECT {columns} FROM responses ORDER BY id"
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+            payloads = [dict(zip(PATIENT_FIELDS, row)) for row in conn.execute(sql)]
+        finally:
+            conn.close()
+    elif ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            payloads = [dict(row) for row in csv.DictReader(f)]
+    elif ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        payloads = [_unwrap(r) for r in (data.get("patients", data) if isinstance(data, dict) else data)]
+    else:
+        payloads = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    payloads.append(_unwrap(json.loads(line)))
+                except json.JSONDecodeError:
+                    # Una línea truncada no debe tirar toda la grabación
+                    skipped += 1
+
+    total = len(payloads)
+    payloads = [p for p in payloads if isinstance(p, dict)]
+    skipped += total - len(payloads)
+    if skipped:
+        print(f"Aviso: se omitieron {skipped} registro(s) inválido(s) de {path}", file=sys.stderr)
+    if limit:
+        payloads = payloads[:limit]
+    if not payloads:
+        raise SystemExit(f"No se encontraron payloads en {path}")
+    return payloads
+
+
+def parse_steps(args):
+    """[(rps, segundos)] a partir de --rps o --ramp inicio:fin:paso; ValueError si no son válidos"""
+    if args.ramp:
+        try:
+            start, stop, step = (float(x) for x in args.ramp.split(":"))
+        except ValueError:
+            raise ValueError(f"--ramp debe ser inicio:fin:paso numérico: {args.ramp!r}")
+        # Un escalón de 0 rps dividiría por cero; paso <= 0 da una rampa vacía o infinita
+        if start <= 0 or step <= 0:
+            raise ValueError("--ramp requiere inicio > 0 y paso > 0")
+        if stop < start:
+            raise ValueError("--ramp requiere fin >= inicio")
+        if args.step_seconds <= 0:
+            raise ValueError("--step-seconds debe ser > 0")
+        rates = list(np.arange(start, stop + step / 2, step))
+        return [(float(r), args.step_seconds) for r in rates]
+    if args.rps <= 0 or args.duration <= 0:
+        raise ValueError("--rps y --duration deben ser > 0")
+    return [(args.rps, args.duration)]
+
+
+# -----------------------------------------------------------
+# Generador de carga en lazo abierto
+# -----------------------------------------------------------
+async def run_step(client, endpoint, payloads, offset, rps, seconds, max_in_flight, timeout):
+    n = max(1, int(round(rps * seconds)))
+    latencies = []
+    service = []
+    statuses = {}
+    errors = 0
+    skipped = 0
+    in_flight = 0
+    tasks = []
+    loop = asyncio.get_running_loop()
+
+    async def send(body, scheduled):
+        nonlocal errors, in_flight
+        sent = loop.time()
+        try:
+            r = await client.post(endpoint, json=body, timeout=timeout)
+            code = str(r.status_code)
+            if r.status_code >= 400:
+                errors += 1
+        except Exception as e:
+            code = type(e).__name__
+            errors += 1
+        done = loop.time()
+        statuses[code] = statuses.get(code, 0) + 1
+        latencies.append(done - scheduled)
+        service.append(done - sent)
+        in_flight -= 1
+
+    start = loop.time()
+    for i in range(n):
+        scheduled = start + i / rps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight >= max_in_flight:
+            # El cliente no debe convertirse en el cuello de botella
+            skipped += 1
+            continue
+        in_flight += 1
+        body = payloads[(offset + i) % len(payloads)]
+        tasks.append(asyncio.ensure_future(send(body, scheduled)))
+    send_end = loop.time()
+    if tasks:
+        await asyncio.gather(*tasks)
+    end = loop.time()
+
+    completed = len(latencies)
+    ok = completed - errors
+    return {
+        "target_rps": round(rps, 3),
+        "duration_s": round(seconds, 3),
+        "scheduled": n,
+        "sent": len(tasks),
+        "skipped_client_saturated": skipped,
+        "completed": completed,
+        "errors": errors,
+        "error_rate": round(errors / completed, 5) if completed else None,
+        "status_counts": statuses,
+        "offered_rps": round(len(tasks) / max(send_end - start, 1e-9), 2),
+        "achieved_rps": round(ok / max(end - start, 1e-9), 2),
+        **_percentiles("latency", latencies),
+        **_percentiles("service", service),
+    }, offset + n
+
+
+def _percentiles(prefix, values):
+    if not values:
+        return {f"{prefix}_{k}_ms": None for k in ("p50", "p95", "p99", "max")}
+    ms = np.asarray(values) * 1000.0
+    return {
+        f"{prefix}_p50_ms": round(float(np.percentile(ms, 50)), 3),
+        f"{prefix}_p95_ms": round(float(np.percentile(ms, 95)), 3),
+        f"{prefix}_p99_ms": round(float(np.percentile(ms, 99)), 3),
+        f"{prefix}_max_ms": round(float(ms.max()), 3),
+    }
+
+
+def is_saturated(step, slo_ms, max_error_rate):
+    if step["achieved_rps"] < 0.95 * step["target_rps"]:
+        return "throughput < 95% del objetivo"
+    if step["error_rate"] and step["error_rate"] > max_error_rate:
+        return f"tasa de error > {max_error_rate:.1%}"
+    if slo_ms and step["latency_p99_ms"] and step["latency_p99_ms"] > slo_ms:
+        return f"p99 > {slo_ms} ms"
+    if step["skipped_client_saturated"]:
+        return "más requests en vuelo que --max-in-flight"
+    return None
+
+
+async def replay(args, payloads, steps):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    if args.in_process:
+        # El tráfico repetido no debe quedar registrado como predicciones reales
+        os.environ["CARDIAI_PERSIST"] = "0"
+        import api.main as main_module
+        app = main_module.app
+        transport = httpx.ASGITransport(app=app)
+        client_kwargs = {"transport": transport, "base_url": "http://replay"}
+    else:
+        app = None
+        client_kwargs = {"base_url": args.url.rstrip("/"), "limits": limits}
+
+    results = []
+    offset = 0
+    async with contextlib.AsyncExitStack() as stack:
+        if app is not None:
+            await stack.enter_async_context(app.router.lifespan_context(app))
+        client = await stack.enter_async_context(httpx.AsyncClient(**client_kwargs))
+        # Calentamiento fuera de la medición
+        for body in payloads[:min(5, len(payloads))]:
+            await client.post(args.endpoint, json=body, timeout=args.timeout)
+
+        print(f"{'rps':>8} {'logrado':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'max ms':>9} {'error %':>8}")
+        for rps, seconds in steps:
+            step, offset = await run_step(client, args.endpoint, payloads, offset, rps, seconds,
+                                          args.max_in_flight, args.timeout)
+            step["saturation"] = is_saturated(step, args.slo_ms, args.max_error_rate)
+            results.append(step)
+            print(f"{step['target_rps']:>8.1f} {step['achieved_rps']:>9.1f} "
+                  f"{step['latency_p50_ms']:>9.2f} {step['latency_p95_ms']:>9.2f} "
+                  f"{step['latency_p99_ms']:>9.2f} {step['latency_max_ms']:>9.2f} "
+                  f"{100 * (step['error_rate'] or 0):>8.2f}"
+                  + (f"   <- {step['saturation']}" if step["saturation"] else ""))
+            if step["saturation"] and args.stop_on_saturation:
+                break
+    return results
+
+
+# -----------------------------------------------------------
+# Main
+# -----------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay de tráfico grabado a tasa controlada")
+    parser.add_argument("source", help="responses.db, .jsonl/.ndjson, .json o .csv con payloads PatientData")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base de la API")
+    parser.add_argument("--endpoint", default="/predict/")
+    parser.add_argument("--rps", type=float, default=20.0, help="Tasa objetivo (requests/s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos a --rps")
+    parser.add_argument("--ramp", help="Rampa inicio:fin:paso en rps (p.ej. 20:400:20)")
+    parser.add_argument("--step-seconds", type=float, default=15.0, help="Duración de cada escalón de la rampa")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--limit", type=int, help="Máximo de payloads a leer")
+    parser.add_argument("--slo-ms", type=float, help="p99 máximo aceptable (para marcar saturación)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--stop-on-saturation", action="store_true")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Usa api.main en el mismo proceso (sin servidor; solo humo)")
+    parser.add_argument("--out", help="Archivo JSON con los resultados por escalón")
+    args = parser.parse_args(argv)
+
+    try:
+        steps = parse_steps(args)
+    except ValueError as e:
+        parser.error(str(e))
+    payloads = load_payloads(args.source, args.limit)
+    print(f"{len(payloads)} payloads de {args.source}; {len(steps)} escalón(es) contra "
+          f"{'api.main (en proceso)' if args.in_process else args.url}{args.endpoint}")
+
+    results = asyncio.run(replay(args, payloads, steps))
+
+    saturated = next((s for s in results if s["saturation"]), None)
+    if saturated:
+        print(f"\nSaturación a {saturated['target_rps']} rps: {saturated['saturation']}")
+    else:
+        print("\nSin saturación en los escalones probados")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "source": args.source,
+                "target": "in-process" if args.in_process else args.url,
+                "endpoint": args.endpoint,
+                "payloads": len(payloads),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "saturation_rps": saturated["target_rps"] if saturated else None,
+                "steps": results,
+            }, f, indent=2)
+        print(f"Resultados guardados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
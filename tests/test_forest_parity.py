@@ -0,0 +1,83 @@
+"""
+Paridad del motor plano (api/forest.py) contra sklearn.
+
+Se entrena un RandomForest chico con NaN en los datos, así los nodos
+aprenden hacia qué lado mandar los faltantes (missing_left) y los árboles
+son más profundos que FlatForest.COMPACT_EVERY (se ejercita la compactación
+de apply). No depende del modelo versionado en api/.
+
+Uso:
+    python -m pytest -q tests/test_forest_parity.py
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from api.forest import FlatForest, check_parity  # noqa: E402
+
+N_FEATURES = 10
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    X = rng.random((2000, N_FEATURES))
+    y = ((X[:, 1] + X[:, 4] > 1.0) ^ (rng.random(len(X)) < 0.1)).astype(int)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def forest(model):
+    return FlatForest.from_sklearn(model)
+
+
+def _rows(n, seed, nan_rate=0.1):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n, N_FEATURES))
+    X[rng.random(X.shape) < nan_rate] = np.nan
+    return X
+
+
+def test_trees_are_deeper_than_compaction_interval(forest):
+    assert forest.max_depth > 2 * FlatForest.COMPACT_EVERY
+
+
+def test_check_parity(forest, model):
+    assert check_parity(forest, model, N_FEATURES)
+
+
+@pytest.mark.parametrize("nan_rate", [0.0, 0.1, 1.0])
+def test_predict_proba_matches_sklearn(forest, model, nan_rate):
+    X = _rows(3000, seed=1, nan_rate=nan_rate)
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+
+def test_apply_matches_sklearn_leaves(forest, model):
+    X = _rows(3000, seed=2)
+    np.testing.assert_array_equal(forest.apply(X), model.apply(X) + np.asarray(forest.roots))
+
+
+def test_single_row_matches_batch(forest):
+    X = _rows(50, seed=3)
+    batch = forest.predict_proba(X)
+    for i in range(len(X)):
+        np.testing.assert_array_equal(forest.predict_proba(X[i:i + 1])[0], batch[i])
+
+
+@pytest.mark.parametrize("value", [np.inf, -np.inf])
+def test_infinite_rejected_like_sklearn(forest, model, value):
+    X = _rows(4, seed=4)
+    X[1, 3] = value
+    with pytest.raises(ValueError):
+        model.predict_proba(X)
+    with pytest.raises(ValueError):
+        forest.predict_proba(X)
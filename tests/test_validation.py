@@ -0,0 +1,115 @@
+"""
+Equivalencia de la validación columnar (api/validation.py) con PatientData.
+
+Para cada registro, validate_records debe dar exactamente los mismos
+errores (campo, mensaje, orden) que Pydantic y, en filas válidas, los
+mismos valores normalizados.
+
+Uso:
+    python -m pytest -q tests/test_validation.py
+"""
+import math
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydantic import ValidationError  # noqa: E402
+
+from api.schemas import PatientData  # noqa: E402
+from api.validation import FIELDS, validate_records  # noqa: E402
+
+VALID = {
+    "Alcohol_Consumption": "Low", "Homocysteine_Level": 12.0, "CRP_Level": 3.0, "BMI": 27.5,
+    "Sleep_Hours": 6.0, "Triglyceride_Level": 200.0, "Cholesterol_Level": 220.0,
+    "Fasting_Blood_Sugar": 110.0, "Blood_Pressure": 140.0, "Age": 60,
+}
+
+# Valores raros que cualquier campo puede recibir
+ODD_VALUES = [
+    1.5, 0, -2, "3.5", " 7 ", "abc", None, True, [1], {"a": 1}, float("nan"), float("inf"),
+    float("-inf"), "inf", "nan", "", "1_0", 45.7, "45", "45.0", 130, -0.5, 10 ** 30, "-3",
+    "Low", "  hIgh ", "medio", "Alto", "xx", 2,
+]
+
+
+def _pydantic_errors(record):
+    """Errores como los arma /predict/batch/ a partir de un ValidationError"""
+    try:
+        PatientData.model_validate(record)
+    except ValidationError as e:
+        return [
+            {"field": ".".join(str(loc) for loc in err["loc"]), "message": err["msg"]}
+            for err in e.errors()
+        ]
+    return None
+
+
+def _same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def _assert_equivalent(records):
+    result = validate_records(records)
+    for i, record in enumerate(records):
+        assert result.errors.get(i) == _pydantic_errors(record), record
+    for i in result.valid_indices.tolist():
+        patient = PatientData.model_validate(records[i])
+        for field in FIELDS:
+            value = result.columns[field][i]
+            value = value.item() if hasattr(value, "item") else value
+            assert _same(value, getattr(patient, field)), (field, records[i])
+
+
+def _random_record(rng, odd_rate):
+    if rng.random() < 0.03:
+        return rng.choice([[1], "x", None, 3])
+    record = {}
+    for field in FIELDS:
+        if rng.random() < 0.03:
+            continue
+        if rng.random() < odd_rate:
+            record[field] = rng.choice(ODD_VALUES)
+        elif field == "Alcohol_Consumption":
+            record[field] = rng.choice(["Low", "High", "Medium", "bajo", " ALTO "])
+        elif field == "Age":
+            record[field] = rng.randint(0, 120)
+        else:
+            record[field] = rng.uniform(0, 100)
+    if rng.random() < 0.05:
+        record["extra"] = 1
+    return record
+
+
+def test_valid_record():
+    _assert_equivalent([dict(VALID)])
+
+
+@pytest.mark.parametrize("field", FIELDS)
+@pytest.mark.parametrize("value", ODD_VALUES)
+def test_single_odd_value(field, value):
+    _assert_equivalent([{**VALID, field: value}])
+
+
+@pytest.mark.parametrize("field", FIELDS)
+def test_missing_field(field):
+    record = dict(VALID)
+    del record[field]
+    _assert_equivalent([record])
+
+
+def test_non_object_rows():
+    _assert_equivalent([dict(VALID), [1], "x", None, 3, dict(VALID)])
+
+
+@pytest.mark.parametrize("odd_rate", [0.0, 0.3])
+def test_random_batches(odd_rate):
+    rng = random.Random(3)
+    for _ in range(100):
+        _assert_equivalent([_random_record(rng, odd_rate) for _ in range(rng.randint(1, 40))])